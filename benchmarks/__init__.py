@@ -0,0 +1,20 @@
+#
+#    benchmarks ... Benchmarks of the Mach-O parser
+#    Copyright (C) 2011  KennyTM~ <kennytm@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+'''Benchmarks of the hot paths of :mod:`macho`, run against synthetic files
+generated by :mod:`benchmarks.fixtures`. See :mod:`benchmarks.run`.'''
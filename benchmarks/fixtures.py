@@ -0,0 +1,609 @@
+#
+#    fixtures.py ... Generate synthetic Mach-O files for benchmarking
+#    Copyright (C) 2011  KennyTM~ <kennytm@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+'''
+
+This module writes synthetic, little-endian Mach-O files and dyld shared caches
+which exercise the hot paths of the :mod:`macho` package. No external binaries
+are needed. Example::
+
+    from benchmarks.fixtures import makeMachO
+    makeMachO('/tmp/synthetic.dylib', nsymbols=10000, nclasses=500)
+
+The generated files contain:
+
+* ``__TEXT``: ``__text``, ``__cstring`` and the ObjC name and type sections.
+* ``__DATA``: ``__cfstring``, the ObjC class and protocol lists,
+  ``__objc_const``, ``__objc_data``, ``__objc_selrefs``,
+  ``__objc_classrefs``, ``__objc_superrefs``, the symbol pointer sections and
+  *nsections* extra plain sections.
+* ``__LINKEDIT``: the symbol table, the indirect symbol table, the bind
+  opcodes and the export trie.
+
+Members
+-------
+
+'''
+
+from struct import pack, Struct
+
+
+_selectors = ['init', 'dealloc', 'description', 'hash', 'isEqual:', 'copyWithZone:', 'setValue:forKey:', 'layoutSubviews']
+
+
+def _uleb128(value):
+    res = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            res.append(byte | 0x80)
+        else:
+            res.append(byte)
+            return bytes(res)
+
+
+class _Pointer(object):
+    def __init__(self, label, addend, width, relative=False, base=None):
+        self.label = label
+        self.addend = addend
+        self.width = width
+        self.relative = relative
+        self.base = base
+
+
+class SectionBuilder(object):
+    '''Content of a section. Pointers to labels are resolved when the file is
+    built.'''
+
+    def __init__(self, segname, sectname, ftype=0, reserved1=0):
+        self.segname = segname
+        self.sectname = sectname
+        self.ftype = ftype
+        self.reserved1 = reserved1
+        self.items = []
+        self.labels = {}
+        self.size = 0
+        self.offset = 0
+        self.addr = 0
+
+    def label(self, name):
+        '''Mark the current end of the section as *name*.'''
+        self.labels[name] = self.size
+
+    def raw(self, data):
+        '''Append raw bytes.'''
+        self.items.append(bytes(data))
+        self.size += len(data)
+
+    def pointer(self, label, width, addend=0):
+        '''Append a pointer to *label* (a label name, or an integer address).'''
+        self.items.append(_Pointer(label, addend, width))
+        self.size += width
+
+    def relative(self, label, addend=0):
+        '''Append a signed 32-bit offset from itself to *label*.'''
+        self.items.append(_Pointer(label, addend, 4, relative=True))
+        self.size += 4
+
+    def relativeTo(self, label, base):
+        '''Append a signed 32-bit offset from the address *base* to *label*.'''
+        self.items.append(_Pointer(label, 0, 4, base=base))
+        self.size += 4
+
+    def align(self, alignment):
+        '''Pad the section to a multiple of *alignment*.'''
+        padding = -self.size % alignment
+        if padding:
+            self.raw(bytes(padding))
+
+
+class MachOBuilder(object):
+    '''Build a Mach-O dylib from :class:`SectionBuilder`\\s.
+
+    *base* is the VM address of the header. If the image is embedded in a
+    shared cache at file offset *fileBase*, the file offsets in the load
+    commands will be shifted by this value.
+    '''
+
+    def __init__(self, is64bit=False, cputype=None, cpusubtype=None, base=0x1000, fileBase=0):
+        self.is64bit = is64bit
+        self.cputype = cputype if cputype is not None else (0x100000c if is64bit else 12)
+        self.cpusubtype = cpusubtype if cpusubtype is not None else (0 if is64bit else 9)
+        self.base = base
+        self.fileBase = fileBase
+        self.pointerWidth = 8 if is64bit else 4
+        self.segments = {'__TEXT': [], '__DATA': []}
+        self.segmentOrder = ['__TEXT', '__DATA']
+        self.symbols = []           # (name, type, sect, desc, value or label)
+        self.indirectSymbols = []
+        self.binds = []             # (symbol name, library ordinal, offset in __DATA)
+        self.exports = []           # (symbol name, label)
+        self.dylibs = ['/usr/lib/libSystem.B.dylib']
+
+    def section(self, segname, sectname, **kwargs):
+        '''Create and return a new :class:`SectionBuilder`.'''
+        section = SectionBuilder(segname, sectname, **kwargs)
+        if segname not in self.segments:
+            self.segments[segname] = []
+            self.segmentOrder.append(segname)
+        self.segments[segname].append(section)
+        return section
+
+    def _loadCommands(self, layout):
+        # Build all load commands except the segments, given the __LINKEDIT
+        # layout. Returns a list of bytes.
+        fileBase = self.fileBase
+        (symoff, nsyms, indirectoff, nindirect, stroff, strsize, bindoff, bindsize, exportoff, exportsize) = layout
+        cmds = []
+        cmds.append(pack('<6L', 2, 24, symoff + fileBase, nsyms, stroff + fileBase, strsize))
+        dysymtab = [0] * 18
+        dysymtab[3] = nsyms
+        dysymtab[12] = indirectoff + fileBase if nindirect else 0
+        dysymtab[13] = nindirect
+        cmds.append(pack('<20L', 0xb, 80, *dysymtab))
+        cmds.append(pack('<12L', 0x80000022, 48, 0, 0, bindoff + fileBase if bindsize else 0, bindsize, 0, 0, 0, 0, exportoff + fileBase if exportsize else 0, exportsize))
+        cmds.append(pack('<2L', 0x1b, 24) + bytes(range(16)))
+        for i, dylib in enumerate(self.dylibs):
+            name = dylib.encode() + b'\0'
+            name += bytes(-len(name) % 8)
+            cmds.append(pack('<6L', 0xd if i == 0 and dylib.startswith('@') else 0xc, 24 + len(name), 24, 2, 0x10000, 0x10000) + name)
+        return cmds
+
+    def _exportTrie(self, addresses):
+        # Build a compressed trie: every node has at most 255 children, since
+        # the child count is stored in a single byte.
+        if not self.exports:
+            return b''
+        root = {}
+        for name, label in self.exports:
+            node = root
+            for c in name.encode():
+                node = node.setdefault(c, {})
+            node[None] = addresses[label] - self.base
+
+        def compress(node):
+            # Returns a list of (terminal, [(edge, child)]) in preorder.
+            edges = []
+            for c, child in sorted((c, n) for c, n in node.items() if c is not None):
+                edge = bytearray([c])
+                while len(child) == 1 and None not in child:
+                    (c, child) = next(iter(child.items()))
+                    edge.append(c)
+                edges.append((bytes(edge), child))
+            return (node.get(None), edges)
+
+        nodes = []
+        def collect(node):
+            (terminal, edges) = compress(node)
+            index = len(nodes)
+            children = []
+            nodes.append((terminal, edges, children))
+            for _, child in edges:
+                children.append(collect(child))
+            return index
+        collect(root)
+
+        def serialize(offsets):
+            res = []
+            for terminal, edges, children in nodes:
+                data = bytearray()
+                if terminal is None:
+                    data.append(0)
+                else:
+                    info = b'\x00' + _uleb128(terminal)
+                    data += bytes([len(info)]) + info
+                data.append(len(edges))
+                for (edge, _), child in zip(edges, children):
+                    data += edge + b'\0' + _uleb128(offsets[child])
+                res.append(bytes(data))
+            return res
+
+        # The sizes of the nodes depend on the offsets, iterate until stable.
+        offsets = [0] * len(nodes)
+        while True:
+            blobs = serialize(offsets)
+            newOffsets = []
+            position = 0
+            for blob in blobs:
+                newOffsets.append(position)
+                position += len(blob)
+            if newOffsets == offsets:
+                return b''.join(blobs)
+            offsets = newOffsets
+
+    def _bindOpcodes(self, dataSegmentIndex):
+        res = bytearray()
+        for name, libord, offset in self.binds:
+            res.append(0x10 | min(libord, 15))                    # SET_DYLIB_ORDINAL_IMM
+            res += b'\x40' + name.encode() + b'\0'                  # SET_SYMBOL_TRAILING_FLAGS_IMM
+            res.append(0x51)                                        # SET_TYPE_IMM (pointer)
+            res += bytes([0x70 | dataSegmentIndex]) + _uleb128(offset)  # SET_SEGMENT_AND_OFFSET_ULEB
+            res.append(0x90)                                        # DO_BIND
+        if res:
+            res.append(0)                                           # DONE
+        return bytes(res)
+
+    def build(self):
+        '''Lay out and return the content of the Mach-O file as
+        :class:`bytes`.'''
+
+        is64bit = self.is64bit
+        ptr = 'Q' if is64bit else 'L'
+        headerSize = 32 if is64bit else 28
+        segmentSize = 72 if is64bit else 56
+        sectionSize = 80 if is64bit else 68
+        segnames = self.segmentOrder + ['__LINKEDIT']
+        nsects = sum(len(s) for s in self.segments.values())
+
+        # The size of the load commands does not depend on the layout.
+        otherCmds = self._loadCommands((0,) * 10)
+        sizeofcmds = len(segnames) * segmentSize + nsects * sectionSize + sum(map(len, otherCmds))
+
+        # Lay out the sections.
+        position = headerSize + sizeofcmds
+        segmentRanges = {}
+        fileoff = 0
+        for segname in self.segmentOrder:
+            for section in self.segments[segname]:
+                position = (position + 15) & ~15
+                section.offset = position
+                section.addr = position + self.base
+                position += section.size
+            filesize = (position - fileoff + 0xfff) & ~0xfff
+            segmentRanges[segname] = (fileoff, filesize)
+            fileoff += filesize
+            position = fileoff
+
+        addresses = {}
+        for sections in self.segments.values():
+            for section in sections:
+                for name, offset in section.labels.items():
+                    addresses[name] = section.addr + offset
+
+        # Lay out __LINKEDIT.
+        strtab = bytearray(b' \0')
+        nlistStruct = Struct('<LBBH' + ptr)
+        nlists = bytearray()
+        for name, typ, sect, desc, value in self.symbols:
+            nlists += nlistStruct.pack(len(strtab), typ, sect, desc, addresses[value] if isinstance(value, str) else value)
+            strtab += name.encode() + b'\0'
+        strtab += bytes(-len(strtab) % 8)
+        indirect = pack('<{}L'.format(len(self.indirectSymbols)), *self.indirectSymbols)
+        binds = self._bindOpcodes(self.segmentOrder.index('__DATA'))
+        binds += bytes(-len(binds) % 8)
+        exportTrie = self._exportTrie(addresses)
+
+        linkedit = fileoff
+        symoff = linkedit
+        indirectoff = symoff + len(nlists)
+        bindoff = indirectoff + len(indirect)
+        exportoff = bindoff + len(binds)
+        stroff = exportoff + len(exportTrie)
+        linkeditData = bytes(nlists) + indirect + binds + exportTrie + bytes(strtab)
+        segmentRanges['__LINKEDIT'] = (linkedit, len(linkeditData))
+
+        otherCmds = self._loadCommands((symoff, len(self.symbols), indirectoff, len(self.indirectSymbols), stroff, len(strtab),
+                                        bindoff, len(binds), exportoff, len(exportTrie)))
+
+        # Write the load commands.
+        cmds = bytearray()
+        segCmd = 0x19 if is64bit else 1
+        sectionStruct = Struct('<16s16s2' + ptr + ('8L' if is64bit else '7L'))
+        for segname in segnames:
+            sections = self.segments.get(segname, [])
+            (fileoff, filesize) = segmentRanges[segname]
+            prot = 3 if segname == '__DATA' else 1 if segname == '__LINKEDIT' else 5
+            cmds += pack('<2L16s4' + ptr + '4L', segCmd, segmentSize + len(sections) * sectionSize, segname.encode(),
+                         fileoff + self.base, filesize, fileoff + self.fileBase, filesize, prot, prot, len(sections), 0)
+            for section in sections:
+                fields = [section.sectname.encode(), segname.encode(), section.addr, section.size,
+                          section.offset + self.fileBase, 3, 0, 0, section.ftype, section.reserved1, 0]
+                if is64bit:
+                    fields.append(0)
+                cmds += sectionStruct.pack(*fields)
+        for cmd in otherCmds:
+            cmds += cmd
+        assert len(cmds) == sizeofcmds
+
+        # Write the file.
+        out = bytearray(linkedit + len(linkeditData))
+        magic = 0xfeedfacf if is64bit else 0xfeedface
+        header = pack('<7L', magic, self.cputype, self.cpusubtype, 6, len(segnames) + len(otherCmds), sizeofcmds, 0x100085)
+        if is64bit:
+            header += bytes(4)
+        out[0:headerSize] = header
+        out[headerSize:headerSize + sizeofcmds] = cmds
+        for sections in self.segments.values():
+            for section in sections:
+                position = section.offset
+                for item in section.items:
+                    if isinstance(item, _Pointer):
+                        value = addresses[item.label] if isinstance(item.label, str) else item.label
+                        value += item.addend
+                        if item.relative:
+                            out[position:position + 4] = pack('<l', value - (position - section.offset + section.addr))
+                        elif item.base is not None:
+                            out[position:position + 4] = pack('<l', value - item.base)
+                        else:
+                            out[position:position + item.width] = pack('<Q' if item.width == 8 else '<L', value)
+                        position += item.width
+                    else:
+                        out[position:position + len(item)] = item
+                        position += len(item)
+        out[linkedit:] = linkeditData
+        return bytes(out)
+
+
+def machOBuilder(nsymbols=1000, nstrings=1000, nclasses=100, nmethods=10, nbinds=500, nsections=8, is64bit=False,
+                 relativeMethods=False, directSelectors=False, selectorBase=None, nprotocols=0, base=0x1000, fileBase=0):
+    '''Create a :class:`MachOBuilder` filled with synthetic content:
+
+    * *nsymbols* exported symbols in the symbol table and the export trie,
+    * *nstrings* C strings, and a CFString for every 4th of them,
+    * *nclasses* ObjC classes, each with *nmethods* methods and class methods,
+      2 instance variables and a property,
+    * *nprotocols* ObjC protocols, each with *nmethods* methods and a
+      property, all but the first adopting the first one,
+    * *nbinds* bind opcodes to imported symbols,
+    * *nsections* extra sections in ``__DATA``.
+
+    If *relativeMethods* is ``True``, the method lists use 32-bit relative
+    offsets. Their selectors point to the selector references, or to the
+    selector names directly if *directSelectors* is ``True`` (as in shared
+    caches). If *selectorBase* is given, the lists are flagged with direct
+    selectors, which are offsets from this address instead (as in newer
+    shared caches).
+    '''
+
+    b = MachOBuilder(is64bit=is64bit, base=base, fileBase=fileBase)
+    pw = b.pointerWidth
+    ptrFormat = '<Q' if is64bit else '<L'
+
+    text = b.section('__TEXT', '__text')
+    text.label('text')
+    text.raw(bytes(16 * max(nsymbols, 1)))
+
+    cstring = b.section('__TEXT', '__cstring', ftype=2)
+    for i in range(nstrings):
+        cstring.label('str{}'.format(i))
+        cstring.raw('string #{} for benchmarking'.format(i).encode() + b'\0')
+
+    methname = b.section('__TEXT', '__objc_methname', ftype=2)
+    for sel in _selectors:
+        methname.label('sel_' + sel)
+        methname.raw(sel.encode() + b'\0')
+    methtype = b.section('__TEXT', '__objc_methtype', ftype=2)
+    methtype.label('enc')
+    methtype.raw(b'v8@0:4\0')
+    methtype.label('attr')
+    methtype.raw(b'T@,R\0')
+    for i in range(2):
+        methname.label('ivar{}'.format(i))
+        methname.raw('_ivar{}'.format(i).encode() + b'\0')
+    classname = b.section('__TEXT', '__objc_classname', ftype=2)
+
+    listFlags = 0x8000000c if relativeMethods else 3 * pw
+    if relativeMethods and selectorBase is not None:
+        listFlags |= 0x40000000
+    def selector(section, sel):
+        if selectorBase is not None:
+            section.relativeTo('sel_' + sel, selectorBase)
+        else:
+            section.relative(('sel_' if directSelectors else 'selref_') + sel)
+
+    cfstring = b.section('__DATA', '__cfstring')
+    for i in range(0, nstrings, 4):
+        cfstring.pointer(0, pw)
+        cfstring.raw(pack('<L', 0x7c8) + bytes(pw - 4))
+        cfstring.pointer('str{}'.format(i), pw)
+        cfstring.raw(pack(ptrFormat, len('string #{} for benchmarking'.format(i))))
+
+    classlist = b.section('__DATA', '__objc_classlist')
+    const = b.section('__DATA', '__objc_const')
+    data = b.section('__DATA', '__objc_data')
+    selrefs = b.section('__DATA', '__objc_selrefs', ftype=5)
+    for sel in _selectors:
+        selrefs.label('selref_' + sel)
+        selrefs.pointer('sel_' + sel, pw)
+
+    protolist = b.section('__DATA', '__objc_protolist')
+    for p in range(nprotocols):
+        classname.label('pname{}'.format(p))
+        classname.raw('BenchProtocol{}'.format(p).encode() + b'\0')
+        protolist.pointer('proto{}'.format(p), pw)
+        const.align(pw)
+        const.label('pml{}'.format(p))
+        const.raw(pack('<2L', listFlags, nmethods))
+        for m in range(nmethods):
+            sel = _selectors[(p + m) % len(_selectors)]
+            if relativeMethods:
+                selector(const, sel)
+                const.relative('enc')
+                const.raw(bytes(4))
+            else:
+                const.pointer('sel_' + sel, pw)
+                const.pointer('enc', pw)
+                const.pointer(0, pw)
+        const.label('pprops{}'.format(p))
+        const.raw(pack('<2L', 2 * pw, 1))
+        const.pointer('sel_' + _selectors[p % len(_selectors)], pw)
+        const.pointer('attr', pw)
+        if p:
+            const.label('pl{}'.format(p))
+            const.raw(pack(ptrFormat, 1))
+            const.pointer('proto0', pw)
+        data.align(pw)
+        data.label('proto{}'.format(p))
+        data.pointer(0, pw)
+        data.pointer('pname{}'.format(p), pw)
+        data.pointer('pl{}'.format(p) if p else 0, pw)
+        data.pointer('pml{}'.format(p), pw)
+        for _ in range(3):
+            data.pointer(0, pw)
+        data.pointer('pprops{}'.format(p), pw)
+
+    ivar = b.section('__DATA', '__objc_ivar')
+    classrefs = b.section('__DATA', '__objc_classrefs')
+    superrefs = b.section('__DATA', '__objc_superrefs')
+    for c in range(nclasses):
+        classrefs.pointer('cls{}'.format(c), pw)
+        if c:
+            superrefs.pointer('cls{}'.format(c), pw)
+
+    for c in range(nclasses):
+        classname.label('cname{}'.format(c))
+        classname.raw('BenchClass{}'.format(c).encode() + b'\0')
+        classlist.pointer('cls{}'.format(c), pw)
+        for meta in (0, 1):
+            const.align(pw)
+            const.label('ml{}_{}'.format(c, meta))
+            const.raw(pack('<2L', listFlags, nmethods))
+            for m in range(nmethods):
+                sel = _selectors[m % len(_selectors)]
+                impAddend = (16 * (c * nmethods + m) + 8 * meta) % (16 * max(nsymbols, 1))
+                if relativeMethods:
+                    selector(const, sel)
+                    const.relative('enc')
+                    const.relative('text', addend=impAddend)
+                else:
+                    const.pointer('sel_' + sel, pw)
+                    const.pointer('enc', pw)
+                    const.pointer('text', pw, addend=impAddend)
+            if not meta:
+                const.label('il{}'.format(c))
+                const.raw(pack('<2L', 3 * pw + 8, 2))
+                for i in range(2):
+                    ivar.label('ivaroff{}_{}'.format(c, i))
+                    ivar.raw(pack(ptrFormat, 2 * pw + 4 * i))
+                    const.pointer('ivaroff{}_{}'.format(c, i), pw)
+                    const.pointer('ivar{}'.format(i), pw)
+                    const.pointer('enc', pw)
+                    const.raw(pack('<2L', 2, 4))
+                const.label('cprops{}'.format(c))
+                const.raw(pack('<2L', 2 * pw, 1))
+                const.pointer('sel_' + _selectors[c % len(_selectors)], pw)
+                const.pointer('attr', pw)
+            const.label('ro{}_{}'.format(c, meta))
+            flags = (1 if meta else 0) | (2 if c == 0 else 0)
+            const.raw(pack('<3L', flags, 2 * pw, 2 * pw) + bytes(pw - 4))
+            const.pointer(0, pw)
+            const.pointer('cname{}'.format(c), pw)
+            const.pointer('ml{}_{}'.format(c, meta), pw)
+            const.pointer(0, pw)
+            const.pointer(0 if meta else 'il{}'.format(c), pw)
+            const.pointer(0, pw)
+            const.pointer(0 if meta else 'cprops{}'.format(c), pw)
+        data.align(pw)
+        data.label('cls{}'.format(c))
+        data.pointer('meta{}'.format(c), pw)
+        data.pointer('cls0' if c else 0, pw)
+        data.pointer(0, pw)
+        data.pointer(0, pw)
+        data.pointer('ro{}_0'.format(c), pw)
+        data.label('meta{}'.format(c))
+        data.pointer('meta0', pw)
+        data.pointer('meta0' if c else 'cls0', pw)
+        data.pointer(0, pw)
+        data.pointer(0, pw)
+        data.pointer('ro{}_1'.format(c), pw)
+
+    for i in range(nsections):
+        extra = b.section('__DATA', '__bench{}'.format(i))
+        extra.raw(bytes(64))
+
+    # Symbols: the exported ones, followed by 2 undefined symbols used by the
+    # indirect symbol table.
+    for i in range(nsymbols):
+        name = '_bench_function_{}'.format(i)
+        text.labels['fn{}'.format(i)] = 16 * i
+        b.symbols.append((name, 0xf, 1, 0, 'fn{}'.format(i)))
+        b.exports.append((name, 'fn{}'.format(i)))
+    b.symbols.append(('_malloc', 1, 0, 0x100, 0))
+    b.symbols.append(('_free', 1, 0, 0x100, 0))
+
+    nonLazy = b.section('__DATA', '__nl_symbol_ptr', ftype=6, reserved1=0)
+    nonLazy.pointer(0, pw)
+    nonLazy.pointer(0, pw)
+    lazy = b.section('__DATA', '__la_symbol_ptr', ftype=7, reserved1=2)
+    lazy.pointer(0, pw)
+    b.indirectSymbols = [nsymbols, nsymbols + 1, nsymbols + 1]
+
+    for i in range(nbinds):
+        b.binds.append(('_imported_{}'.format(i), 1, (i * pw) % 0x1000))
+
+    return b
+
+
+def makeMachO(path, **kwargs):
+    '''Write a synthetic Mach-O file to *path*. See :func:`machOBuilder` for
+    the keyword arguments. Returns the size of the file.'''
+    content = machOBuilder(**kwargs).build()
+    with open(path, 'wb') as f:
+        f.write(content)
+    return len(content)
+
+
+def makeSharedCache(path, nimages=20, base=0x30000000, selectorBase=False, **kwargs):
+    '''Write a synthetic single-file ``dyld_v1`` shared cache with *nimages*
+    images to *path*. Each image is generated by :func:`machOBuilder` with the
+    keyword arguments, using direct selectors in relative method lists.
+    If *selectorBase* is ``True``, the selectors are offsets from a base
+    address recorded in the ObjC optimization header, as in newer caches.
+    Returns the list of image paths.'''
+
+    is64bit = kwargs.get('is64bit', False)
+    archname = 'arm64' if is64bit else 'armv7'
+    paths = ['/System/Library/Frameworks/Bench{0}.framework/Bench{0}'.format(i) for i in range(nimages)]
+
+    # The header must reach objcOptsOffset and objcOptsSize at 464.
+    mappingOffset = 0x1e0 if selectorBase else 0x28
+    imagesOffset = mappingOffset + 32
+    pathsOffset = imagesOffset + 32 * nimages
+    pathData = bytearray()
+    pathOffsets = []
+    for p in paths:
+        pathOffsets.append(pathsOffset + len(pathData))
+        pathData += p.encode() + b'\0'
+
+    # The ObjC optimization header, whose address is also the selector base.
+    objcOptsOffset = (pathsOffset + len(pathData) + 7) & ~7
+    selectorBaseAddress = base + objcOptsOffset if selectorBase else None
+
+    offset = (objcOptsOffset + 56 + 0xfff) & ~0xfff
+    images = []
+    for i in range(nimages):
+        content = machOBuilder(base=base + offset, fileBase=offset, directSelectors=True, selectorBase=selectorBaseAddress, **kwargs).build()
+        images.append((offset, content))
+        offset = (offset + len(content) + 0xfff) & ~0xfff
+
+    out = bytearray(offset)
+    out[0:16] = 'dyld_v1 {:>7}'.format(archname).encode() + b'\0'
+    out[16:40] = pack('<4LQ', mappingOffset, 1, imagesOffset, nimages, 0)
+    if selectorBase:
+        out[464:480] = pack('<2Q', objcOptsOffset, 56)
+        out[objcOptsOffset:objcOptsOffset + 56] = pack('<2L6Q', 1, 0, 0, 0, 0, 0, 0, objcOptsOffset)
+    out[mappingOffset:mappingOffset + 32] = pack('<3Q2L', base, offset, 0, 5, 5)
+    for i, (imageOffset, content) in enumerate(images):
+        out[imagesOffset + 32*i:imagesOffset + 32*(i+1)] = pack('<3Q2L', base + imageOffset, 0, 0, pathOffsets[i], 0)
+        out[imageOffset:imageOffset + len(content)] = content
+    out[pathsOffset:pathsOffset + len(pathData)] = pathData
+
+    with open(path, 'wb') as f:
+        f.write(out)
+    return paths
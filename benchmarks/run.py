@@ -0,0 +1,457 @@
+#
+#    run.py ... Time the hot paths of the Mach-O parser
+#    Copyright (C) 2011  KennyTM~ <kennytm@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+'''
+
+This module generates the fixtures of :mod:`benchmarks.fixtures` in a
+temporary directory, times each benchmark case, and writes the results as
+JSON. Run it from the root of the repository::
+
+    python3 -m benchmarks.run -o before.json
+    git checkout my-branch
+    python3 -m benchmarks.run -o after.json --compare before.json
+
+Since :mod:`macho.features` cannot be turned off once enabled, every case runs
+in a fresh process with only the features it needs.
+
+The JSON output is an object with keys:
+
+* ``'meta'`` (Python version, platform, git revision and date)
+* ``'params'`` (the fixture parameters)
+* ``'results'`` (an object from case name to its timings: ``'min'``,
+  ``'median'`` and ``'mean'`` seconds per call, the number of ``'calls'`` per
+  repeat, the number of ``'repeat'``\\ s, and the number of ``'ops'`` (e.g.
+  addresses converted) per call)
+
+Members
+-------
+
+'''
+
+from .fixtures import makeMachO, makeSharedCache
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+import subprocess
+import platform
+import fnmatch
+import timeit
+import time
+import json
+import sys
+import os
+
+
+_cases = []
+
+def case(name, features=()):
+    '''Decorator to register a benchmark case. The decorated function is
+    called as ``setup(paths, params)`` after the *features* are enabled, and
+    should return a tuple of a callable to time and the number of operations
+    it performs.'''
+    def decorator(setup):
+        _cases.append((name, tuple(features), setup))
+        return setup
+    return decorator
+
+
+def _openMachO(paths, params):
+    from macho.macho import MachO
+    machO = MachO(paths['macho'], params['arch'])
+    machO.open()
+    return machO
+
+def _dyldInfo(machO):
+    from macho.loadcommands.loadcommand import LC_DYLD_INFO
+    from macho.utilities import peekStruct
+    lc = machO.loadCommands.any('cmd', LC_DYLD_INFO | 0x80000000) or machO.loadCommands.any1('cmd', LC_DYLD_INFO)
+    return peekStruct(machO.file, machO.makeStruct('10L'), position=lc.offset + machO.origin)
+
+def _sampleAddresses(machO, count):
+    # Spread over all mappings, including some addresses outside of them.
+    mappings = sorted(machO.mappings, key=lambda m: m.address)
+    addresses = []
+    for i in range(count):
+        mapping = mappings[i % len(mappings)]
+        addresses.append(mapping.address + (i * 2654435761) % (mapping.size + mapping.size // 8))
+    return addresses
+
+
+def _setupOpen(paths, params):
+    from macho.macho import MachO
+    (path, arch) = (paths['macho'], params['arch'])
+    def run():
+        with MachO(path, arch):
+            pass
+    return (run, 1)
+
+for _feature in ('none', 'libord', 'vmaddr', 'symbol', 'encryption', 'strings', 'objc', 'all',
+                 'objc.protocols', 'objc.classes', 'objc.categories', 'objc.selrefs'):
+    case('open[{}]'.format(_feature), () if _feature == 'none' else (_feature,))(_setupOpen)
+
+
+@case('open[objc,deferObjC]', ['objc'])
+def _setupOpenDeferred(paths, params):
+    from macho.macho import MachO
+    (path, arch) = (paths['macho'], params['arch'])
+    def run():
+        with MachO(path, arch, deferObjC=True):
+            pass
+    return (run, 1)
+
+
+@case('open[objc,deferObjC]+protocols', ['objc'])
+def _setupOpenDeferredProtocols(paths, params):
+    from macho.macho import MachO
+    (path, arch) = (paths['macho'], params['arch'])
+    def run():
+        with MachO(path, arch, deferObjC=True) as machO:
+            machO.anySectionProperty('className', 'ObjCProtoListSection', 'protocols')
+    return (run, 1)
+
+
+@case('open[headerOnly]')
+def _setupQuickInfo(paths, params):
+    from macho.macho import MachO
+    (path, arch) = (paths['macho'], params['arch'])
+    def run():
+        with MachO(path, arch, headerOnly=True) as machO:
+            machO.quickInfo()
+    return (run, 1)
+
+
+@case('fromVM', ['vmaddr'])
+def _setupFromVM(paths, params):
+    machO = _openMachO(paths, params)
+    addresses = _sampleAddresses(machO, params['lookups'])
+    fromVM = machO.fromVM
+    def run():
+        for vmaddr in addresses:
+            fromVM(vmaddr)
+    return (run, len(addresses))
+
+
+@case('fromVMs', ['vmaddr'])
+def _setupFromVMs(paths, params):
+    machO = _openMachO(paths, params)
+    addresses = _sampleAddresses(machO, params['lookups'])
+    return (lambda: machO.fromVMs(addresses), len(addresses))
+
+
+@case('peekString', ['vmaddr'])
+def _setupPeekString(paths, params):
+    from macho.utilities import peekString
+    machO = _openMachO(paths, params)
+    section = machO.anySection('sectname', '__cstring')
+    f = machO.file
+    content = f[section.offset + machO.origin:section.offset + machO.origin + section.size]
+    positions = []
+    start = 0
+    while start < len(content):
+        positions.append(start + section.offset + machO.origin)
+        start = content.index(b'\0', start) + 1
+    def run():
+        for position in positions:
+            peekString(f, position=position)
+    return (run, len(positions))
+
+
+@case('_bind', ['vmaddr'])
+def _setupBind(paths, params):
+    from macho.loadcommands.dyld_info import _bind
+    machO = _openMachO(paths, params)
+    (_, _, bindOff, bindSize) = _dyldInfo(machO)[:4]
+    def run():
+        machO.seek(bindOff)
+        _bind(machO, bindSize, [])
+    return (run, params['nbinds'])
+
+
+@case('exportTrie', ['vmaddr'])
+def _setupExportTrie(paths, params):
+    from macho.loadcommands.dyld_info import _recursiveProcessExportTrieNode
+    machO = _openMachO(paths, params)
+    (exportOff, exportSize) = _dyldInfo(machO)[8:]
+    exportOff += machO.origin
+    def run():
+        _recursiveProcessExportTrieNode(machO.file, exportOff, exportOff, exportOff + exportSize, '', [])
+    return (run, params['nsymbols'])
+
+
+@case('readClassList', ['objc'])
+def _setupReadClassList(paths, params):
+    from macho.sections.objc._abi2reader import readClassList
+    machO = _openMachO(paths, params)
+    section = machO.anySection('className', 'ObjCClassListSection')
+    addresses = list(section.asPrimitives('^', machO))
+    protoRefsMap = machO.anySectionProperty('className', 'ObjCProtoListSection', 'protocols', default={})
+    return (lambda: readClassList(machO, addresses, protoRefsMap), len(addresses))
+
+
+@case('readClassList[lazy]', ['objc'])
+def _setupReadClassListLazy(paths, params):
+    from macho.sections.objc._abi2reader import readClassList
+    machO = _openMachO(paths, params)
+    section = machO.anySection('className', 'ObjCClassListSection')
+    addresses = list(section.asPrimitives('^', machO))
+    protoRefsMap = machO.anySectionProperty('className', 'ObjCProtoListSection', 'protocols', default={})
+    return (lambda: readClassList(machO, addresses, protoRefsMap, lazy=True), len(addresses))
+
+
+@case('impIndex.build', ['objc'])
+def _setupImpIndexBuild(paths, params):
+    from objc.impindex import ImpIndex
+    machO = _openMachO(paths, params)
+    index = ImpIndex.fromMachO(machO)
+    return (lambda: ImpIndex.fromMachO(machO), len(index))
+
+
+@case('impIndex.describe', ['objc'])
+def _setupImpIndexDescribe(paths, params):
+    from objc.impindex import ImpIndex
+    machO = _openMachO(paths, params)
+    index = ImpIndex.fromMachO(machO)
+    addresses = _sampleAddresses(machO, params['lookups'])
+    def run():
+        describe = index.describe
+        for address in addresses:
+            describe(address)
+    return (run, len(addresses))
+
+
+@case('readProtocolList', ['objc'])
+def _setupReadProtocolList(paths, params):
+    from macho.sections.objc._abi2reader import readProtocolList
+    machO = _openMachO(paths, params)
+    section = machO.anySection('className', 'ObjCProtoListSection')
+    addresses = list(section.asPrimitives('^', machO))
+    return (lambda: readProtocolList(machO, addresses), len(addresses))
+
+
+@case('sharedCache.protocols', ['objc'])
+def _setupCacheProtocols(paths, params):
+    from macho.sharedcache import DyldSharedCache
+    from macho.sections.objc._abi2reader import readProtocolList
+    cache = DyldSharedCache(paths['cache'])
+    cache.open()
+    lists = []
+    for image in cache.images:
+        machO = image.machO
+        section = machO.anySection('className', 'ObjCProtoListSection')
+        lists.append((machO, list(section.asPrimitives('^', machO))))
+    def run():
+        cache.protocolRegistry.clear()
+        for machO, addresses in lists:
+            readProtocolList(machO, addresses)
+    return (run, sum(len(addresses) for _, addresses in lists))
+
+
+@case('sharedCache.open')
+def _setupCacheOpen(paths, params):
+    from macho.sharedcache import DyldSharedCache
+    path = paths['cache']
+    def run():
+        with DyldSharedCache(path):
+            pass
+    return (run, 1)
+
+
+@case('sharedCache.imageByName')
+def _setupCacheImageByName(paths, params):
+    from macho.sharedcache import DyldSharedCache
+    cache = DyldSharedCache(paths['cache'])
+    cache.open()
+    names = [os.path.basename(p) for p in params['imagePaths']]
+    def run():
+        cache.open()
+        any1 = cache.images.any1
+        for name in names:
+            any1('name', name)
+    return (run, len(names))
+
+
+@case('sharedCache.imageContaining')
+def _setupCacheImageContaining(paths, params):
+    from macho.sharedcache import DyldSharedCache
+    cache = DyldSharedCache(paths['cache'])
+    cache.open()
+    mapping = min(cache.mappings, key=lambda m: m.address)
+    addresses = [mapping.address + (i * 2654435761) % mapping.size for i in range(params['lookups'])]
+    def run():
+        cache.open()
+        for address in addresses:
+            cache.imageContaining(address)
+    return (run, len(addresses))
+
+
+
+def _time(func, repeat, minTime):
+    # Choose the number of calls per repeat so that each takes at least
+    # *minTime* seconds, like timeit's command line interface does.
+    timer = timeit.Timer(func)
+    calls = 1
+    while True:
+        elapsed = timer.timeit(calls)
+        if elapsed >= minTime:
+            break
+        calls = max(calls * 2, int(calls * minTime / max(elapsed, 1e-9) * 1.1))
+    timings = sorted(t / calls for t in timer.repeat(repeat, calls))
+    return {
+        'min': timings[0],
+        'median': timings[len(timings) // 2],
+        'mean': sum(timings) / len(timings),
+        'calls': calls,
+        'repeat': repeat,
+    }
+
+
+def _runCase(index, paths, params, repeat, minTime):
+    import macho.features
+    (name, features, setup) = _cases[index]
+    macho.features.enable(*features)
+    (func, ops) = setup(paths, params)
+    res = _time(func, repeat, minTime)
+    res['ops'] = ops
+    res['features'] = list(features)
+    return res
+
+
+def runCases(paths, params, patterns=None, repeat=5, minTime=0.2, log=None):
+    '''Run the registered cases whose names match any of the glob *patterns*
+    (all cases if ``None``) against the fixtures in *paths*. Returns a
+    dictionary from case name to timings.'''
+
+    context = get_context('spawn')
+    results = {}
+    for index, (name, _, _) in enumerate(_cases):
+        if patterns and not any(fnmatch.fnmatchcase(name, p) for p in patterns):
+            continue
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(_runCase, (index, paths, params, repeat, minTime))
+        if log:
+            log(name, results[name])
+    return results
+
+
+def makeFixtures(directory, params):
+    '''Generate the fixtures in *directory*, and return a dictionary of their
+    paths. *params* is updated with derived values.'''
+    builderArgs = {k: params[k] for k in ('nsymbols', 'nstrings', 'nclasses', 'nmethods', 'nbinds', 'nsections', 'is64bit', 'relativeMethods', 'nprotocols')}
+    paths = {
+        'macho': os.path.join(directory, 'synthetic.dylib'),
+        'cache': os.path.join(directory, 'dyld_shared_cache_synthetic'),
+    }
+    params['machOSize'] = makeMachO(paths['macho'], **builderArgs)
+    imageArgs = dict(builderArgs, nsymbols=params['nsymbols'] // 10, nstrings=params['nstrings'] // 10, nclasses=params['nclasses'] // 10, nbinds=params['nbinds'] // 10)
+    params['imagePaths'] = makeSharedCache(paths['cache'], params['nimages'], selectorBase=params['selectorBase'], **imageArgs)
+    params['arch'] = 'arm64' if params['is64bit'] else 'armv7'
+    return paths
+
+
+def _metadata():
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                           cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'revision': revision,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(results, baseline):
+    '''Return lines comparing the min timings of *results* against those of
+    *baseline* (both are the ``'results'`` object of the JSON output).'''
+    lines = []
+    for name, res in results.items():
+        if name in baseline:
+            ratio = res['min'] / baseline[name]['min']
+            lines.append('{:<32} {:>12.3f} us {:>12.3f} us {:>8.2f}x'.format(name, baseline[name]['min'] * 1e6, res['min'] * 1e6, ratio))
+    return lines
+
+
+def main(argv=None):
+    '''Entry point of the command line interface.'''
+
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog='python3 -m benchmarks.run', description='Benchmark the Mach-O parser against synthetic fixtures.')
+    parser.add_argument('pattern', nargs='*', help='only run cases matching these glob patterns')
+    parser.add_argument('-o', '--output', default='-', help='JSON output file (default: stdout)')
+    parser.add_argument('-c', '--compare', help='JSON output of an earlier run to compare with')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of repeats of each case')
+    parser.add_argument('-t', '--min-time', type=float, default=0.2, help='minimum seconds of each repeat')
+    parser.add_argument('--symbols', type=int, default=5000, help='number of exported symbols')
+    parser.add_argument('--strings', type=int, default=5000, help='number of C strings')
+    parser.add_argument('--classes', type=int, default=500, help='number of ObjC classes')
+    parser.add_argument('--protocols', type=int, default=50, help='number of ObjC protocols')
+    parser.add_argument('--methods', type=int, default=10, help='number of methods of each ObjC class')
+    parser.add_argument('--binds', type=int, default=5000, help='number of bind opcodes')
+    parser.add_argument('--sections', type=int, default=16, help='number of extra sections')
+    parser.add_argument('--images', type=int, default=50, help='number of images in the shared cache')
+    parser.add_argument('--lookups', type=int, default=10000, help='number of addresses to look up')
+    parser.add_argument('--64', dest='is64bit', action='store_true', help='generate 64-bit fixtures')
+    parser.add_argument('--relative-methods', action='store_true', help='generate relative method lists')
+    parser.add_argument('--selector-base', action='store_true', help='use selector offsets from a base address in the shared cache')
+    args = parser.parse_args(argv)
+
+    params = {
+        'nsymbols': args.symbols,
+        'nstrings': args.strings,
+        'nclasses': args.classes,
+        'nmethods': args.methods,
+        'nprotocols': args.protocols,
+        'nbinds': args.binds,
+        'nsections': args.sections,
+        'nimages': args.images,
+        'lookups': args.lookups,
+        'is64bit': args.is64bit,
+        'relativeMethods': args.relative_methods,
+        'selectorBase': args.selector_base,
+    }
+
+    def log(name, res):
+        print('{:<32} {:>12.3f} us/call {:>10.3f} us/op'.format(name, res['min'] * 1e6, res['min'] * 1e6 / max(res['ops'], 1)), file=sys.stderr)
+
+    with TemporaryDirectory(prefix='macho-bench-') as directory:
+        paths = makeFixtures(directory, params)
+        results = runCases(paths, params, args.pattern, args.repeat, args.min_time, log)
+
+    params.pop('imagePaths')
+    output = {'meta': _metadata(), 'params': params, 'results': results}
+    if args.output == '-':
+        json.dump(output, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        print('{:<32} {:>15} {:>15} {:>9}'.format('case', 'baseline', 'current', 'ratio'), file=sys.stderr)
+        for line in compare(results, baseline):
+            print(line, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
+
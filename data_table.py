@@ -111,6 +111,27 @@ class DataTable(Sequence, Sized):
                 else:
                     col[key] = [value]
     
+    def associateMany(self, colName, valuesAndKeys):
+        '''Associate many values to keys in a single pass. *valuesAndKeys*
+        should be an iterable of (value, key) tuples::
+        
+            dt.associateMany('color', [(red_square, 'red'), (blue_pentagon, 'blue')])
+        
+        Like :meth:`associate`, the values will not be appended to the data
+        table.
+        '''
+        
+        (isUnique, col) = self._columns[colName]
+        if isUnique:
+            col.update((key, value) for value, key in valuesAndKeys)
+        else:
+            list_append = list.append
+            for value, key in valuesAndKeys:
+                if key in col:
+                    list_append(col[key], value)
+                else:
+                    col[key] = [value]
+    
     
 #    def removeMany(self, values):
 #        '''Remove a large set (preferred) or sequence of *values* from the data
@@ -316,6 +337,10 @@ if __name__ == '__main__':
     assert dt.all('color', 'green') == ['g3', 'w7']
     assert dt.all('color', 'yellow') == ['w7']
     assert dt.all('color', 'blue') == ['b4']
+    dt.associateMany('color', [('r3', 'purple'), ('b4', 'purple'), ('g3', 'blue')])
+    assert dt.all('color', 'purple') == ['r3', 'b4']
+    assert dt.all('color', 'blue') == ['b4', 'g3']
+    assert len(dt) == 6
     
     
 #    dt.removeMany(['r3', 'r5', 'r7'])
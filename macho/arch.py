@@ -17,6 +17,7 @@
 #    
 
 import re
+from functools import lru_cache
 
 
 class InvalidArchError(Exception):
@@ -103,7 +104,12 @@ class Arch(object):
       "armv5": ( 12, 7),
       "xscale": ( 12, 8),
       "armv6": ( 12, 6) ,
-      "armv7": ( 12, 9)
+      "armv7": ( 12, 9) ,
+      "armv7s": ( 12, 11) ,
+      "armv7k": ( 12, 12) ,
+      "arm64": ( 12 | 0x1000000, 0) ,
+      "arm64e": ( 12 | 0x1000000, 2) ,
+      "x86_64h": ( 7 | 0x1000000, 8)
     }
     
     __revArchs = dict((y,x) for x,y in __archs.items())
@@ -134,7 +140,7 @@ class Arch(object):
             if m is None:
                 raise InvalidArchError(arch)
             else:
-                (self.cputype, self.cpusubtype) = m.groups()
+                (self.cputype, self.cpusubtype) = map(int, m.groups())
 
     
     
@@ -244,48 +250,7 @@ class Arch(object):
         app compiled to *other* arch, on a CPU with the *self* arch.
         """
         
-        # score = areaOf(self - other) + big_value * areaOf(1 - self * other)
-        
-        if not isinstance(other, Arch):
-            other = Arch(other)
-        
-        if self.cputype >= 0 and other.cputype >= 0:
-            if self.cputype != other.cputype:
-                return 0xffffffff
-            elif self.cpusubtype == other.cpusubtype:    # armv6 runs armv6
-                return 0
-            elif self.cpusubtype <= 0:                    # arm runs armv6
-                return 0x1000000 - other.cpusubtype
-            elif other.cpusubtype <= 0:                    # armv6 runs arm
-                return 0x1000000 + self.cpusubtype
-            elif self.cpusubtype > other.cpusubtype:    # armv6 runs armv4t
-                return 0x2000000 + self.cpusubtype - other.cpusubtype
-            else:                                        # armv6 runs armv7
-                return 0x4000000 + other.cpusubtype - self.cpusubtype
-        
-        elif self.cputype < 0:
-            if self.cpusubtype not in (0, 1):
-                if other.cputype >= 0:                # any runs armv6
-                    return 0x3000000
-                elif other.cpusubtype in (0, 1):    # any runs big
-                    return 0x3000003
-                else:                                # any runs any
-                    return 0x3000001
-            else:
-                if other.cputype >= 0:                    # big runs armv6 
-                    return 0x5000002
-                if other.cpusubtype == self.cpusubtype:    # big runs big
-                    return 0x3000002
-                elif other.cpusubtype in (0, 1):        # big runs little
-                    return 0xffffffff
-                else:                                    # big runs any
-                    return 0x3000005
-        
-        elif other.cputype < 0:
-            if other.cpusubtype in (0, 1):    # armv6 runs big
-                return 0x5000001
-            else:                            # armv6 runs any
-                return 0x3000004
+        return _matchScore(self.cputype, self.cpusubtype, *_typeAndSubtype(other))
         
     def bestMatch(self, others, minLevel=0xffffffff):
         '''Find the best match among a list of other architectures.
@@ -323,7 +288,107 @@ class Arch(object):
                 bestScore = score
                 best = other
         return best
+    
+    def rank(self, others, minLevel=0xffffffff):
+        '''Sort the architectures in the iterable *others* by their match
+        scores, the best match first. Architectures with a score not less than
+        *minLevel* are dropped.
+        
+        >>> Arch('armv7').rank(['i386', 'armv6', 'armv7', 'x86_64'])
+        ['armv7', 'armv6']
+        
+        '''
+        self_match = self.match
+        scored = [(self_match(other), i, other) for i, other in enumerate(others)]
+        scored.sort()
+        return [other for score, _, other in scored if score < minLevel]
+    
+    def bestMatches(self, othersList, minLevel=0xffffffff):
+        '''Find the best match among each iterable of architectures in
+        *othersList*, e.g. the archs of many fat files. Returns a list of the
+        best matches, with ``None`` for an iterable having no match.
+        
+        This is equivalent to calling :meth:`bestMatch` on each iterable, but
+        every distinct architecture is scored only once.
+        '''
+        self_match = self.match
+        scores = {}
+        res = []
+        for others in othersList:
+            bestScore = minLevel
+            best = None
+            for other in others:
+                if other in scores:
+                    score = scores[other]
+                else:
+                    score = scores[other] = self_match(other)
+                if score < bestScore:
+                    bestScore = score
+                    best = other
+            res.append(best)
+        return res
             
+
+
+@lru_cache(maxsize=None)
+def _parsedTypeAndSubtype(arch):
+    a = Arch(arch)
+    return (a.cputype, a.cpusubtype)
+
+def _typeAndSubtype(arch):
+    '''Get the (cputype, cpusubtype) of anything convertible to :class:`Arch`.
+    Names and tuples are parsed only once.'''
+    if isinstance(arch, Arch):
+        return (arch.cputype, arch.cpusubtype)
+    else:
+        return _parsedTypeAndSubtype(arch)
+
+
+@lru_cache(maxsize=None)
+def _matchScore(selfCputype, selfCpusubtype, otherCputype, otherCpusubtype):
+    '''Compute the match score given the CPU types and subtypes of the two
+    architectures. See :meth:`Arch.match` for detail. The scores are cached.'''
+    
+    # score = areaOf(self - other) + big_value * areaOf(1 - self * other)
+    
+    if selfCputype >= 0 and otherCputype >= 0:
+        if selfCputype != otherCputype:
+            return 0xffffffff
+        elif selfCpusubtype == otherCpusubtype:     # armv6 runs armv6
+            return 0
+        elif selfCpusubtype <= 0:                   # arm runs armv6
+            return 0x1000000 - otherCpusubtype
+        elif otherCpusubtype <= 0:                  # armv6 runs arm
+            return 0x1000000 + selfCpusubtype
+        elif selfCpusubtype > otherCpusubtype:      # armv6 runs armv4t
+            return 0x2000000 + selfCpusubtype - otherCpusubtype
+        else:                                       # armv6 runs armv7
+            return 0x4000000 + otherCpusubtype - selfCpusubtype
+    
+    elif selfCputype < 0:
+        if selfCpusubtype not in (0, 1):
+            if otherCputype >= 0:                   # any runs armv6
+                return 0x3000000
+            elif otherCpusubtype in (0, 1):         # any runs big
+                return 0x3000003
+            else:                                   # any runs any
+                return 0x3000001
+        else:
+            if otherCputype >= 0:                   # big runs armv6 
+                return 0x5000002
+            if otherCpusubtype == selfCpusubtype:   # big runs big
+                return 0x3000002
+            elif otherCpusubtype in (0, 1):         # big runs little
+                return 0xffffffff
+            else:                                   # big runs any
+                return 0x3000005
+    
+    elif otherCputype < 0:
+        if otherCpusubtype in (0, 1):   # armv6 runs big
+            return 0x5000001
+        else:                           # armv6 runs any
+            return 0x3000004
+
             
 if __name__ == "__main__":
     a = Arch("x86_64")
@@ -366,3 +431,8 @@ if __name__ == "__main__":
     assert xarmv6.bestMatch(['i386', 'armv7', 'x86_64']) == Arch('armv7')
     assert xarmv6.bestMatch(['i386', 'armv7', 'x86_64'], minLevel=0x4000000) is None
     
+    assert Arch('12,9') == Arch('armv7')
+    assert Arch('armv7').rank(['i386', 'armv6', 'armv7', 'x86_64']) == ['armv7', 'armv6']
+    assert xarmv6.rank(['armv7', 'i386'], minLevel=0x4000000) == []
+    assert Arch('armv7').bestMatches([['i386', 'armv6'], ['ppc'], [(12, 9), 'armv6']]) == ['armv6', None, (12, 9)]
+    
@@ -46,12 +46,32 @@ def _enable_strings():
     import macho.sections.cstring
     import macho.sections.cfstring
 
-def _enable_objc():
+def _enable_objc_protocols():
+    _enable_vmaddr()
+    import macho.sections.objc.protolist
+
+def _enable_objc_classes():
     _enable_symbol()
+    _enable_objc_protocols()
     import macho.sections.objc.classlist
-    import macho.sections.objc.protolist
+
+def _enable_objc_categories():
+    _enable_objc_classes()
     import macho.sections.objc.catlist
 
+def _enable_objc_selrefs():
+    _enable_vmaddr()
+    import macho.sections.objc.selrefs
+
+def _enable_objc_classrefs():
+    _enable_symbol()
+    import macho.sections.objc.classrefs
+
+def _enable_objc():
+    _enable_objc_categories()
+    _enable_objc_selrefs()
+    _enable_objc_classrefs()
+
 def _enable_all():
     _enable_symbol()
     _enable_vmaddr()
@@ -66,6 +86,12 @@ __features = {
     'vmaddr': _enable_vmaddr,
     'encryption': _enable_encryption,
     'objc': _enable_objc,
+    'objc.protocols': _enable_objc_protocols,
+    'objc.classes': _enable_objc_classes,
+    'objc.categories': _enable_objc_categories,
+    'objc.selrefs': _enable_objc_selrefs,
+    'objc.classrefs': _enable_objc_classrefs,
+    'objc.deferred': _enable_objc,
     'all': _enable_all,
     'strings': _enable_strings,
 }
@@ -76,33 +102,54 @@ def enable(*features):
     
     Currently, the following features are supported:
     
-    +------------------+-------------------------------------------------+--------------------------------------------+
-    | Feature          | Purpose                                         | Modules imported                           |
-    +==================+=================================================+============================================+
-    | ``'libord'``     | Finding a                                       | :mod:`macho.loadcommands.dylib`            |
-    |                  | :class:`~macho.loadcommands.dylib.DylibCommand` |                                            |
-    |                  | from the library ordinal.                       |                                            |
-    +------------------+-------------------------------------------------+--------------------------------------------+
-    | ``'vmaddr'``     | Convert VM addresses to and from file offsets.  | :mod:`macho.vmaddr`,                       |
-    |                  |                                                 | :mod:`macho.loadcommands.segment`          |
-    +------------------+-------------------------------------------------+--------------------------------------------+
-    | ``'symbol'``     | Retrieve :class:`~sym.Symbol`\s of the file.    | :mod:`macho.symbol`,                       |
-    |                  |                                                 | :mod:`macho.loadcommands.symtab`,          |
-    |                  |                                                 | :mod:`macho.loadcommands.dysymtab`,        |
-    |                  |                                                 | :mod:`macho.loadcommands.dyld_info`,       |
-    |                  |                                                 | :mod:`macho.sections.symbol_ptr`           |
-    +------------------+-------------------------------------------------+--------------------------------------------+
-    | ``'encryption'`` | Checking if a location is encrypted.            | :mod:`macho.loadcommands.encryption_info`  |
-    +------------------+-------------------------------------------------+--------------------------------------------+
-    | ``'strings'``    | Retrieve string constants (as                   | :mod:`macho.sections.cstring`,             |
-    |                  | :class:`~sym.Symbol`\s) of the file.            | :mod:`macho.sections.cfstring`             |
-    +------------------+-------------------------------------------------+--------------------------------------------+
-    | ``'objc'``       | Parse Objective-C structures.                   | :mod:`macho.sections.objc.classlist`,      |
-    |                  |                                                 | :mod:`macho.sections.objc.protolist`,      |
-    |                  |                                                 | :mod:`macho.sections.objc.catlist`         |
-    +------------------+-------------------------------------------------+--------------------------------------------+
-    | ``'all'``        | Turn on all the above features                                                               |
-    +------------------+----------------------------------------------------------------------------------------------+
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | Feature               | Purpose                                         | Modules imported                          |
+    +=======================+=================================================+===========================================+
+    | ``'libord'``          | Finding a                                       | :mod:`macho.loadcommands.dylib`           |
+    |                       | :class:`~macho.loadcommands.dylib.DylibCommand` |                                           |
+    |                       | from the library ordinal.                       |                                           |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'vmaddr'``          | Convert VM addresses to and from file offsets.  | :mod:`macho.vmaddr`,                      |
+    |                       |                                                 | :mod:`macho.loadcommands.segment`         |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'symbol'``          | Retrieve :class:`~sym.Symbol`\s of the file.    | :mod:`macho.symbol`,                      |
+    |                       |                                                 | :mod:`macho.loadcommands.symtab`,         |
+    |                       |                                                 | :mod:`macho.loadcommands.dysymtab`,       |
+    |                       |                                                 | :mod:`macho.loadcommands.dyld_info`,      |
+    |                       |                                                 | :mod:`macho.sections.symbol_ptr`          |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'encryption'``      | Checking if a location is encrypted.            | :mod:`macho.loadcommands.encryption_info` |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'strings'``         | Retrieve string constants (as                   | :mod:`macho.sections.cstring`,            |
+    |                       | :class:`~sym.Symbol`\s) of the file.            | :mod:`macho.sections.cfstring`            |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'objc'``            | Parse Objective-C structures. Same as all the   | :mod:`macho.sections.objc.classlist`,     |
+    |                       | ``'objc.*'`` features below.                    | :mod:`macho.sections.objc.protolist`,     |
+    |                       |                                                 | :mod:`macho.sections.objc.catlist`,       |
+    |                       |                                                 | :mod:`macho.sections.objc.selrefs`,       |
+    |                       |                                                 | :mod:`macho.sections.objc.classrefs`      |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'objc.protocols'``  | Parse Objective-C protocols only.               | :mod:`macho.sections.objc.protolist`      |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'objc.classes'``    | Parse Objective-C classes, and the protocols    | :mod:`macho.sections.objc.classlist`,     |
+    |                       | they adopt.                                     | :mod:`macho.sections.objc.protolist`      |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'objc.categories'`` | Parse Objective-C categories, and the classes   | :mod:`macho.sections.objc.catlist`,       |
+    |                       | and protocols they refer to.                    | :mod:`macho.sections.objc.classlist`,     |
+    |                       |                                                 | :mod:`macho.sections.objc.protolist`      |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'objc.selrefs'``    | Map selector references to selector names.      | :mod:`macho.sections.objc.selrefs`        |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'objc.classrefs'``  | Map class and super class references to class   | :mod:`macho.sections.objc.classrefs`      |
+    |                       | names.                                          |                                           |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'objc.deferred'``   | Same as ``'objc'``. To read the Objective-C     | Same as ``'objc'``                        |
+    |                       | sections of a file only when their content is   |                                           |
+    |                       | first accessed, create its                      |                                           |
+    |                       | :class:`~macho.macho.MachO` with *deferObjC*.   |                                           |
+    +-----------------------+-------------------------------------------------+-------------------------------------------+
+    | ``'all'``             | Turn on all the above features                                                              |
+    +-----------------------+---------------------------------------------------------------------------------------------+
 
     Once a feature is enabled, it cannot be disabled later. Note that some
     features depends on others to work, so turn it on will implicitly import
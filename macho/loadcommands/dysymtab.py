@@ -19,8 +19,10 @@
 from macho.loadcommands.loadcommand import LoadCommand, LC_DYSYMTAB
 from macho.macho import MachOError
 from macho.symbol import Symbol
-from macho.utilities import peekPrimitives, peekStruct, peekStructs
+from macho.utilities import peekStruct, peekStructs
 from struct import Struct
+from array import array
+import sys
 
 import macho.loadcommands.symtab
 
@@ -34,6 +36,14 @@ class DySymtabCommand(LoadCommand):
 	This command also provides access to the indirect symbol table, which is
 	needed when the :class:`~macho.sections.symbol_ptr.SymbolPtrSection`
 	section is analyzed.
+	
+	.. attribute:: indirectsymoff
+	
+		File offset to the indirect symbol table.
+	
+	.. attribute:: nindirectsyms
+	
+		Number of entries in the indirect symbol table.
 	"""
 		
 	def _exrelIter(self, machO, extreloff, count):		
@@ -71,20 +81,34 @@ class DySymtabCommand(LoadCommand):
 		      tocoff,         ntoc,
 		      modtaboff,      nmodtab,
 		      extrefsymoff,   nextrefsyms,
-		 self.indirectsymoff, nindirectsyms,
+		 self.indirectsymoff, self.nindirectsyms,
 		      extreloff,      nextrel,
 		      locreloff,      nlocrel) = peekStruct(machO.file, machO.makeStruct('18L'))
+		self._indirectSymbolTable = None
 		
 		if nextrel:
 			machO.provideAddresses(self._exrelIter(machO, extreloff, nextrel))
 	
 	
+	def indirectSymbolTable(self, machO):
+		'''Get the whole indirect symbol table as an :class:`array.array` of
+		symbol indices. The table is read only once.'''
+		
+		table = self._indirectSymbolTable
+		if table is None:
+			offset = self.indirectsymoff + machO.origin
+			table = array('I')
+			table.frombytes(machO.file[offset:offset + self.nindirectsyms * table.itemsize])
+			if (machO.endian == '>') != (sys.byteorder == 'big'):
+				table.byteswap()
+			self._indirectSymbolTable = table
+		return table
+	
 	def indirectSymbols(self, start, count, machO):
 		'''Get symbol indices from the indirect symbol table, given the *start*
 		index and the *count* of indices to retrieve.'''
 		
-		offset = self.indirectsymoff + start * 4 + machO.origin
-		return peekPrimitives(machO.file, 'L', count, machO.endian, machO.is64bit, position=offset)
+		return self.indirectSymbolTable(machO)[start:start+count]
 		
 
 LoadCommand.registerFactory(LC_DYSYMTAB, DySymtabCommand)
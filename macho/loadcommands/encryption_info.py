@@ -18,7 +18,9 @@
 
 from macho.loadcommands.loadcommand import LoadCommand, LC_ENCRYPTION_INFO
 from macho.macho import MachO
+from macho.utilities import peekStruct
 from monkey_patching import patch
+from bisect import bisect_left
 
 class EncryptionInfoCommand(LoadCommand):
 	"""The encryption info load command. This load command marks a range of file
@@ -42,7 +44,7 @@ class EncryptionInfoCommand(LoadCommand):
 	"""
 
 	def analyze(self, machO):
-		(self.cryptoff, self.cryptsize, self.cryptid) = machO.readFormatStruct('3L')
+		(self.cryptoff, self.cryptsize, self.cryptid) = peekStruct(machO.file, machO.makeStruct('3L'))
 			
 	def __str__(self):
 		return "<EncryptionInfo {}/{:x}>".format(self.cryptid, self.cryptoff)
@@ -54,13 +56,56 @@ class EncryptionInfoCommand(LoadCommand):
 
 LoadCommand.registerFactory(LC_ENCRYPTION_INFO, EncryptionInfoCommand)
 
+def _encryptedIndex(machO):
+	"""Return a tuple of the start offsets and the sorted, merged (start, end)
+	ranges of all encrypted regions. The result is cached once all encryption
+	info commands are analyzed."""
+	
+	index = getattr(machO, '_encryptedIndex', None)
+	if index is None:
+		encCmds = machO.loadCommands.all('className', 'EncryptionInfoCommand')
+		analyzedCmds = [lc for lc in encCmds if hasattr(lc, 'cryptid')]
+		
+		ranges = []
+		for start, end in sorted((lc.cryptoff, lc.cryptoff + lc.cryptsize) for lc in analyzedCmds if lc.cryptid and lc.cryptsize):
+			if ranges and start <= ranges[-1][1]:
+				if end > ranges[-1][1]:
+					ranges[-1] = (ranges[-1][0], end)
+			else:
+				ranges.append((start, end))
+		
+		index = ([start for start, _ in ranges], ranges)
+		if len(analyzedCmds) == len(encCmds):
+			machO._encryptedIndex = index
+	
+	return index
+
+
 @patch
 class MachO_EncryptionPatches(MachO):
-	"""This patch defines a single convenient function :meth:`encrypted` which
-	can check if a file offset is encrypted."""
+	"""This patch defines convenient functions which can check if a file offset
+	or a range of file offsets is encrypted.
+	
+	.. attribute:: encryptedRanges
+	
+		A sorted list of non-overlapping (start, end) file offset ranges which
+		are encrypted. It is computed once from all
+		:class:`EncryptionInfoCommand`\\s.
+	
+	"""
+	
+	@property
+	def encryptedRanges(self):
+		return _encryptedIndex(self)[1]
+	
+	def isRangeEncrypted(self, start, size):
+		"""Checks if any part of the file offsets from *start* to
+		*start* + *size* is in an encrypted region."""
+		(starts, ranges) = _encryptedIndex(self)
+		i = bisect_left(starts, start + max(size, 1)) - 1
+		return i >= 0 and ranges[i][1] > start
 
 	def encrypted(self, fileoff):
 		"""Checks if the file offset is in any encrypted region."""
-		encCmds = self.loadCommands.all('className', 'EncryptionInfoCommand')
-		return any(lc.encrypted(fileoff) for lc in encCmds)
+		return self.isRangeEncrypted(fileoff, 1)
 
@@ -24,6 +24,8 @@ from macho.sections.section import Section
 from data_table import DataTable
 from monkey_patching import patch
 from macho.vmaddr import Mapping
+from operator import attrgetter
+from bisect import bisect_right
 import struct
 
 class SegmentCommand(LoadCommand):
@@ -88,17 +90,16 @@ class SegmentCommand(LoadCommand):
 	def _analyzeSections(self, machO):
 		# we need to make sure the section is not encrypted.
 		self_sections = self.sections
-		machO_encrypted = getattr(machO, 'encrypted', lambda x: False)
+		machO_isRangeEncrypted = getattr(machO, 'isRangeEncrypted', lambda x, y: False)
 		machO_seek = machO.seek
 		
 		while not all(s.isAnalyzed for s in self_sections):
 			for s in self_sections:
 				if not s.isAnalyzed:
-					offset = s.offset
-					if s.isZeroFill or machO_encrypted(offset):
+					if s.isZeroFill or machO_isRangeEncrypted(s.offset, s.size):
 						s.isAnalyzed = True
 					else:
-						machO_seek(offset)
+						machO_seek(s.offset)
 						s.isAnalyzed = not s.analyze(self, machO)
 		
 		self._hasAnalyzedSections = True
@@ -133,7 +134,7 @@ class SegmentCommand(LoadCommand):
 				
 	
 	def __str__(self):
-		return "<Segment: {} [{}]>".format(self.segname, ', '.join(map(str, self._sections.values())))
+		return "<Segment: {} [{}]>".format(self.segname, ', '.join(map(str, self.sections)))
 
 
 	
@@ -142,17 +143,45 @@ LoadCommand.registerFactory(LC_SEGMENT, SegmentCommand)
 LoadCommand.registerFactory(LC_SEGMENT_64, SegmentCommand)
 
 
+def _sectionIndex(machO):
+	"""Return a tuple of (segments keyed by name, a
+	:class:`~data_table.DataTable` of all sections, the sorted start addresses
+	of the sections, and the sections sorted by address). The result is cached
+	once all segments have loaded their sections."""
+	
+	index = getattr(machO, '_sectionIndex', None)
+	if index is None:
+		segments = {}
+		sections = DataTable('className', 'sectname', 'ftype', 'segsect')
+		isComplete = True
+		
+		for seg in machO.loadCommands.all('className', 'SegmentCommand'):
+			if not hasattr(seg, 'sections'):
+				isComplete = False
+				continue
+			segments.setdefault(seg.segname, seg)
+			for sect in seg.sections:
+				sections.append(sect, className=type(sect).__name__, sectname=sect.sectname, ftype=sect.ftype, segsect=(sect.segname, sect.sectname))
+		
+		sortedSections = sorted((sect for sect in sections if sect.size), key=attrgetter('addr'))
+		index = (segments, sections, [sect.addr for sect in sortedSections], sortedSections)
+		if isComplete:
+			machO._sectionIndex = index
+	
+	return index
+
+
 @patch
 class MachO_SegmentCommandPatches(MachO):
 	"""This patch to the :class:`~macho.macho.MachO` class defines several
-	methods that operate over all segments."""
+	methods that operate over all segments.
+	
+	These methods share an index of all segments and sections, which is built
+	once all segments are loaded."""
 
 	def segment(self, segname):
 		"""Find a :class:`SegmentCommand` with the specified *segname*."""
-		for segment in self.loadCommands.all('className', 'SegmentCommand'):
-			if segment.segname == segname:
-				return segment
-		return None
+		return _sectionIndex(self)[0].get(segname)
 
 		
 	def allSections(self, idtype, sectid):
@@ -171,18 +200,17 @@ class MachO_SegmentCommandPatches(MachO):
 		| ``'ftype'``     | Numerical value for the section type, e.g.           |
 		|                 | :const:`~macho.sections.section.S_CSTRING_LITERALS`. |
 		+-----------------+------------------------------------------------------+
+		| ``'segsect'``   | A tuple of segment name and section name, e.g.       |
+		|                 | ``('__TEXT', '__cstring')``.                         |
+		+-----------------+------------------------------------------------------+
 		'''
 		
-		for seg in self.loadCommands.all('className', 'SegmentCommand'):
-			for sect in seg.sections.all(idtype, sectid):
-				yield sect
+		return iter(_sectionIndex(self)[1].all(idtype, sectid))
 
 	def anySection(self, idtype, sectid):
 		'''Get any :class:`~macho.sections.section.Section` having the specified
 		section identifier. Returns ``None`` if no such section exists.'''
-		for sect in self.allSections(idtype, sectid):
-			return sect
-		return None
+		return _sectionIndex(self)[1].any(idtype, sectid)
 	
 	def anySectionProperty(self, idtype, sectid, prop, default=None):
 		"""Retrieve a the section, and returns its property *prop* if exists. 
@@ -197,3 +225,14 @@ class MachO_SegmentCommandPatches(MachO):
 			return None
 		else:
 			return getattr(s, prop)
+	
+	def sectionContaining(self, vmaddr):
+		"""Find the :class:`~macho.sections.section.Section` which contains the
+		VM address *vmaddr*. Returns ``None`` if no such section exists."""
+		(_, _, starts, sortedSections) = _sectionIndex(self)
+		i = bisect_right(starts, vmaddr) - 1
+		if i >= 0:
+			sect = sortedSections[i]
+			if vmaddr < sect.addr + sect.size:
+				return sect
+		return None
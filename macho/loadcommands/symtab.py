@@ -32,7 +32,12 @@ class SymtabCommand(LoadCommand):
 		symtabStruct = machO.makeStruct('4L')
 		nlistStruct = machO.makeStruct('LBBH^')
 		
-		(symoff, nsyms, stroff, _) = peekStruct(machO.file, symtabStruct)
+		(symoff, nsyms, stroff, strsize) = peekStruct(machO.file, symtabStruct)
+		
+		# Both tables are read from start to end. Ask the kernel to read them
+		# ahead in bulk instead of faulting the pages one at a time.
+		machO.advise('willneed', symoff, nsyms * nlistStruct.size)
+		machO.advise('willneed', stroff, strsize)
 		
 		# Get all nlist structs
 		origin = machO.origin
@@ -32,11 +32,12 @@ Members
 
 from .arch import Arch
 from factory import factory
-from .utilities import readStruct, makeStruct
+from .utilities import peekStruct, peekStructs, makeStruct, fromStringz, advise
 from struct import Struct
-from .loadcommands.loadcommand import LoadCommand
+from .loadcommands.loadcommand import LoadCommand, LC_UUID, LC_SEGMENT, LC_SEGMENT_64, LC_LOAD_DYLIB, LC_ID_DYLIB, LC_LOAD_WEAK_DYLIB, LC_REEXPORT_DYLIB, LC_LAZY_LOAD_DYLIB, LC_LOAD_UPWARD_DYLIB
 from mmap import mmap, ACCESS_READ
 from data_table import DataTable
+from concurrent.futures import ThreadPoolExecutor
 import os
 
 class MachOError(Exception):
@@ -47,6 +48,66 @@ class MachOError(Exception):
         return self.message
 
 
+def _readFatSlices(file, origin):
+    '''Read the fat header at *origin* and return a list of (arch, offset,
+    size) tuples. Returns ``None`` if the file is not fat.'''
+    (magic, nfat_arch) = peekStruct(file, Struct('>2L'), position=origin)
+    if magic != 0xcafebabe:
+        return None
+    fatArchs = peekStructs(file, Struct('>5L'), nfat_arch, position=origin+8)
+    return [(Arch((cputype, cpusubtype)), offset, size) for (cputype, cpusubtype, offset, size, _) in fatArchs]
+
+
+def _readSlices(file, origin):
+    '''Like :func:`_readFatSlices`, but returns a single slice covering the
+    whole file if it is not fat.'''
+    slices = _readFatSlices(file, origin)
+    if slices is None:
+        (magic, ) = peekStruct(file, Struct('<L'), position=origin)
+        if magic in (0xfeedface, 0xfeedfacf):
+            endian = '<'
+        elif magic in (0xcefaedfe, 0xcffaedfe):
+            endian = '>'
+        else:
+            raise MachOError('Invalid magic "0x{:08x}".'.format(magic))
+        (cputype, cpusubtype) = peekStruct(file, Struct(endian + '2L'), position=origin+4)
+        slices = [(Arch((cputype, cpusubtype)), 0, len(file) - origin)]
+    return slices
+
+
+def _pread(fileno, size, offset):
+    '''Read *size* bytes at *offset* of the file descriptor *fileno* without
+    mmapping it. Returns fewer bytes only at the end of file.'''
+    if hasattr(os, 'pread'):
+        chunks = []
+        while size > 0:
+            chunk = os.pread(fileno, size, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+            offset += len(chunk)
+        return b''.join(chunks)
+    else:
+        os.lseek(fileno, offset, os.SEEK_SET)
+        return os.read(fileno, size)
+
+
+def _preadFirstPage(fileno):
+    '''Read the first page of the file descriptor *fileno* with :func:`_pread`.
+    If the file is fat, the read is extended to cover the whole fat arch
+    table, so the result can be passed to :func:`_readFatSlices`.'''
+    buf = _pread(fileno, 4096, 0)
+    if len(buf) >= 8:
+        (magic, nfat_arch) = peekStruct(buf, Struct('>2L'), position=0)
+        if magic == 0xcafebabe and len(buf) < 8 + 20 * nfat_arch:
+            buf = _pread(fileno, 8 + 20 * nfat_arch, 0)
+    return buf
+
+
+_dylibCommands = frozenset([LC_LOAD_DYLIB, LC_ID_DYLIB, LC_LOAD_WEAK_DYLIB, LC_REEXPORT_DYLIB, LC_LAZY_LOAD_DYLIB, LC_LOAD_UPWARD_DYLIB])
+
+
 class MachO(object):
     '''The basic class that represents a Mach-O file.
     
@@ -58,6 +119,12 @@ class MachO(object):
     The optional *arch* argument is used if the Mach-O file is fat. The best
     architecture matching *arch* will be chosen on :meth:`open`.
     
+    If *headerOnly* is ``True``, :meth:`open` will only read the header and the
+    load commands with :func:`os.pread`, instead of mmapping the whole file.
+    The :attr:`loadCommands` table is filled but none of the load commands are
+    analyzed, and :attr:`file` stays ``None``. Use :meth:`quickInfo` to get the
+    commonly needed information in this mode.
+    
     .. attribute:: file
     
         The :class:`~mmap.mmap` object of this Mach-O object.
@@ -81,6 +148,31 @@ class MachO(object):
     .. attribute:: is64bit
     
         Return if this Mach-O file is using a 64-bit ABI.
+    
+    .. attribute:: arch
+    
+        The :class:`~macho.arch.Arch` of the opened Mach-O file, as read from
+        its header. This is ``None`` before the file is opened.
+    
+    .. attribute:: headerOnly
+    
+        Whether this object only reads the header and load commands.
+    
+    .. attribute:: prefetchLinkedit
+    
+        Whether the ``__LINKEDIT`` segment is read ahead on :meth:`open`.
+    
+    .. attribute:: deferObjC
+    
+        Whether the Objective-C sections are only read when their content is
+        first accessed, instead of on :meth:`open`. See
+        :class:`~macho.sections.objc.objcsection.ObjCSection`.
+    
+    .. attribute:: headerBytes
+    
+        In header-only mode, the raw bytes of the Mach-O header and all load
+        commands of the chosen architecture, starting at :attr:`origin`.
+        ``None`` otherwise.
 
     .. attribute:: origin
     
@@ -115,17 +207,22 @@ class MachO(object):
     def __exit__(self, exc_type, exc_value, traceback):
         return self.close(exc_type, exc_value, traceback)
 
-    def __init__(self, filename, arch="armv7", lenientArchMatching=False):
+    def __init__(self, filename, arch="armv7", lenientArchMatching=False, headerOnly=False, prefetchLinkedit=False, deferObjC=False):
         from .vmaddr import MappingSet
     
         self.filename = filename
         self._arch = Arch(arch)
         self._lenientArchMatching = lenientArchMatching
+        self.headerOnly = headerOnly
+        self.headerBytes = None
+        self.prefetchLinkedit = prefetchLinkedit
+        self.deferObjC = deferObjC
         
         self.fileno = -1
         self.file = None
         
         self.loadCommands = DataTable('className', 'cmd')
+        self.arch = None
         self.is64bit = False
         self.endian = '<'
         
@@ -164,12 +261,203 @@ class MachO(object):
         
         """
         
-        if self.file is None:
+        if self.headerOnly:
+            if self.headerBytes is None:
+                self.__openHeaderOnly()
+        
+        elif self.file is None:
             flag = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
             fileno = os.open(self.filename, flag)
+            try:
+                file = mmap(fileno, length=0, access=ACCESS_READ)
+                try:
+                    self.openWith(file, 0)
+                except:
+                    self.file = None
+                    file.close()
+                    raise
+            except:
+                os.close(fileno)
+                raise
             self.fileno = fileno
-            file = mmap(fileno, length=0, access=ACCESS_READ)
-            self.openWith(file, 0)
+    
+    def __openHeaderOnly(self):
+        flag = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+        fileno = os.open(self.filename, flag)
+        try:
+            # The fat header and the load commands of most files fit in the
+            # first page, so usually only 2 reads are needed.
+            buf = _preadFirstPage(fileno)
+            slices = _readFatSlices(buf, 0)
+            if slices is not None:
+                self.openHeaderWith(fileno, self.__pickArch(slices))
+            else:
+                self.__readHeaderOnly(fileno, 0, buf)
+        finally:
+            os.close(fileno)
+    
+    def openHeaderWith(self, fileno, offset=0):
+        '''Open the Mach-O file in header-only mode (see *headerOnly*) by
+        reading the header at *offset* of the file descriptor *fileno*. This
+        is like :meth:`openWith`: *fileno* is not closed, and *offset* should
+        be the offset of the slice in a fat file, since the fat header is not
+        read.
+        '''
+        self.close()
+        self.headerOnly = True
+        self.__readHeaderOnly(fileno, offset, _pread(fileno, 4096, offset))
+    
+    def __readHeaderOnly(self, fileno, origin, buf):
+        self.__readMagicFrom(buf)
+        headerSize = 32 if self.is64bit else 28
+        (_, _, _, _, sizeofcmds, _) = peekStruct(buf, self.makeStruct('6L'), position=4)
+        if len(buf) < headerSize + sizeofcmds:
+            buf = _pread(fileno, headerSize + sizeofcmds, origin)
+        if len(buf) < headerSize + sizeofcmds:
+            raise MachOError('Load commands are truncated.')
+        
+        self.origin = origin
+        self.headerBytes = buf
+        self.__readHeaderFrom(buf, 4, origin)
+    
+    def quickInfo(self):
+        '''Return a dictionary of the commonly needed information read from
+        the load commands, without analyzing any of them. The keys are:
+        
+        * ``'arch'`` (the :class:`~macho.arch.Arch`)
+        * ``'is64bit'``
+        * ``'uuid'`` (as a hex string, or ``None`` if there is no ``LC_UUID``)
+        * ``'dylibs'`` (a list of (command name, dylib name) tuples)
+        * ``'segments'`` (a list of dictionaries with keys ``'segname'``,
+          ``'vmaddr'``, ``'vmsize'``, ``'fileoff'``, ``'filesize'``,
+          ``'maxprot'``, ``'initprot'`` and ``'nsects'``)
+        
+        This method works in any mode, but it is designed for objects opened
+        with *headerOnly*. If the object is not opened, the file will be opened
+        temporarily in header-only mode. ::
+        
+            info = MachO('foo.dylib', headerOnly=True).quickInfo()
+        
+        '''
+        
+        if self.headerBytes is None and self.file is None:
+            # Use a separate object, so this one is left unopened.
+            with type(self)(self.filename, self._arch, self._lenientArchMatching, headerOnly=True) as machO:
+                return machO.quickInfo()
+        
+        if self.headerBytes is not None:
+            buf = self.headerBytes
+            base = 0
+        else:
+            buf = self.file
+            base = self.origin
+        
+        dylibStruct = self.makeStruct('L')
+        segStruct = self.makeStruct('16s4^2i2L')
+        uuid = None
+        dylibs = []
+        segments = []
+        
+        for lc in self.loadCommands:
+            cmd = lc.cmd & ~0x80000000
+            position = base + lc.offset
+            if cmd == LC_UUID:
+                uuid = bytes(buf[position:position+16]).hex()
+            elif cmd in _dylibCommands:
+                (nameOffset, ) = peekStruct(buf, dylibStruct, position=position)
+                end = position - 8 + lc.size
+                nameBytes = bytes(buf[position - 8 + nameOffset:end])
+                dylibs.append((LoadCommand.cmdname(cmd), nameBytes.split(b'\0', 1)[0].decode('utf_8', 'replace')))
+            elif cmd in (LC_SEGMENT, LC_SEGMENT_64):
+                (segname, vmaddr, vmsize, fileoff, filesize, maxprot, initprot, nsects, _) = peekStruct(buf, segStruct, position=position)
+                segments.append({
+                    'segname': fromStringz(segname),
+                    'vmaddr': vmaddr,
+                    'vmsize': vmsize,
+                    'fileoff': fileoff,
+                    'filesize': filesize,
+                    'maxprot': maxprot,
+                    'initprot': initprot,
+                    'nsects': nsects,
+                })
+        
+        return {
+            'arch': self.arch,
+            'is64bit': self.is64bit,
+            'uuid': uuid,
+            'dylibs': dylibs,
+            'segments': segments,
+        }
+    
+    def slices(self):
+        '''Return a list of (arch, offset, size) tuples, one for every
+        architecture slice in this file, where *arch* is an
+        :class:`~macho.arch.Arch`. A file which is not fat has a single slice
+        starting at offset 0.
+        
+        Only the header is read. If this object is not opened, the file will be
+        opened temporarily.
+        '''
+        
+        if self.file is not None:
+            return _readSlices(self.file, self._fileOrigin)
+        
+        flag = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+        fileno = os.open(self.filename, flag)
+        try:
+            with mmap(fileno, length=0, access=ACCESS_READ) as file:
+                return _readSlices(file, 0)
+        finally:
+            os.close(fileno)
+    
+    @classmethod
+    def openSlices(cls, filename, workers=None):
+        '''Open every architecture slice of the file *filename*, and return a
+        list of opened :class:`MachO` objects in the order of :meth:`slices`.
+        The :attr:`arch` attribute tells which slice an object represents.
+        
+        The file is opened once, and the slices are analyzed with a pool of
+        *workers* threads. The analysis is pure Python, so the threads only
+        overlap I/O and give no speed-up under the GIL. Every object still gets
+        its own :class:`~mmap.mmap` of the shared file descriptor, since
+        analysis moves the cursor. Each returned object needs to be closed
+        individually. If any slice fails to open, the slices already opened
+        are closed before the exception is re-raised.
+        '''
+        
+        flag = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+        fileno = os.open(filename, flag)
+        
+        def openSlice(slice):
+            mo = cls(filename, slice[0])
+            sliceFileno = os.dup(fileno)
+            try:
+                file = mmap(sliceFileno, length=0, access=ACCESS_READ)
+                try:
+                    mo.openWith(file, 0)
+                except:
+                    file.close()
+                    raise
+            except:
+                os.close(sliceFileno)
+                raise
+            mo.fileno = sliceFileno
+            return mo
+        
+        try:
+            with mmap(fileno, length=0, access=ACCESS_READ) as file:
+                slices = _readSlices(file, 0)
+            with ThreadPoolExecutor(workers) as executor:
+                futures = [executor.submit(openSlice, slice) for slice in slices]
+            try:
+                return [future.result() for future in futures]
+            except:
+                for future in futures:
+                    if future.exception() is None:
+                        future.result().close()
+                raise
+        finally:
+            os.close(fileno)
     
     
     def close(self, exc_type=None, exc_value=None, traceback=None):
@@ -181,6 +469,7 @@ class MachO(object):
         """
         
         self.origin = None
+        self.headerBytes = None
         if self.fileno >= 0:
             if self.file is not None:
                 self.file.close()
@@ -197,6 +486,12 @@ class MachO(object):
         """Get the current file offset, factoring out the :attr:`origin`."""
         return self.file.tell() - self.origin
 
+    def advise(self, advice, offset=0, length=-1):
+        """Tell the kernel how the *length* bytes at the file offset *offset*
+        will be accessed, factoring out the :attr:`origin`. See
+        :func:`macho.utilities.advise` for detail."""
+        advise(self.file, advice, offset + self.origin, length)
+
     def makeStruct(self, fmt):
         """Create a :class:`~struct.Struct` object. See
         :func:`macho.utilities.makeStruct` for detail."""
@@ -209,22 +504,25 @@ class MachO(object):
         self.__pickArchFromFatFile()
         self.__readMagic()
         self.__readHeader()
+        if self.prefetchLinkedit:
+            self.__prefetchLinkedit()
         self.__analyzeLoadCommands()
         self.mappings.freeze()
         
     def __pickArchFromFatFile(self):
-        (magic, nfat_arch) = readStruct(self.file, Struct('>2L'))
+        slices = _readFatSlices(self.file, self._fileOrigin)
         
         # Reset and return if not a fat file.
-        if magic != 0xcafebabe:
+        if slices is None:
             self.file.seek(self._fileOrigin)
             return
         
+        # Jump to offset if best match is found.
+        self.file.seek(self.__pickArch(slices))
+    
+    def __pickArch(self, slices):
         # Get all the possible fat archs.
-        offsets = {}
-        for i in range(nfat_arch):
-            (cputype, cpusubtype, offset, _, _) = readStruct(self.file, Struct('>5L'))
-            offsets[Arch((cputype, cpusubtype))] = offset
+        offsets = dict((arch, offset) for arch, offset, _ in slices)
         
         # Find the best match.
         scoreLimit = 0x4000000 if not self._lenientArchMatching else 0x6000000
@@ -234,12 +532,15 @@ class MachO(object):
         if bestMatch is None:
             raise MachOError('Cannot find an arch matching "{}". Available archs are: {}'.format(self._arch, ', '.join(map(str, offsets.keys())) ))
         
-        # Jump to offset if best match is found.
-        self.file.seek(offsets[bestMatch])
+        return offsets[bestMatch]
         
     def __readMagic(self):
         self.origin = self.file.tell() - self._fileOrigin
-        (magic, ) = readStruct(self.file, Struct('<L'))
+        self.__readMagicFrom(self.file, self.file.tell())
+        self.file.seek(4, os.SEEK_CUR)
+    
+    def __readMagicFrom(self, buf, position=0):
+        (magic, ) = peekStruct(buf, Struct('<L'), position=position)
         if magic == 0xfeedface:
             self.endian = '<'
         elif magic == 0xcefaedfe:
@@ -254,18 +555,24 @@ class MachO(object):
             raise MachOError('Invalid magic "0x{:08x}".'.format(magic))
     
     def __readHeader(self):
+        end = self.__readHeaderFrom(self.file, self.file.tell(), 0)
+        self.file.seek(end)
+    
+    def __readHeaderFrom(self, buf, position, bufferOffset):
+        # *position* is where the header (after the magic) starts in *buf*, and
+        # *bufferOffset* is the file offset of *buf*.
         headerStruct = self.makeStruct('6L~')
         cmdStruct = self.makeStruct('2L')
         
         self_loadCommands_append = self.loadCommands.append
-        self_file_seek = self.file.seek
-        self_tell = self.tell
         LoadCommand_create = LoadCommand.create
-        LoadCommand_cmdname = LoadCommand.cmdname
     
         # Read the header.
-        (cputype, cpusubtype, _, ncmds, _, _) = readStruct(self.file, headerStruct)
+        (cputype, cpusubtype, _, ncmds, _, _) = peekStruct(buf, headerStruct, position=position)
+        position += headerStruct.size
+        lcOffset = bufferOffset - self.origin + 8
         arch = Arch((cputype, cpusubtype))
+        self.arch = arch
         
         # Make sure the CPU type matches.
         scoreLimit = 0x4000000 if not self._lenientArchMatching else 0x6000000
@@ -274,11 +581,25 @@ class MachO(object):
         
         # Read all load commands.
         for i in range(ncmds):
-            (cmd, cmdsize) = readStruct(self.file, cmdStruct)
-            offset = self_tell()
-            lc = LoadCommand_create(cmd & ~0x80000000, cmdsize, offset)
+            (cmd, cmdsize) = peekStruct(buf, cmdStruct, position=position)
+            lc = LoadCommand_create(cmd & ~0x80000000, cmdsize, position + lcOffset)
             self_loadCommands_append(lc, cmd=cmd, className=type(lc).__name__)
-            self_file_seek(cmdsize - 8, os.SEEK_CUR)
+            position += cmdsize
+        
+        return position
+        
+    def __prefetchLinkedit(self):
+        '''Ask the kernel to read the whole ``__LINKEDIT`` segment ahead, so
+        that the symbol tables do not need to be paged in one fault at a time.
+        This helps analyzing files on slow (e.g. network) file systems with a
+        cold cache. Called on :meth:`open` if *prefetchLinkedit* is ``True``.'''
+        
+        segStruct = self.makeStruct('16s4^')
+        for lc in self.loadCommands:
+            if lc.cmd in (LC_SEGMENT, LC_SEGMENT_64):
+                (segname, _, _, fileoff, filesize) = peekStruct(self.file, segStruct, position=lc.offset + self.origin)
+                if fromStringz(segname) == '__LINKEDIT':
+                    self.advise('willneed', fileoff, filesize)
         
     def __analyzeLoadCommands(self):
         # Analyze all load commands.
@@ -0,0 +1,391 @@
+#
+#    scan.py ... Scan a directory tree for Mach-O files
+#    Copyright (C) 2011  KennyTM~ <kennytm@gmail.com>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+'''
+
+This module finds every Mach-O file under a directory, and analyzes them in a
+pool of worker processes. Results are streamed as they complete.
+
+Example usage::
+
+    from macho.scan import Scanner
+
+    scanner = Scanner(features=['libord', 'symbol'], timeout=30)
+    for result in scanner.scan('/Volumes/Jasper8C148.N90OS/System/Library'):
+        print(result['path'], [s['arch'] for s in result.get('slices', [])])
+    print(scanner.stats.asDict())
+
+The module can also be run as a script, printing one JSON object per line::
+
+    python3 -m macho.scan -f libord -f symbol -j 8 --timeout 30 /path/to/sdk > result.jsonl
+
+Members
+-------
+
+'''
+
+from .macho import MachO, _preadFirstPage, _readSlices
+import macho.features
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from struct import unpack
+from mmap import mmap, ACCESS_READ
+import signal
+import time
+import os
+import sys
+import json
+
+
+_machOMagics = frozenset([0xfeedface, 0xcefaedfe, 0xfeedfacf, 0xcffaedfe])
+
+def isMachO(path):
+    '''Checks if the file at *path* is a Mach-O file (thin or fat) from its
+    magic number. Only the first 8 bytes are read.'''
+
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(8)
+    except (IOError, OSError):
+        return False
+    if len(header) < 8:
+        return False
+    (magic, nfat_arch) = unpack('>2L', header)
+    if magic == 0xcafebabe:
+        # Java class files share the same magic, but their major version at
+        # the same place is always at least 45.
+        return 0 < nfat_arch < 45
+    return magic in _machOMagics or unpack('<L', header[:4])[0] in _machOMagics
+
+
+def findMachOs(root, followSymlinks=False):
+    '''Walk the directory tree *root*, and return an iterable of paths to the
+    Mach-O files. Symbolic links are skipped unless *followSymlinks* is
+    ``True``.'''
+
+    for dirpath, dirnames, filenames in os.walk(root, followlinks=followSymlinks):
+        for fn in filenames:
+            path = os.path.join(dirpath, fn)
+            if not followSymlinks and os.path.islink(path):
+                continue
+            if isMachO(path):
+                yield path
+
+
+def summarize(machO):
+    '''Summarize an opened :class:`~macho.macho.MachO` object into a
+    JSON-serializable dictionary. Only the information provided by the enabled
+    :mod:`macho.features` is included.'''
+
+    lcCounts = {}
+    for lc in machO.loadCommands:
+        className = type(lc).__name__
+        lcCounts[className] = lcCounts.get(className, 0) + 1
+
+    res = {
+        'arch': str(machO.arch),
+        'is64bit': machO.is64bit,
+        'loadCommands': lcCounts,
+    }
+
+    lcs_all = machO.loadCommands.all
+    segments = lcs_all('className', 'SegmentCommand')
+    if segments:
+        res['segments'] = [{'name': seg.segname, 'vmaddr': seg.vmaddr} for seg in segments if hasattr(seg, 'vmaddr')]
+
+    dylibs = lcs_all('className', 'DylibCommand')
+    if dylibs:
+        res['dylibs'] = [lc.name for lc in dylibs if hasattr(lc, 'name')]
+
+    if hasattr(machO, 'symbols'):
+        res['symbols'] = len(machO.symbols)
+
+    if hasattr(machO, 'encryptedRanges'):
+        res['encrypted'] = bool(machO.encryptedRanges)
+
+    if hasattr(machO, 'anySection'):
+        for key, className, prop in [('classes', 'ObjCClassListSection', 'classes'),
+                                     ('protocols', 'ObjCProtoListSection', 'protocols'),
+                                     ('categories', 'ObjCCategoryListSection', 'categories')]:
+            value = machO.anySectionProperty('className', className, prop)
+            if value:
+                res[key] = len(value)
+
+    return res
+
+
+class _Timeout(Exception):
+    pass
+
+def _raiseTimeout(signum, frame):
+    raise _Timeout()
+
+def _initWorker(features):
+    macho.features.enable(*features)
+
+def _quickSummarizeSlices(path):
+    # Read the fat header once without mmapping the file, and read the header
+    # of every slice from the same file descriptor.
+    fileno = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        slices = []
+        for (arch, offset, _) in _readSlices(_preadFirstPage(fileno), 0):
+            mo = MachO(path, arch)
+            mo.openHeaderWith(fileno, offset)
+            info = mo.quickInfo()
+            info['arch'] = str(info['arch'])
+            slices.append(info)
+        return slices
+    finally:
+        os.close(fileno)
+
+def _summarizeSlices(path):
+    # Open and mmap the file once. The slices are analyzed one after another
+    # in this thread, so the alarm interrupts the analysis itself, and they
+    # can share the mmap as each one is done before the next moves the cursor.
+    fileno = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        with mmap(fileno, length=0, access=ACCESS_READ) as file:
+            slices = []
+            for (arch, _, _) in _readSlices(file, 0):
+                mo = MachO(path, arch)
+                try:
+                    mo.openWith(file, 0)
+                    slices.append(summarize(mo))
+                finally:
+                    mo.close()
+            return slices
+    finally:
+        os.close(fileno)
+
+def _analyzeFile(path, timeout, quick=False):
+    '''Analyze all slices of the Mach-O file at *path* in a worker process.'''
+
+    useAlarm = timeout and hasattr(signal, 'setitimer')
+    startTime = time.time()
+    res = {'path': path}
+    if useAlarm:
+        signal.signal(signal.SIGALRM, _raiseTimeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        slices = []
+        if quick:
+            slices = _quickSummarizeSlices(path)
+        else:
+            slices = _summarizeSlices(path)
+        res['slices'] = slices
+    except _Timeout:
+        res['error'] = 'timeout'
+    except Exception as e:
+        res['error'] = '{}: {}'.format(type(e).__name__, e)
+    finally:
+        if useAlarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    res['elapsed'] = time.time() - startTime
+    return res
+
+
+class ScanStats(object):
+    '''Throughput statistics of a :class:`Scanner`.
+
+    .. attribute:: files
+
+        Number of Mach-O files dispatched to the workers.
+
+    .. attribute:: completed
+
+        Number of files whose results have been received.
+
+    .. attribute:: errors
+
+        Number of files which failed to be analyzed, including timeouts.
+
+    .. attribute:: timeouts
+
+        Number of files which took longer than the timeout.
+
+    .. attribute:: bytes
+
+        Total size of the files completed.
+
+    .. attribute:: startTime
+
+        The time when the scan started.
+
+    '''
+
+    def __init__(self):
+        self.files = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.bytes = 0
+        self.startTime = time.time()
+
+    @property
+    def elapsed(self):
+        '''Seconds elapsed since the scan started.'''
+        return time.time() - self.startTime
+
+    @property
+    def filesPerSecond(self):
+        '''Number of completed files per second.'''
+        return self.completed / max(self.elapsed, 1e-9)
+
+    @property
+    def bytesPerSecond(self):
+        '''Number of completed bytes per second.'''
+        return self.bytes / max(self.elapsed, 1e-9)
+
+    def asDict(self):
+        '''Convert the statistics into a dictionary.'''
+        return {
+            'files': self.files,
+            'completed': self.completed,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'bytes': self.bytes,
+            'elapsed': self.elapsed,
+            'filesPerSecond': self.filesPerSecond,
+            'bytesPerSecond': self.bytesPerSecond,
+        }
+
+    def __str__(self):
+        return '{} / {} files, {} errors ({} timeouts), {:.1f} files/s, {:.1f} MiB/s'.format(
+            self.completed, self.files, self.errors, self.timeouts, self.filesPerSecond, self.bytesPerSecond / 1048576)
+
+
+class Scanner(object):
+    '''Analyzes many Mach-O files in a pool of *workers* processes.
+
+    Every worker enables the given *features* (see :func:`macho.features.enable`)
+    and opens all architecture slices of each file. If *timeout* is given, a
+    file taking longer than this number of seconds will be abandoned (on
+    platforms supporting :func:`signal.setitimer`).
+
+    At most *maxPending* files are queued to the pool at any time, so that the
+    directory walk never runs too far ahead of the analysis. It defaults to
+    twice the number of workers.
+    
+    If *quick* is ``True``, the *features* are ignored and every slice is
+    summarized by :meth:`~macho.macho.MachO.quickInfo` in header-only mode,
+    which reads only the first page(s) of each file.
+
+    .. attribute:: stats
+
+        The :class:`ScanStats` of the latest scan.
+
+    '''
+
+    def __init__(self, features=(), workers=None, timeout=None, maxPending=None, quick=False):
+        self.features = tuple(features)
+        self.quick = quick
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.maxPending = maxPending or 2 * self.workers
+        self.stats = ScanStats()
+
+    def scan(self, root, followSymlinks=False):
+        '''Find and analyze all Mach-O files under the directory *root*. See
+        :meth:`analyze` for the results.'''
+        return self.analyze(findMachOs(root, followSymlinks))
+
+    def analyze(self, paths):
+        '''Analyze the Mach-O files in the iterable *paths*, and return an
+        iterable of results in order of completion. Each result is a
+        dictionary with keys:
+
+        * ``'path'`` (the path of the file)
+        * ``'slices'`` (a list of :func:`summarize`\\ d architecture slices,
+          or the :meth:`~macho.macho.MachO.quickInfo` of them in quick mode)
+        * ``'error'`` (the error message, only if analysis failed)
+        * ``'elapsed'`` (seconds spent in analyzing this file)
+
+        '''
+
+        stats = self.stats = ScanStats()
+        timeout = self.timeout
+        quick = self.quick
+        maxPending = self.maxPending
+        pending = {}
+
+        def collect(futures):
+            for future in futures:
+                size = pending.pop(future)
+                res = future.result()
+                stats.completed += 1
+                stats.bytes += size
+                if 'error' in res:
+                    stats.errors += 1
+                    if res['error'] == 'timeout':
+                        stats.timeouts += 1
+                yield res
+
+        with ProcessPoolExecutor(self.workers, initializer=_initWorker, initargs=(self.features,)) as executor:
+            for path in paths:
+                while len(pending) >= maxPending:
+                    (done, _) = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from collect(done)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    size = 0
+                pending[executor.submit(_analyzeFile, path, timeout, quick)] = size
+                stats.files += 1
+
+            while pending:
+                (done, _) = wait(pending, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+
+
+def main(argv=None):
+    '''Entry point of the command line interface.'''
+
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(prog='python3 -m macho.scan', description='Analyze every Mach-O file under a directory, and print the results as JSON lines.')
+    parser.add_argument('root', nargs='+', help='directories to scan')
+    parser.add_argument('-f', '--feature', action='append', default=[], help='feature to enable, see macho.features (can be repeated)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes')
+    parser.add_argument('-t', '--timeout', type=float, default=None, help='seconds allowed for each file')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('-p', '--progress', type=float, default=5, help='seconds between progress reports on stderr, 0 to disable')
+    parser.add_argument('-L', '--follow-symlinks', action='store_true', help='follow symbolic links')
+    parser.add_argument('-q', '--quick', action='store_true', help='only read the load commands of each file (ignores --feature)')
+    args = parser.parse_args(argv)
+
+    scanner = Scanner(args.feature, args.jobs, args.timeout, quick=args.quick)
+    paths = (path for root in args.root for path in findMachOs(root, args.follow_symlinks))
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        lastReport = time.time()
+        for res in scanner.analyze(paths):
+            output.write(json.dumps(res) + '\n')
+            if args.progress and time.time() - lastReport >= args.progress:
+                lastReport = time.time()
+                print(scanner.stats, file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(scanner.stats.asDict()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
+
@@ -17,27 +17,55 @@
 #
 
 from macho.sections.section import Section
-from macho.utilities import peekFixedLengthString
 from macho.symbol import Symbol, SYMTYPE_CFSTRING
 import macho.loadcommands.segment	# to ensure macho.macho.fromVM is defined.
 
-def _stringReader(machO, addressesAndLengths):
+_kCFIsUnicode = 0x10
+
+def _stringReader(machO, entries):
+	entries = list(entries)
+	fileoffs = machO.fromVMs(strAddr for _, (_, _, strAddr, _) in entries)
+	
 	origin = machO.origin
-	machO_fromVM = machO.fromVM
 	machO_file = machO.file
-	for addr, (_, _, strAddr, strLen) in addressesAndLengths:
-		fileoff = machO_fromVM(strAddr)
-		string = peekFixedLengthString(machO_file, strLen, position=fileoff+origin)
+	utf16 = 'utf_16_be' if machO.endian == '>' else 'utf_16_le'
+	machO_isRangeEncrypted = getattr(machO, 'isRangeEncrypted', lambda x, y: False)
+	
+	for (addr, (_, flags, _, strLen)), fileoff in zip(entries, fileoffs):
+		if fileoff < 0:
+			continue
+		isUnicode = flags & _kCFIsUnicode
+		if isUnicode:
+			strLen *= 2
+		if machO_isRangeEncrypted(fileoff, strLen):
+			continue
+		position = fileoff + origin
+		if isUnicode:
+			string = machO_file[position:position+strLen].decode(utf16, 'replace')
+		else:
+			string = machO_file[position:position+strLen].decode('latin_1')
 		yield Symbol(string, addr, SYMTYPE_CFSTRING)
 		
 
 class CFStringSection(Section):
-	"""The CoreFoundation string (``__DATA,__cfstring``) section."""
+	"""The CoreFoundation string (``__DATA,__cfstring``) section.
+	
+	All string addresses in this section are translated to file offsets in one
+	batch. Strings are decoded as Latin-1, or UTF-16 if the CFString is flagged
+	as Unicode. Strings in encrypted regions are skipped if the
+	:mod:`macho.loadcommands.encryption_info` module is imported.
+	"""
 	
 	def analyze(self, segment, machO):
-		cfstrStruct = machO.makeStruct('4^')
-		addressesAndLengths = self.asStructs(cfstrStruct, machO, includeAddresses=True)
-		machO.addSymbols(_stringReader(machO, addressesAndLengths))
+		#	struct __NSConstantString {
+		#		Class isa;
+		#		int flags;
+		#		const char *str;
+		#		long length;
+		#	};
+		cfstrStruct = machO.makeStruct('^L~2^')
+		entries = self.asStructs(cfstrStruct, machO, includeAddresses=True)
+		machO.addSymbols(_stringReader(machO, entries))
 
 
 Section.registerFactory('__cfstring', CFStringSection)
@@ -17,23 +17,64 @@
 #
 
 from macho.sections.section import Section, S_CSTRING_LITERALS
-from macho.utilities import readString
+from macho.utilities import peekStrings, advise
 from macho.symbol import SYMTYPE_CSTRING, Symbol
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
-def _stringReader(file, curAddr, final):
-	while curAddr < final:
-		(string, length) = readString(file, returnLength=True)
-		if length:
-			yield Symbol(string, curAddr, SYMTYPE_CSTRING)
-		curAddr += length+1
+def _stringReader(file, addr, position, size):
+	for offset, string in peekStrings(file, size, position=position):
+		yield Symbol(string, addr + offset, SYMTYPE_CSTRING)
+
+def _chunks(file, position, size, chunkSize):
+	"""Split the range into (relative offset, size) chunks, each ending just
+	after a null character (except possibly the last one)."""
+	start = 0
+	while start < size:
+		end = file.find(b'\0', position + start + chunkSize, position + size)
+		end = size if end < 0 else end - position + 1
+		yield (start, end - start)
+		start = end
 
 class CStringSection(Section):
-	"""The C string (``__TEXT,__cstring``) section."""
+	"""The C string (``__TEXT,__cstring``) section.
+	
+	The whole section is split at null characters in one pass. If the section
+	is larger than :attr:`chunkSize` and :attr:`workers` is greater than 1, it
+	will be split into chunks at null boundaries and analyzed in a thread pool.
+	
+	.. attribute:: chunkSize
+	
+		Size of the chunks to split a large section into. It is a class
+		attribute, default to 4 MiB.
+	
+	.. attribute:: workers
+	
+		Number of threads used to analyze the chunks. It is a class attribute,
+		default to 1 (i.e. no thread pool).
+	
+	"""
+	
+	chunkSize = 4 << 20
+	workers = 1
 	
 	def analyze(self, segment, machO):
-		machO.addSymbols(_stringReader(machO.file, self.addr, self.addr + self.size))
+		file = machO.file
+		position = self.offset + machO.origin
+		(addr, size, chunkSize, workers) = (self.addr, self.size, self.chunkSize, self.workers)
+		advise(file, 'sequential', position, size)
+		
+		if workers <= 1 or size <= chunkSize:
+			machO.addSymbols(_stringReader(file, addr, position, size))
+		else:
+			def readChunk(chunk):
+				(start, length) = chunk
+				return list(_stringReader(file, addr + start, position + start, length))
+			
+			with ThreadPoolExecutor(workers) as executor:
+				results = executor.map(readChunk, _chunks(file, position, size, chunkSize))
+				machO.addSymbols(chain.from_iterable(results))
 	
 
 Section.registerFactoryFType(S_CSTRING_LITERALS, CStringSection.byFType)
 
-
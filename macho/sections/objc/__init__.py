@@ -15,4 +15,4 @@
 #	You should have received a copy of the GNU General Public License
 #	along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-__all__ = ['classlist', 'protolist', 'catlist']
+__all__ = ['objcsection', 'classlist', 'protolist', 'catlist', 'selrefs', 'classrefs']
@@ -41,7 +41,7 @@ def methodDescriptionAnalyzer(d):
 	"""Return a function which can convert a ``objc_method_description`` struct
 	into a :class:`~objc.method.Method`.
 	
-	*d* should be set to ``machO.derefString``.
+	*d* should be set to ``machO.derefInternedString``.
 	"""
 	
 	def f(ptrs):
@@ -180,7 +180,7 @@ def analyzeProtocolList(machO, addressesAndProtoTuples):
 	# now do the actual analysis.
 	protos = DataTable('name', '!addr')	# there can be multiple protocols with the same name in ABI 1.0
 	refs = []
-	d = machO.derefString
+	d = machO.derefInternedString
 	analyzer = methodDescriptionAnalyzer(d)
 	for preped, vmaddrs in protoDict.items():
 		protoListPtrs = protoListDict[preped] if preped in protoListDict else []
@@ -198,7 +198,7 @@ def analyzeProtocolList(machO, addressesAndProtoTuples):
 
 def analyzeIvar(machO, ivarTuple):
 	"""Analyze an ``old_ivar`` struct and return an :class:`~objc.ivar.Ivar`."""
-	d = machO.derefString
+	d = machO.derefInternedString
 	name = d(ivarTuple[0])
 	typenc = d(ivarTuple[1])
 	offset = ivarTuple[2]
@@ -208,7 +208,7 @@ def analyzeIvar(machO, ivarTuple):
 def analyzeMethod(machO, methodTuple):
 	"""Analyze an ``old_method`` struct and return a
 	:class:`~objc.method.Method`."""
-	d = machO.derefString
+	d = machO.derefInternedString
 	name = d(methodTuple[0])
 	typenc = d(methodTuple[1])
 	imp = methodTuple[2]
@@ -218,7 +218,7 @@ def analyzeMethod(machO, methodTuple):
 def analyzeProperty(machO, propertyTuple):
 	"""Analyze an ``objc_property`` struct and return a
 	:class:`~objc.property.Property`."""
-	d = machO.derefString
+	d = machO.derefInternedString
 	name = d(propertyTuple[0])
 	attrib = d(propertyTuple[1])
 	return Property(name, attrib)
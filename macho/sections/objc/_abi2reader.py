@@ -28,34 +28,71 @@ Auxiliary module for reading Objective-C ABI 2.0 info.
 
 """
 
-from objc.class_ import Class, RemoteClass
+from objc.class_ import Class, RemoteClass, LazyClass
 from objc.method import Method
 from objc.ivar import Ivar
 from objc.property import Property
 from objc.protocol import Protocol
 from objc.category import Category
-from macho.utilities import readStruct, peekStruct, peekStructs, peekPrimitives
+from macho.utilities import readStruct, peekStruct, peekStructs, peekPrimitives, advise
 from data_table import DataTable
 import macho.vmaddr
 from macho.symbol import Symbol, SYMTYPE_UNDEFINED
 import macho.loadcommands.segment
+from functools import partial
+from operator import add
+import sys
 
 
-def readMethod(machO, optional):
-	"""Read a ``method_t`` at current position to a :class:`~objc.method.Method`."""
-	#	typedef struct method_t {
-	#		SEL name;
-	#		const char *types;
-	#		IMP imp;
-	#	} method_t;
-	(namePtr, encPtr, imp) = readStruct(machO.file, machO.makeStruct('3^'))
-	name = machO.derefString(namePtr)
-	encoding = machO.derefString(encPtr)
-	return Method(name, encoding, imp, optional)
+_metadataSections = ('__objc_const', '__objc_data', '__objc_classname', '__objc_methname', '__objc_methtype')
+
+def prefetchMetadata(machO):
+	"""Ask the kernel to read the sections holding Objective-C metadata ahead.
+	The readers jump between these sections, so without the hint every page
+	would be faulted in individually. This is done once per Mach-O object."""
+	
+	if getattr(machO, '_hasPrefetchedObjC', False):
+		return
+	machO._hasPrefetchedObjC = True
+	for sectname in _metadataSections:
+		section = machO.anySection('sectname', sectname)
+		if section is not None and not section.isZeroFill:
+			advise(machO.file, 'willneed', section.offset + machO.origin, section.size)
+
+
+def _readListEntries(machO, vmaddr, fmt):
+	"""Read a list with an ``entsize`` and ``count`` header (e.g.
+	``ivar_list_t``) at *vmaddr*, and return a list of tuples of the fields
+	*fmt* of every entry, in the order of the binary. If *vmaddr* is 0, an empty
+	list is returned.
+	
+	The entries are unpacked from one slice of the file, with the stride given
+	by the list header.
+	"""
+	
+	if not vmaddr:
+		return []
+	
+	file = machO.file
+	pos = machO.fromVM(vmaddr) + machO.origin
+	(entsize, count) = peekStruct(file, machO.makeStruct('2L'), position=pos)
+	pos += 8
+	
+	stru = machO.makeStruct(fmt)
+	padding = entsize - stru.size
+	if padding > 0:
+		stru = machO.makeStruct('{}{}x'.format(fmt, padding))
+	
+	end = min(pos + stru.size * count, len(file))
+	end -= (end - pos) % stru.size
+	return list(stru.iter_unpack(file[pos:end]))
 
 
-def readIvar(machO):
-	"""Read an ``ivar_t`` at current position to an :class:`~objc.ivar.Ivar`."""
+def _readIvarEntries(machO, vmaddr):
+	"""Read an ``ivar_list_t`` at *vmaddr*, and return a list of ``(name,
+	encoding, offset)`` tuples in the order of the binary. The offset is
+	``None`` if it cannot be read."""
+	
 	#	typedef struct ivar_t {
 	#		// *offset is 64-bit by accident even though other 
 	#		// fields restrict total instance size to 32-bit. 
@@ -66,58 +103,223 @@ def readIvar(machO):
 	#		uint32_t alignment  __attribute__((deprecated));
 	#		uint32_t size;
 	#	} ivar_t;
-	(offsetPtr, namePtr, encPtr, _, _) = readStruct(machO.file, machO.makeStruct('3^2L'))
-	offset = machO.deref(offsetPtr, machO.makeStruct('^'))[0]
-	name = machO.derefString(namePtr)
-	encoding = machO.derefString(encPtr)
-	return Ivar(name, encoding, offset)
-
-def readProperty(machO):
-	"""Read an ``objc_property`` at current position to a :class:`~objc.property.Property`."""
+	
+	entries = _readListEntries(machO, vmaddr, '3^2L')
+	count = len(entries)
+	
+	file = machO.file
+	origin = machO.origin
+	ptrStru = machO.makeStruct('^')
+	offsets = [ptrStru.unpack_from(file, offset+origin)[0] if offset >= 0 else None for offset in machO.fromVMs([e[0] for e in entries])]
+	strings = machO.derefInternedStrings([e[1] for e in entries] + [e[2] for e in entries])
+	return list(zip(strings, strings[count:], offsets))
+
+
+def _readPropertyEntries(machO, vmaddr):
+	"""Read an ``objc_property_list`` at *vmaddr*, and return a list of
+	``(name, attributes)`` tuples in the order of the binary. If *vmaddr* is 0,
+	an empty list is returned."""
+	
 	#	struct objc_property {
 	#		const char *name;
 	#		const char *attributes;
 	#	};
-	(namePtr, attribPtr) = readStruct(machO.file, machO.makeStruct('2^'))
-	name = machO.derefString(namePtr)
-	attrib = machO.derefString(attribPtr)
-	return Property(name, attrib)
+	
+	strings = machO.derefInternedStrings([ptr for entry in _readListEntries(machO, vmaddr, '2^') for ptr in entry])
+	return list(zip(strings[0::2], strings[1::2]))
+
+
+def readIvarListAt(machO, vmaddr):
+	"""Read an ``ivar_list_t`` at *vmaddr*, and return a list of
+	:class:`~objc.ivar.Ivar`\\s in **reversed order**. If *vmaddr* is 0, an
+	empty list is returned."""
+	lst = [Ivar(name, encoding, offset) for name, encoding, offset in _readIvarEntries(machO, vmaddr)]
+	lst.reverse()
+	return lst
+
 
+def _makeProperties(entries):
+	"""Convert a list of ``(name, attributes)`` tuples into a list of
+	:class:`~objc.property.Property`\\s in **reversed order**. Entries whose
+	strings cannot be read (e.g. encrypted) are skipped."""
+	lst = [Property(name, attributes) for name, attributes in entries if name is not None and attributes is not None]
+	lst.reverse()
+	return lst
 
-# Just read any fixed-length structure.
-def readListAt(method):
+
+def readPropertyListAt(machO, vmaddr):
+	"""Read an ``objc_property_list`` at *vmaddr*, and return a list of
+	:class:`~objc.property.Property`\\s in **reversed order**. If *vmaddr* is
+	0, an empty list is returned."""
+	return _makeProperties(_readPropertyEntries(machO, vmaddr))
+
+
+# The low 2 bits and the high 16 bits of entsizeAndFlags are flags.
+_methodListEntsizeMask = 0xfffc
+_methodListIsRelative = 0x80000000
+# Set by dyld in shared caches where the selector fields of relative method
+# lists are offsets from a cache-wide base address.
+_methodListSelectorsAreDirect = 0x40000000
+_canCastRelativeOffsets = (sys.byteorder == 'little')
+
+def _selectorRefNames(machO, vmaddrs):
+	"""Return the list of selector names referenced by the selector references
+	at *vmaddrs*. The names are memoized per Mach-O object."""
+	
+	selRefNames = machO.__dict__.setdefault('_selRefNames', {})
+	try:
+		return [selRefNames[vmaddr] for vmaddr in vmaddrs]
+	except KeyError:
+		pass
+	
+	missing = [vmaddr for vmaddr in dict.fromkeys(vmaddrs) if vmaddr not in selRefNames]
+	file = machO.file
+	origin = machO.origin
+	ptrStru = machO.makeStruct('^')
+	selectors = [ptrStru.unpack_from(file, offset+origin)[0] if offset >= 0 else 0 for offset in machO.fromVMs(missing)]
+	selRefNames.update(zip(missing, machO.derefInternedStrings(selectors)))
+	return [selRefNames[vmaddr] for vmaddr in vmaddrs]
+	
+
+def _selectorsAreDirect(machO, nameAddr):
+	"""Checks if the selector fields of a relative method list without
+	:const:`_methodListSelectorsAreDirect` point to the selector names directly,
+	given the target *nameAddr* of one of them. This is the case in images of
+	older shared caches, including images extracted from them, where the
+	targets are not in the ``__objc_selrefs`` section."""
+	
+	if getattr(machO, 'cache', None) is not None:
+		return True
+	section = machO.sectionContaining(nameAddr)
+	return section is None or section.sectname != '__objc_selrefs'
+
+
+def _readRelativeMethods(machO, vmaddr, data, entsize, flags):
+	"""Decode the relative ``method_t``\\s in the :class:`memoryview` *data*,
+	which is at *vmaddr*, into a list of ``(name, encoding, imp)`` tuples.
+	*flags* are the flags of the ``method_list_t``.
+	
+	Each field is a 32-bit offset from the field itself. The selector field
+	points to a selector reference, or to the selector name directly in shared
+	caches (see :func:`_selectorsAreDirect`). If
+	:const:`_methodListSelectorsAreDirect` is set in *flags*, the selector field
+	is instead an offset from the shared cache's
+	:attr:`~macho.sharedcache.DyldSharedCache.relativeMethodSelectorBase`, and
+	the names are ``None`` if the base is unknown.
 	"""
-	Returns a function with signature::
+
+	#	struct method_t::small {
+	#		RelativePointer<const void *> name;
+	#		RelativePointer<const char *> types;
+	#		RelativePointer<IMP> imp;
+	#	};
+	
+	count = len(data) // entsize
+	end = vmaddr + entsize*count
 	
-		f(machO, vmaddr, *args, **kwargs)
+	# Flatten the offsets, and add the address of each field to them at once.
+	if entsize == 12 and machO.endian == '<' and _canCastRelativeOffsets:
+		offsets = data[:12*count].cast('i').tolist()
+		fieldAddrs = range(vmaddr, end, 4)
+	else:
+		stru = machO.makeStruct('3l{}x'.format(entsize - 12))
+		offsets = [offset for entry in stru.iter_unpack(data[:entsize*count]) for offset in entry]
+		fieldAddrs = [addr + delta for addr in range(vmaddr, end, entsize) for delta in (0, 4, 8)]
+	targets = list(map(add, offsets, fieldAddrs))
+	
+	imps = targets[2::3]
+	if 0 in offsets[2::3]:
+		imps = [imp if offset else 0 for imp, offset in zip(imps, offsets[2::3])]
+	
+	if flags & _methodListSelectorsAreDirect:
+		cache = getattr(machO, 'cache', None)
+		base = cache.relativeMethodSelectorBase if cache is not None else None
+		if base is None:
+			names = [None] * count
+			encodings = machO.derefInternedStrings(targets[1::3])
+		else:
+			strings = machO.derefInternedStrings([base + offset for offset in offsets[0::3]] + targets[1::3])
+			(names, encodings) = (strings, strings[count:])
 	
-	This function would read any continuous fixed-length structure at *vmaddr*,
-	and analyze them with *method*. Returns a list in **reversed order**. If
-	*vmaddr* is 0, an empty list is returned.
+	elif count and not _selectorsAreDirect(machO, targets[0]):
+		names = _selectorRefNames(machO, targets[0::3])
+		encodings = machO.derefInternedStrings(targets[1::3])
 	
-	This method has 3 specializations::
+	else:
+		strings = machO.derefInternedStrings(targets[0::3] + targets[1::3])
+		(names, encodings) = (strings, strings[count:])
 	
-		readMethodListAt = readListAt(readMethod)
-		readIvarListAt = readListAt(readIvar)
-		readPropertyListAt = readListAt(readProperty)
+	return list(zip(names, encodings, imps))
+
 
+def _readMethodEntries(machO, vmaddr):
+	"""Read a ``method_list_t`` at *vmaddr*, and return a list of ``(name,
+	encoding, imp)`` tuples in the order of the binary. If *vmaddr* is 0, an
+	empty list is returned.
+	
+	The entries are unpacked from one slice of the file, with the stride given
+	by the list header, and their selectors and type encodings are decoded in
+	one batch with :meth:`~macho.macho.MachO.derefInternedStrings`. Both
+	pointer-based and relative method lists are supported. A list in an
+	encrypted region is read as empty.
 	"""
 	
-	def f(machO, vmaddr, *args, **kwargs):
-		if vmaddr:
-			machO.seek(machO.fromVM(vmaddr))
-			count = readStruct(machO.file, machO.makeStruct('2L'))[1]
-			lst = [method(machO, *args, **kwargs) for _ in range(count)]
-			lst.reverse()	# it is needed because the methods defined early will often appear later in the binary.
-			return lst
-		else:
-			return []
-			
-	return f
+	#	typedef struct method_list_t {
+	#		uint32_t entsizeAndFlags;
+	#		uint32_t count;
+	#		method_t first;
+	#	} method_list_t;
+	
+	if not vmaddr:
+		return []
+	
+	# Relative method lists live in __TEXT, which may be encrypted.
+	offset = machO.fromVM(vmaddr)
+	machO_isRangeEncrypted = getattr(machO, 'isRangeEncrypted', lambda x, y: False)
+	if offset < 0 or machO_isRangeEncrypted(offset, 8):
+		return []
+	
+	file = machO.file
+	pos = offset + machO.origin
+	(entsizeAndFlags, count) = peekStruct(file, machO.makeStruct('2L'), position=pos)
+	entsize = entsizeAndFlags & _methodListEntsizeMask
+	pos += 8
+	if machO_isRangeEncrypted(offset + 8, max(entsize, 12) * count):
+		return []
+	
+	if entsizeAndFlags & _methodListIsRelative:
+		data = memoryview(file[pos:min(pos + max(entsize, 12) * count, len(file))])
+		return _readRelativeMethods(machO, vmaddr + 8, data, max(entsize, 12), entsizeAndFlags)
+	
+	else:
+		stru = machO.makeStruct('3^')
+		padding = entsize - stru.size
+		if padding > 0:
+			stru = machO.makeStruct('3^{}x'.format(padding))
+		
+		end = min(pos + stru.size * count, len(file))
+		end -= (end - pos) % stru.size
+		entries = list(stru.iter_unpack(file[pos:end]))
+		
+		count = len(entries)
+		strings = machO.derefInternedStrings([e[0] for e in entries] + [e[1] for e in entries])
+		return [(name, encoding, e[2]) for name, encoding, e in zip(strings, strings[count:], entries)]
+
+
+def _makeMethods(entries, optional):
+	"""Convert a list of ``(name, encoding, imp)`` tuples into a list of
+	:class:`~objc.method.Method`\\s in **reversed order**."""
+	lst = [Method(name, encoding, imp, optional) for name, encoding, imp in entries]
+	lst.reverse()	# it is needed because the methods defined early will often appear later in the binary.
+	return lst
+
+
+def readMethodListAt(machO, vmaddr, optional):
+	"""Read a ``method_list_t`` at *vmaddr*, and return a list of
+	:class:`~objc.method.Method`\\s in **reversed order**. If *vmaddr* is 0, an
+	empty list is returned."""
+	return _makeMethods(_readMethodEntries(machO, vmaddr), optional)
 
-readMethodListAt = readListAt(readMethod)
-readIvarListAt = readListAt(readIvar)
-readPropertyListAt = readListAt(readProperty)
 
 def _readProtocolRefListAt(machO, vmaddr):
 	"""Return the an iterable of addresses to protocols from *vmaddr*."""
@@ -134,10 +336,8 @@ def _readProtocolRefListAt(machO, vmaddr):
 	else:
 		return []
 
-def readProtocol(machO, vmaddr):
-	"""Peek a ``protocol_t`` at *offset*. Returns a tuple of
-	:class:`~objc.protocol.Protocol` and an iterable of protocol addresses it is
-	adopting."""
+def _readProtocolPointers(machO, vmaddr):
+	"""Peek the pointers of a ``protocol_t`` at *vmaddr*, except ``isa``."""
 
 	#	typedef struct protocol_t {
 	#		id isa;
@@ -151,20 +351,53 @@ def readProtocol(machO, vmaddr):
 	#	} protocol_t;
 	
 	pos = machO.fromVM(vmaddr) + machO.origin
-	(_, namePtr, protocolListPtr, instMethodsPtr, classMethodsPtr, optInstMethodsPtr, optClassMethodsPtr, propsPtr) = peekStruct(machO.file, machO.makeStruct('8^'), position=pos)
+	return peekStruct(machO.file, machO.makeStruct('8^'), position=pos)[1:]
+
+
+def _readProtocolContent(machO, pointers):
+	"""Read the protocol described by *pointers*, as returned by
+	:func:`_readProtocolPointers`. Returns a tuple of the name, an iterable of
+	protocol addresses it is adopting, and a hashable tuple of its content.
+	
+	The content consists of the class methods, optional class methods,
+	instance methods and optional instance methods as lists of ``(name,
+	encoding, imp)`` tuples, the properties as ``(name, attributes)`` tuples,
+	and the names of the adopted protocols.
+	"""
 	
-	name = machO.derefString(namePtr)
+	(namePtr, protocolListPtr, instMethodsPtr, classMethodsPtr, optInstMethodsPtr, optClassMethodsPtr, propsPtr) = pointers
+	
+	name = machO.derefInternedString(namePtr)
 	protocolRefs = _readProtocolRefListAt(machO, protocolListPtr)
+	adoptedNames = machO.derefInternedStrings([_readProtocolPointers(machO, ref)[0] for ref in protocolRefs])
+	
+	content = tuple(tuple(_readMethodEntries(machO, ptr)) for ptr in (classMethodsPtr, optClassMethodsPtr, instMethodsPtr, optInstMethodsPtr))
+	content += (tuple(_readPropertyEntries(machO, propsPtr)), tuple(adoptedNames))
+	return (name, protocolRefs, content)
+
+
+def _makeProtocol(name, content):
+	"""Create a :class:`~objc.protocol.Protocol` from the result of
+	:func:`_readProtocolContent`. The adopted protocols are not connected."""
+	(classMethods, optClassMethods, methods, optMethods, properties, _) = content
 	
 	proto = Protocol(name)
-	proto.addClassMethods(readMethodListAt(machO, classMethodsPtr, optional=False))
-	proto.addClassMethods(readMethodListAt(machO, optClassMethodsPtr, optional=True))
-	proto.addMethods(readMethodListAt(machO, instMethodsPtr, optional=False))
-	proto.addMethods(readMethodListAt(machO, optInstMethodsPtr, optional=True))
+	proto.addClassMethods(_makeMethods(classMethods, optional=False))
+	proto.addClassMethods(_makeMethods(optClassMethods, optional=True))
+	proto.addMethods(_makeMethods(methods, optional=False))
+	proto.addMethods(_makeMethods(optMethods, optional=True))
+	
+	proto.addProperties(_makeProperties(properties))
+	
+	return proto
 
-	proto.addProperties(readPropertyListAt(machO, propsPtr))
 
-	return (proto, protocolRefs)
+def readProtocol(machO, vmaddr):
+	"""Peek a ``protocol_t`` at *vmaddr*. Returns a tuple of
+	:class:`~objc.protocol.Protocol` and an iterable of protocol addresses it is
+	adopting."""
+	(name, protocolRefs, content) = _readProtocolContent(machO, _readProtocolPointers(machO, vmaddr))
+	return (_makeProtocol(name, content), protocolRefs)
 
 
 def connectProtocol(obj, protocolRefs, protoRefsMap):
@@ -180,18 +413,37 @@ def readProtocolList(machO, addresses):
 	
 	* ``'name'`` (unique, string, the name of the protocol)
 	* ``'addr'`` (unique, integer, the VM address to the protocol)
+	
+	If *machO* is an image of a shared cache, the protocols are canonicalized
+	through the cache's :attr:`~macho.sharedcache.DyldSharedCache.protocolRegistry`,
+	so a protocol defined identically in several images is represented by the
+	same :class:`~objc.protocol.Protocol`, and the ``protocol_t`` structures
+	already seen in other images are not read again.
 	"""
 	
+	prefetchMetadata(machO)
+	
+	cache = getattr(machO, 'cache', None)
+	registry = cache.protocolRegistry if cache is not None else None
+	
 	# read protocols from the Mach-O binary.
 	protos = DataTable('!name', '!addr')
-	refs = []
+	newProtos = []
 	for vmaddr in addresses:
-		(proto, protocolRefs) = readProtocol(machO, vmaddr)
+		pointers = _readProtocolPointers(machO, vmaddr)
+		proto = registry.findAt(pointers) if registry is not None else None
+		if proto is None:
+			(name, protocolRefs, content) = _readProtocolContent(machO, pointers)
+			proto = registry.find(name, content) if registry is not None else None
+			if proto is None:
+				proto = _makeProtocol(name, content)
+				newProtos.append((proto, protocolRefs))
+			if registry is not None:
+				registry.register(name, content, proto, location=pointers)
 		protos.append(proto, name=proto.name, addr=vmaddr)
-		refs.append(protocolRefs)
 	
-	# connect the protocols.
-	for proto, protocolRefs in zip(protos, refs):
+	# connect the protocols which are not read before.
+	for proto, protocolRefs in newProtos:
 		connectProtocol(proto, protocolRefs, protos)
 		
 	return protos
@@ -229,7 +481,7 @@ def _readClassRO(machO, cls, protoRefsMap, absfileoff):
 	if cls is None:
 		# not meta class.
 		
-		name = machO.derefString(namePtr)
+		name = machO.derefInternedString(namePtr)
 		cls = Class(name, flags)
 		
 		cls.addMethods(methods)
@@ -293,14 +545,33 @@ def readClassName(machO, vmaddr):
 	classRo = peekStruct(file, classT, position=machO_fromVM(vmaddr)+origin)[4]
 	namePtr = peekStruct(file, classRoT, position=machO_fromVM(classRo)+origin)[4]
 	
-	return machO.derefString(namePtr)
+	return machO.derefInternedString(namePtr)
+
+
+def readClassNames(machO, vmaddrs):
+	"""Read the names of the Objective-C classes at the sequence *vmaddrs* in one
+	batch. The name is ``None`` for an address not mapped in *machO*."""
+	
+	origin = machO.origin
+	file = machO.file
+	
+	classT = machO.makeStruct('5^')
+	classRoT = machO.makeStruct('3L~7^')
+	dataMask = 0x00007ffffffffff8 if machO.is64bit else 0xfffffffc
+	
+	classRos = [peekStruct(file, classT, position=offset+origin)[4] & dataMask if offset >= 0 else 0 for offset in machO.fromVMs(vmaddrs)]
+	namePtrs = [peekStruct(file, classRoT, position=offset+origin)[4] if offset >= 0 else 0 for offset in machO.fromVMs(classRos)]
+	return machO.derefInternedStrings(namePtrs)
 	
 	
 
 def classAt(machO, vmaddr, classes):
 	'''Given a :class:`~data_table.DataTable` of :class:`~objc.class_.Class`\\s,
 	get the :class:`~objc.class_.Class` or :class:`~objc.class_.RemoteClass` at
-	the given *vmaddr*.'''
+	the given *vmaddr*.
+	
+	For images of a shared cache, the remote classes can be resolved with
+	:meth:`~objc.class_.RemoteClass.resolve` through the cache's class index.'''
 	
 	cls = classes.any('addr', vmaddr)
 	if not cls:
@@ -310,14 +581,24 @@ def classAt(machO, vmaddr, classes):
 			name = '_OBJC_CLASS_$_' + readClassName(machO, vmaddr)
 			sym = Symbol(name, vmaddr, SYMTYPE_UNDEFINED, ordinal=-2)
 			machO.addSymbols([sym])
-			
-		cls = RemoteClass(sym)
+		
+		cache = getattr(machO, 'cache', None)
+		cls = RemoteClass(sym, cache.classNamed if cache is not None else None)
 		
 	return cls
 
 
 
-def readClassList(machO, addresses, protoRefsMap):
+def _loadClass(machO, vmaddr, protoRefsMap, classes):
+	"""Read the class at *vmaddr* with its superclass resolved from
+	*classes*."""
+	(cls, superPtr) = readClass(machO, vmaddr, protoRefsMap)
+	if not cls.isRoot:
+		cls.superClass = classAt(machO, superPtr, classes)
+	return cls
+
+
+def readClassList(machO, addresses, protoRefsMap, lazy=False):
 	"""Read classes from an iterable of *addresses*, and return a
 	:class:`~data_table.DataTable` of :class:`~objc.class_.Class`\\s with
 	the following column names:
@@ -326,9 +607,22 @@ def readClassList(machO, addresses, protoRefsMap):
 	
 	* ``'addr'`` (unique, integer, the VM address to the class)
 	
+	If *lazy* is ``True``, only the class names are read, and the table holds
+	:class:`~objc.class_.LazyClass`\\es which read the rest on first access.
+	
 	"""
-		
+	
 	classes = DataTable('!name', '!addr')
+	
+	if lazy:
+		for vmaddr in addresses:
+			name = readClassName(machO, vmaddr)
+			loader = partial(_loadClass, machO, vmaddr, protoRefsMap, classes)
+			classes.append(LazyClass(name, loader), name=name, addr=vmaddr)
+		return classes
+	
+	prefetchMetadata(machO)
+		
 	supers = []
 	for vmaddr in addresses:
 		(cls, superPtr) = readClass(machO, vmaddr, protoRefsMap)
@@ -359,7 +653,7 @@ def readCategory(machO, vmaddr, classes, protoRefsMap):
 	pos = machO.fromVM(vmaddr) + machO.origin
 	(namePtr, clsPtr, instMethodsPtr, classMethodsPtr, protosPtr, propsPtr) = peekStruct(machO.file, machO.makeStruct('6^'), position=pos)
 		
-	name = machO.derefString(namePtr)
+	name = machO.derefInternedString(namePtr)
 	
 	if not clsPtr:
 		clsPtr = vmaddr + machO.pointerWidth
@@ -385,6 +679,8 @@ def readCategoryList(machO, addresses, classes, protoRefsMap):
 	* ``'base'`` (string, the name of the class the category is patching)
 	"""
 	
+	prefetchMetadata(machO)
+	
 	cats = DataTable('name', 'base')
 	for vmaddr in addresses:
 		cat = readCategory(machO, vmaddr, classes, protoRefsMap)
@@ -16,10 +16,11 @@
 #	along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from macho.sections.section import Section
+from .objcsection import ObjCSection
 from ._abi2reader import readCategoryList
 from ._abi1reader import analyzeCategoryList
 
-class ObjCCategoryListSection(Section):
+class ObjCCategoryListSection(ObjCSection):
 	"""The Objective-C category list section (``__DATA,__objc_catlist``, etc).
 	
 	.. attribute:: categories
@@ -32,6 +33,8 @@ class ObjCCategoryListSection(Section):
 		* ``'base'`` (string, the name of the class the category is patching)
 	
 	"""
+	
+	contentAttribute = 'categories'
 
 	def _analyze1(self, machO, classes, protoRefsMap):
 		cats = self.asStructs(machO.makeStruct('5^L~^'), machO)
@@ -43,7 +46,7 @@ class ObjCCategoryListSection(Section):
 		self.categories = readCategoryList(machO, addresses, classes, protoRefsMap)
 		
 
-	def analyze(self, segment, machO):
+	def read(self, machO):
 		# Make sure the classlist section is ready if exists.
 		protoRefsMap = machO.anySectionProperty('className', 'ObjCProtoListSection', 'protocols', default={})
 		classes = machO.anySectionProperty('className', 'ObjCClassListSection', 'classes', default={})
@@ -16,10 +16,11 @@
 #	along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from macho.sections.section import Section
+from .objcsection import ObjCSection
 from ._abi2reader import readClassList
 from ._abi1reader import analyzeClassList
 
-class ObjCClassListSection(Section):
+class ObjCClassListSection(ObjCSection):
 	"""The Objective-C class list section (``__DATA,__objc_classlist``, etc).
 	
 	.. attribute:: classes
@@ -30,7 +31,18 @@ class ObjCClassListSection(Section):
 		* ``'name'`` (unique, string, the name of the class)
 		* ``'addr'`` (unique, integer, the VM address to the class)
 	
+	.. attribute:: lazy
+	
+		Set this class attribute to ``True`` before opening a file to make
+		:attr:`classes` hold :class:`~objc.class_.LazyClass`\\es, which only
+		know their names until any other attribute is accessed. The Mach-O
+		object must still be open by then. Only ObjC ABI 2.0 class lists are
+		read lazily.
+	
 	"""
+	
+	lazy = False
+	contentAttribute = 'classes'
 
 	def _analyze1(self, machO, protoRefsMap):
 		addressesAndClassTuples = self.asStructs(machO.makeStruct('12^'), machO, includeAddresses=True)
@@ -39,10 +51,10 @@ class ObjCClassListSection(Section):
 
 	def _analyze2(self, machO, protoRefsMap):
 		addresses = self.asPrimitives('^', machO)
-		self.classes = readClassList(machO, addresses, protoRefsMap)
+		self.classes = readClassList(machO, addresses, protoRefsMap, lazy=self.lazy)
 		
 
-	def analyze(self, segment, machO):
+	def read(self, machO):
 		# Make sure the protocol sections is ready if exists.
 
 		protoRefsMap = machO.anySectionProperty('className', 'ObjCProtoListSection', 'protocols', default={})
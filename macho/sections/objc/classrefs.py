@@ -0,0 +1,90 @@
+#
+#	classrefs.py ... __DATA,__objc_classrefs and __objc_superrefs sections.
+#	Copyright (C) 2010  KennyTM~ <kennytm@gmail.com>
+#	
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#	
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#	
+#	You should have received a copy of the GNU General Public License
+#	along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from macho.sections.section import Section
+from macho.macho import MachO
+from monkey_patching import patch
+from .objcsection import ObjCSection
+from ._abi2reader import readClassNames
+
+_classSymbolPrefix = '_OBJC_CLASS_$_'
+
+class ObjCClassRefsSection(ObjCSection):
+	"""The Objective-C class references section (``__DATA,__objc_classrefs``)
+	or super class references section (``__DATA,__objc_superrefs``).
+	
+	The names of the classes defined in the file (or elsewhere in the shared
+	cache) are read in one batch. The references to imported classes are named
+	after the symbols bound to them. Since the bind symbols are only known after
+	the sections are analyzed, these sections are always :attr:`deferred`, and
+	the Mach-O object must be open when :attr:`classNames` is accessed.
+	
+	.. attribute:: classNames
+	
+		A dictionary from the VM address of each class reference to the class
+		name. A super class reference refers to the class itself, not to its
+		superclass.
+	
+	"""
+	
+	deferred = True
+	contentAttribute = 'classNames'
+	
+	def read(self, machO):
+		refs = list(self.asPrimitives('^', machO, includeAddresses=True))
+		names = readClassNames(machO, [cls for _, cls in refs])
+		symbols = getattr(machO, 'symbols', None)
+		
+		classNames = {}
+		index = machO.__dict__.setdefault('_objcClassNames', {})
+		for (addr, cls), name in zip(refs, names):
+			if name is not None:
+				index[cls] = name
+			elif symbols is not None:
+				sym = symbols.any('addr', addr)
+				if sym is None or not sym.name.startswith(_classSymbolPrefix):
+					continue
+				name = sym.name[len(_classSymbolPrefix):]
+			else:
+				continue
+			classNames[addr] = name
+		
+		self.classNames = classNames
+		index.update(classNames)
+
+
+@patch
+class MachO_ObjCClassRefs(MachO):
+	"""This patch adds class reference lookup to the :class:`~macho.macho.MachO`
+	class."""
+	
+	def classNameAt(self, vmaddr):
+		"""Return the name of the class referenced by the class or super class
+		reference at *vmaddr*, or of the referenced class at *vmaddr*. Returns
+		``None`` if there is no such class. This is a dictionary lookup, like
+		:meth:`~macho.sections.objc.selrefs.MachO_ObjCSelRefs.selectorNameAt`.
+		"""
+		if not self.__dict__.get('_hasReadClassRefs'):
+			# make sure the deferred sections are read.
+			for section in self.allSections('className', 'ObjCClassRefsSection'):
+				section.classNames
+			self._hasReadClassRefs = True
+		return self.__dict__.get('_objcClassNames', {}).get(vmaddr)
+
+
+Section.registerFactory('__objc_classrefs', ObjCClassRefsSection)	# __DATA,__objc_classrefs
+Section.registerFactory('__objc_superrefs', ObjCClassRefsSection)	# __DATA,__objc_superrefs
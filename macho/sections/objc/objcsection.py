@@ -0,0 +1,65 @@
+#
+#	objcsection.py ... Base class of the Objective-C sections.
+#	Copyright (C) 2010  KennyTM~ <kennytm@gmail.com>
+#	
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#	
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#	
+#	You should have received a copy of the GNU General Public License
+#	along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from macho.sections.section import Section
+
+class ObjCSection(Section):
+	"""Base class of the Objective-C sections. The content of these sections
+	can be read either when the file is opened, or when it is first accessed.
+	
+	Subclasses should set :attr:`contentAttribute`, and override :meth:`read`
+	instead of :meth:`~macho.sections.section.Section.analyze`.
+	
+	The content is only read when :attr:`contentAttribute` is first accessed
+	if the :class:`~macho.macho.MachO` object is created with *deferObjC*, or
+	if the section is :attr:`deferred`. For instance, querying the protocols
+	then never reads the classes. The Mach-O object must still be open by then.
+	
+	.. attribute:: deferred
+	
+		A class attribute. Subclasses set it to ``True`` if their content is
+		always read on first access.
+	
+	.. attribute:: contentAttribute
+	
+		The name of the attribute holding the content of the section, e.g.
+		``'protocols'``.
+	
+	"""
+	
+	deferred = False
+	contentAttribute = None
+	
+	def read(self, machO):
+		"""Read the content of this section into :attr:`contentAttribute`.
+		Return a true value if other sections have to be analyzed first."""
+		return False
+	
+	def analyze(self, segment, machO):
+		if self.deferred or machO.deferObjC:
+			self._deferredMachO = machO
+			return False
+		return self.read(machO)
+	
+	def __getattr__(self, name):
+		# Only called when the attribute does not exist, i.e. the content of a
+		# deferred section is not read yet.
+		if name != self.contentAttribute or '_deferredMachO' not in self.__dict__:
+			raise AttributeError(name)
+		self.read(self.__dict__.pop('_deferredMachO'))
+		return getattr(self, name)
+
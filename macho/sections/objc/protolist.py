@@ -16,10 +16,11 @@
 #	along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from macho.sections.section import Section
+from .objcsection import ObjCSection
 from ._abi2reader import readProtocolList
 from ._abi1reader import analyzeProtocolList
 
-class ObjCProtoListSection(Section):
+class ObjCProtoListSection(ObjCSection):
 	"""The Objective-C protocol list section (``__DATA,__objc_protolist``, etc).
 	
 	.. attribute:: protocols
@@ -31,6 +32,8 @@ class ObjCProtoListSection(Section):
 		* ``'addr'`` (unique, integer, the VM address to the protocol)
 
 	"""
+	
+	contentAttribute = 'protocols'
 
 	def _analyze1(self, machO):
 		protos = self.asStructs(machO.makeStruct('5^'), machO, includeAddresses=True)
@@ -43,7 +46,7 @@ class ObjCProtoListSection(Section):
 		addresses = self.asPrimitives('^', machO)
 		self.protocols = readProtocolList(machO, addresses)
 
-	def analyze(self, segment, machO):
+	def read(self, machO):
 		if self.segname == '__OBJC':
 			return self._analyze1(machO)
 		else:
@@ -0,0 +1,82 @@
+#
+#	selrefs.py ... __DATA,__objc_selrefs section.
+#	Copyright (C) 2010  KennyTM~ <kennytm@gmail.com>
+#	
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#	
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#	
+#	You should have received a copy of the GNU General Public License
+#	along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from macho.sections.section import Section
+from macho.macho import MachO
+from macho.symbol import Symbol, SYMTYPE_OBJC_SEL
+from monkey_patching import patch
+from .objcsection import ObjCSection
+
+class ObjCSelRefsSection(ObjCSection):
+	"""The Objective-C selector references section (``__DATA,__objc_selrefs``,
+	etc).
+	
+	All selector names are decoded in one batch. Every reference is also added
+	as a :class:`~sym.Symbol` of type :const:`~sym.SYMTYPE_OBJC_SEL`.
+	
+	.. attribute:: selectors
+	
+		A dictionary from the VM address of each selector reference to the
+		selector name.
+	
+	"""
+	
+	contentAttribute = 'selectors'
+	
+	def read(self, machO):
+		refs = list(self.asPrimitives('^', machO, includeAddresses=True))
+		names = machO.derefInternedStrings([sel for _, sel in refs])
+		self.selectors = selectors = {addr: name for (addr, _), name in zip(refs, names) if name is not None}
+		
+		# Share the names with the readers of relative method lists, and with
+		# MachO.selectorNameAt.
+		machO.__dict__.setdefault('_selRefNames', {}).update(selectors)
+		index = machO.__dict__.setdefault('_objcSelectorNames', {})
+		index.update(selectors)
+		index.update((sel, name) for (_, sel), name in zip(refs, names) if name is not None)
+		
+		machO.addSymbols(Symbol(name, addr, SYMTYPE_OBJC_SEL) for addr, name in selectors.items())
+
+
+@patch
+class MachO_ObjCSelRefs(MachO):
+	"""This patch adds selector lookup to the :class:`~macho.macho.MachO`
+	class."""
+	
+	def selectorNameAt(self, vmaddr):
+		"""Return the name of the selector referenced by the selector reference
+		at *vmaddr*, or whose name is at *vmaddr*. Returns ``None`` if there is
+		no such selector.
+		
+		Both are a dictionary lookup, so this can name the ``objc_msgSend``
+		call sites in an emulator callback, e.g.::
+		
+			def onBranch(prevLoc, instr, thread):
+				if thread.pc == msgSendAddress:
+					print(machO.selectorNameAt(thread.r[1]))
+		
+		"""
+		if not self.__dict__.get('_hasReadSelectorRefs'):
+			# make sure the deferred sections are read.
+			for section in self.allSections('className', 'ObjCSelRefsSection'):
+				section.selectors
+			self._hasReadSelectorRefs = True
+		return self.__dict__.get('_objcSelectorNames', {}).get(vmaddr)
+
+
+Section.registerFactory('__objc_selrefs', ObjCSelRefsSection)	# __DATA,__objc_selrefs
+Section.registerFactory('__message_refs', ObjCSelRefsSection)	# __OBJC,__message_refs
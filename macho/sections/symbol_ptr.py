@@ -20,12 +20,37 @@ from macho.sections.section import Section, S_NON_LAZY_SYMBOL_POINTERS, S_LAZY_S
 import macho.loadcommands.dysymtab
 import macho.loadcommands.symtab
 
+_INDIRECT_SYMBOL_SPECIAL = 0xc0000000	# INDIRECT_SYMBOL_LOCAL | INDIRECT_SYMBOL_ABS
+
+def _resolveIndirectSymbols(machO, dysymtab):
+	"""Resolve the indirect symbols of all symbol pointer and stub sections in
+	one pass over the indirect symbol table."""
+	
+	table = dysymtab.indirectSymbolTable(machO)
+	pointerWidth = machO.pointerWidth
+	ordinalsAndAddresses = []
+	ordinalsAndAddresses_extend = ordinalsAndAddresses.extend
+	
+	for sect in machO.allSections('className', 'SymbolPtrSection'):
+		stride = sect.reserved[1] or pointerWidth
+		count = sect.size // stride
+		start = sect.reserved[0]
+		addresses = range(sect.addr, sect.addr + count*stride, stride)
+		ordinalsAndAddresses_extend(zip(table[start:start+count], addresses))
+		sect._isResolved = True
+	
+	machO.provideAddresses(p for p in ordinalsAndAddresses if not p[0] & _INDIRECT_SYMBOL_SPECIAL)
+	
+
 class SymbolPtrSection(Section):
-	"""The symbol pointer sections (for example ``__DATA,__nl_symbol_ptr``) and
-	symbol stub sections.
+	"""The symbol pointer sections (for example ``__DATA,__nl_symbol_ptr`` and
+	``__DATA,__la_symbol_ptr``) and symbol stub sections.
 	
-	Analyzing this section will resolve the indirect symbols."""
+	Analyzing this section will resolve the indirect symbols. The indirect
+	symbol table is read once, and all symbol pointer sections of the Mach-O
+	file are resolved together when the first of them is analyzed."""
 	
+	_isResolved = False
 	
 	def analyze(self, segment, machO):
 		dysymtab = machO.loadCommands.any('className', 'DySymtabCommand')
@@ -42,20 +67,12 @@ class SymbolPtrSection(Section):
 		elif not symtab.isAnalyzed:
 			return True
 		
-		stride = self.reserved[1] or machO.pointerWidth
-		count = self.size // stride
-		symbols = machO.symbols
-		symbols_append = symbols.append
-		
-		indirectSyms = dysymtab.indirectSymbols(self.reserved[0], self.size // stride, machO)
-		addresses = range(self.addr, self.addr + count*stride, stride)
-		
-		machO.provideAddresses(zip(indirectSyms, addresses))
+		if not self._isResolved:
+			_resolveIndirectSymbols(machO, dysymtab)
 		
 		
 
 Section.registerFactoryFType(S_NON_LAZY_SYMBOL_POINTERS, SymbolPtrSection.byFType)
-# Section.registerFactoryFType(S_LAZY_SYMBOL_POINTERS, SymbolPtrSection.byFType)
-# # - The __la_symbol_ptr adds nothing of value to the symbol table.
-# Section.registerFactoryFType(S_LAZY_DYLIB_SYMBOL_POINTERS, SymbolPtrSection.byFType)
+Section.registerFactoryFType(S_LAZY_SYMBOL_POINTERS, SymbolPtrSection.byFType)
+Section.registerFactoryFType(S_LAZY_DYLIB_SYMBOL_POINTERS, SymbolPtrSection.byFType)
 Section.registerFactoryFType(S_SYMBOL_STUBS, SymbolPtrSection.byFType)
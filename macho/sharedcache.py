@@ -16,15 +16,249 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #    
 
-from .macho import MachOError, MachO
+from .macho import MachOError, MachO, _pread
 from mmap import mmap, ACCESS_READ
-from .utilities import peekFixedLengthString, peekStruct, peekStructs, peekString
+from .utilities import peekFixedLengthString, peekStruct, peekStructs, peekString, fromStringz, advise
 from struct import Struct
 from .arch import Arch
-from data_table import DataTable
-from .vmaddr import Mapping, MappingSet
+from collections import Sequence
+from .vmaddr import Mapping, MappingSet, StringMemo
+from .loadcommands.loadcommand import LC_SEGMENT, LC_SEGMENT_64, LC_SYMTAB, LC_DYSYMTAB, LC_DYLD_INFO, LC_CODE_SIGNATURE, LC_SEGMENT_SPLIT_INFO, LC_FUNCTION_STARTS
+from sym import Symbol, SYMTYPE_UNDEFINED, SYMTYPE_GENERIC
+from objc.protocol import ProtocolRegistry
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_right
 import os
-from os.path import basename, splitext
+from os.path import basename, join, dirname
+
+
+# Load commands in the form of linkedit_data_command (dataoff, datasize).
+# 0x29 is LC_DATA_IN_CODE and 0x2b is LC_DYLIB_CODE_SIGN_DRS.
+_linkeditDataCommands = frozenset([LC_CODE_SIGNATURE, LC_SEGMENT_SPLIT_INFO, LC_FUNCTION_STARTS, 0x29, 0x2b])
+
+# (offset index, count index, entry size) of the tables in LC_DYSYMTAB, after
+# the 8-byte command header. The entry size of the module table depends on the
+# ABI, hence None.
+_dysymtabTables = ((6, 7, 8), (8, 9, None), (10, 11, 4), (12, 13, 4), (14, 15, 8), (16, 17, 8))
+
+# S_ZEROFILL, S_GB_ZEROFILL and S_THREAD_LOCAL_ZEROFILL.
+_zeroFillTypes = frozenset([1, 0xc, 0x12])
+
+
+def _copyRange(dst, subCache, srcOffset, dstOffset, size):
+    '''Copy *size* bytes at *srcOffset* of the :class:`SubCache` *subCache* to
+    *dstOffset* of the file descriptor *dst*. :func:`os.sendfile` is used when
+    available, otherwise the bytes are written from a :class:`memoryview` of
+    the mmap, so no intermediate copies are made. A
+    :exc:`~macho.macho.MachOError` is raised if the sub-cache ends before
+    *srcOffset* + *size*.'''
+    
+    file = subCache.file
+    os.lseek(dst, dstOffset, os.SEEK_SET)
+    if hasattr(os, 'sendfile') and subCache.fileno >= 0:
+        try:
+            while size > 0:
+                sent = os.sendfile(dst, subCache.fileno, srcOffset, size)
+                if not sent:
+                    break
+                srcOffset += sent
+                dstOffset += sent
+                size -= sent
+        except OSError:
+            # sendfile() may not support regular files as output on this
+            # platform. Fall back to write() from where it stopped.
+            os.lseek(dst, dstOffset, os.SEEK_SET)
+        else:
+            if size > 0:
+                raise MachOError('Sub-cache "{}" ends before offset 0x{:x}.'.format(subCache.filename, srcOffset + size))
+            return
+    
+    with memoryview(file) as view:
+        chunk = view[srcOffset:srcOffset+size]
+        try:
+            if len(chunk) < size:
+                raise MachOError('Sub-cache "{}" ends before offset 0x{:x}.'.format(subCache.filename, srcOffset + size))
+            while chunk:
+                written = os.write(dst, chunk)
+                chunk = chunk[written:]
+        finally:
+            chunk.release()
+
+
+# Offsets of some fields in dyld_cache_header. A field exists only if the
+# mapping table starts after it.
+_headerLocalSymbols = 72        # localSymbolsOffset, localSymbolsSize
+_headerSubCaches = 392          # subCacheArrayOffset, subCacheArrayCount
+_headerSymbolFileUUID = 400
+_headerImages = 448             # imagesOffset, imagesCount
+_headerCacheSubType = 456
+_headerObjCOpts = 464           # objcOptsOffset, objcOptsSize
+
+
+def _readSegments(buf, position, endian):
+    '''Read the segment load commands of the Mach-O header at *position* of
+    *buf*. Returns a list of (segname, vmaddr, vmsize) tuples.'''
+    
+    (magic, ) = peekStruct(buf, Struct('<L'), position=position)
+    is64bit = magic in (0xfeedfacf, 0xcffaedfe)
+    (ncmds, ) = peekStruct(buf, Struct(endian + 'L'), position=position+16)
+    cmdStruct = Struct(endian + '2L')
+    segStruct = Struct(endian + ('16s2Q' if is64bit else '16s2L'))
+    segCmd = LC_SEGMENT_64 if is64bit else LC_SEGMENT
+    
+    segments = []
+    position += 32 if is64bit else 28
+    for i in range(ncmds):
+        (cmd, cmdsize) = cmdStruct.unpack_from(buf, position)
+        if cmd == segCmd:
+            (segname, vmaddr, vmsize) = segStruct.unpack_from(buf, position+8)
+            segments.append((fromStringz(segname), vmaddr, vmsize))
+        position += cmdsize
+    return segments
+
+
+def _readSections(buf, position, endian, sectname):
+    '''Read the section headers named *sectname* in the segment load commands
+    of the Mach-O header at *position* of *buf*. Returns a list of (vmaddr,
+    size) tuples.'''
+    
+    (magic, ) = peekStruct(buf, Struct('<L'), position=position)
+    is64bit = magic in (0xfeedfacf, 0xcffaedfe)
+    (ncmds, ) = peekStruct(buf, Struct(endian + 'L'), position=position+16)
+    cmdStruct = Struct(endian + '2L')
+    nsectsStruct = Struct(endian + 'L')
+    sectStruct = Struct(endian + ('16s16s2Q' if is64bit else '16s16s2L'))
+    (segCmd, segSize, sectSize) = (LC_SEGMENT_64, 72, 80) if is64bit else (LC_SEGMENT, 56, 68)
+    sectname = sectname.encode()
+    
+    sections = []
+    position += 32 if is64bit else 28
+    for i in range(ncmds):
+        (cmd, cmdsize) = cmdStruct.unpack_from(buf, position)
+        if cmd == segCmd:
+            (nsects, ) = nsectsStruct.unpack_from(buf, position + segSize - 8)
+            for j in range(position + segSize, position + segSize + nsects * sectSize, sectSize):
+                (name, _, addr, size) = sectStruct.unpack_from(buf, j)
+                if name.rstrip(b'\0') == sectname:
+                    sections.append((addr, size))
+        position += cmdsize
+    return sections
+
+
+def _readMappings(buf, endian, offset, count):
+    mappings = peekStructs(buf, Struct(endian + '3Q2L'), count, position=offset)
+    return [Mapping(*content) for content in mappings]
+
+
+class SubCache(object):
+    '''One file of a shared cache. Newer shared caches are split across
+    several files (e.g. ``dyld_shared_cache_arm64e.1``, ``.2``, ...,
+    ``.symbols``), which are described by this class. The main file is also
+    represented as a sub-cache with an empty :attr:`suffix`.
+    
+    Only the header of the file is read when the cache is opened. The file is
+    mmapped on first access of :attr:`file`.
+    
+    .. attribute:: filename
+    
+        File name of this sub-cache.
+    
+    .. attribute:: suffix
+    
+        The suffix appended to the main cache's file name, e.g. ``'.1'``.
+    
+    .. attribute:: uuid
+    
+        The UUID of this sub-cache (as recorded by the main cache), as
+        :class:`bytes`.
+    
+    .. attribute:: mappings
+    
+        The :class:`~macho.vmaddr.MappingSet` of this file. The file offsets
+        are relative to this file.
+    
+    .. attribute:: localSymbolsRange
+    
+        The (offset, size) of the local symbols blob in this file, or
+        ``(0, 0)`` if there is none.
+    
+    '''
+    
+    def __init__(self, filename, suffix, uuid):
+        self.filename = filename
+        self.suffix = suffix
+        self.uuid = uuid
+        self.fileno = -1
+        self.mappings = MappingSet()
+        self.localSymbolsRange = (0, 0)
+        self._file = None
+        self._ownsFile = True
+    
+    def readHeader(self, endian):
+        '''Read the mappings of this sub-cache with :func:`os.pread`, without
+        mmapping the file.'''
+        
+        flag = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+        fileno = os.open(self.filename, flag)
+        try:
+            buf = _pread(fileno, 4096, 0)
+            if not buf.startswith(b'dyld_v1'):
+                raise MachOError('Invalid magic in sub-cache "{}"'.format(self.filename))
+            (mappingOffset, mappingCount) = peekStruct(buf, Struct(endian + '2L'), position=16)
+            if len(buf) < mappingOffset + 32*mappingCount:
+                buf = _pread(fileno, mappingOffset + 32*mappingCount, 0)
+        finally:
+            os.close(fileno)
+        self.__setHeader(buf, endian, mappingOffset, mappingCount)
+    
+    def useFile(self, fileno, file, endian):
+        '''Use an already opened *file* (the main cache) for this sub-cache.
+        The file will not be closed by :meth:`close`.'''
+        
+        self.fileno = fileno
+        self._file = file
+        self._ownsFile = False
+        (mappingOffset, mappingCount) = peekStruct(file, Struct(endian + '2L'), position=16)
+        self.__setHeader(file, endian, mappingOffset, mappingCount)
+    
+    def __setHeader(self, buf, endian, mappingOffset, mappingCount):
+        self.mappings = MappingSet(_readMappings(buf, endian, mappingOffset, mappingCount))
+        self.mappings.freeze()
+        if mappingOffset >= _headerLocalSymbols + 16:
+            self.localSymbolsRange = peekStruct(buf, Struct(endian + '2Q'), position=_headerLocalSymbols)
+    
+    @property
+    def file(self):
+        '''The :class:`~mmap.mmap` object of this sub-cache.'''
+        if self._file is None:
+            flag = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+            fileno = os.open(self.filename, flag)
+            try:
+                self._file = mmap(fileno, 0, access=ACCESS_READ)
+                advise(self._file, 'random')
+            except:
+                os.close(fileno)
+                raise
+            self.fileno = fileno
+        return self._file
+    
+    @property
+    def isOpen(self):
+        '''Whether the file has been mmapped.'''
+        return self._file is not None
+    
+    def close(self):
+        '''Close the file if it is opened by this sub-cache.'''
+        if self._ownsFile:
+            if self._file is not None:
+                self._file.close()
+            if self.fileno >= 0:
+                os.close(self.fileno)
+        self._file = None
+        self.fileno = -1
+    
+    def __str__(self):
+        return "<SubCache [{0}]>".format(self.filename)
 
 
 class DyldSharedCache(object):
@@ -81,12 +315,19 @@ class DyldSharedCache(object):
         
     .. attribute:: mappings
     
-        The :class:`MappingSet` of this shared cache.
+        The :class:`MappingSet` of this shared cache. If the cache is split
+        into several files, this set spans all of them, and :meth:`locate`
+        should be used to find which file a VM address lives in.
+    
+    .. attribute:: subCaches
+    
+        A list of :class:`SubCache`\s, the first being the main file. The
+        other files are only opened when their content is needed.
     
     .. attribute:: images
     
-        A :class:`~data_table.DataTable` of :class:`Image`\s in this shared
-        cache with the following columns:
+        An :class:`ImageTable` of :class:`Image`\s in this shared cache with
+        the following columns:
         
         * ``'address'`` (unique, integer, the VM address to this image)
         
@@ -94,6 +335,31 @@ class DyldSharedCache(object):
           all extensions, e.g. 'UIKit' or 'libxml2'.)
         
         * ``'path'`` (unique, string, the exact path of this image.)
+    
+    .. attribute:: relativeMethodSelectorBase
+    
+        The VM address which the selectors of relative method lists flagged
+        with direct selectors are offsets from, or ``None`` if the cache does
+        not record it.
+    
+    .. attribute:: deferObjC
+    
+        The *deferObjC* argument of the :attr:`Image.machO` objects created
+        afterwards. Set this to ``True`` to read the Objective-C sections of the
+        images only when their content is first accessed.
+    
+    .. attribute:: stringMemo
+    
+        The :class:`~macho.vmaddr.StringMemo` shared by the
+        :attr:`Image.machO` of all images, so a selector used by many images
+        is decoded only once. Assign a bounded memo to limit its size.
+
+    .. attribute:: protocolRegistry
+    
+        The :class:`~objc.protocol.ProtocolRegistry` shared by the
+        :attr:`Image.machO` of all images, so a protocol defined identically in
+        several images is read once and represented by one
+        :class:`~objc.protocol.Protocol` object.
 
     '''
     
@@ -110,6 +376,15 @@ class DyldSharedCache(object):
         self.file = None
         self.endian = endian
         self.arch = None
+        self.subCaches = []
+        self._symbolsCache = None
+        self._localSymbolsIndex = None
+        self._rangeIndex = None
+        self._classIndex = None
+        self.relativeMethodSelectorBase = None
+        self.deferObjC = False
+        self.stringMemo = StringMemo()
+        self.protocolRegistry = ProtocolRegistry()
         
     def open(self):
         """Open the shared cache file object for access.
@@ -122,6 +397,10 @@ class DyldSharedCache(object):
             fileno = os.open(self.filename, flag)
             self.fileno = fileno
             self.file = mmap(fileno, 0, access=ACCESS_READ)
+            # Only a small part of a cache is usually read, so disable the
+            # kernel's read-ahead. The image readers ask for the ranges they
+            # need in bulk (see macho.utilities.advise).
+            advise(self.file, 'random')
         else:
             self.file.seek(0)
         self.__analyze()
@@ -133,6 +412,13 @@ class DyldSharedCache(object):
                   this method explicitly.
         
         """
+        for subCache in self.subCaches:
+            subCache.close()
+        if self._symbolsCache is not None:
+            self._symbolsCache.close()
+        self.subCaches = []
+        self._symbolsCache = None
+        self._localSymbolsIndex = None
         if self.file is not None:
             self.file.close()
             self.file = None
@@ -153,50 +439,409 @@ class DyldSharedCache(object):
             if self.endian is None:
                 raise MachOError('Cannot guess endian from architecture "{0}"'.format(archname))
         
+        endian = self.endian
+        f = self.file
         (mappingOffset, mappingCount, imagesOffset, imagesCount, self.dyldBaseAddress) = \
-            peekStruct(self.file, Struct(self.endian + '4LQ'), position=16)
-            
-        self.mappings = MappingSet(self.__analyzeMappings(mappingOffset, mappingCount))
+            peekStruct(f, Struct(endian + '4LQ'), position=16)
+        if not imagesOffset and mappingOffset >= _headerImages + 8:
+            (imagesOffset, imagesCount) = peekStruct(f, Struct(endian + '2L'), position=_headerImages)
+        
+        # Read the headers of all sub-caches.
+        for subCache in self.subCaches:
+            subCache.close()
+        if self._symbolsCache is not None:
+            self._symbolsCache.close()
+        main = SubCache(self.filename, '', bytes(f[88:104]))
+        main.useFile(self.fileno, f, endian)
+        subCaches = [main]
+        if mappingOffset >= _headerSubCaches + 8:
+            (subCacheOffset, subCacheCount) = peekStruct(f, Struct(endian + '2L'), position=_headerSubCaches)
+            hasSuffix = mappingOffset > _headerCacheSubType
+            entryStruct = Struct(endian + ('16sQ32s' if hasSuffix else '16sQ'))
+            for i, entry in enumerate(peekStructs(f, entryStruct, subCacheCount, position=subCacheOffset)):
+                suffix = fromStringz(entry[2]) if hasSuffix else '.{}'.format(i+1)
+                subCaches.append(SubCache(self.filename + suffix, suffix, entry[0]))
+        self._symbolsCache = None
+        self._localSymbolsIndex = None
+        self._rangeIndex = None
+        self._classIndex = None
+        if mappingOffset >= _headerSymbolFileUUID + 16:
+            symbolFileUUID = bytes(f[_headerSymbolFileUUID:_headerSymbolFileUUID+16])
+            if any(symbolFileUUID):
+                self._symbolsCache = SubCache(self.filename + '.symbols', '.symbols', symbolFileUUID)
+        self._localSymbols64 = mappingOffset >= _headerSymbolFileUUID
+        
+        try:
+            for subCache in subCaches[1:]:
+                subCache.readHeader(endian)
+        except:
+            for subCache in subCaches:
+                subCache.close()
+            raise
+        self.subCaches = subCaches
+        
+        # Build the unified mappings and the index for locate().
+        regions = sorted((m.address, m.size, m.offset, subCache) for subCache in subCaches for m in subCache.mappings if m.offset >= 0)
+        self._regionStarts = [r[0] for r in regions]
+        self._regions = regions
+        self.mappings = MappingSet(m for subCache in subCaches for m in subCache.mappings)
         self.mappings.freeze()
+        self._baseAddress = min(m.address for m in main.mappings) if main.mappings else 0
         
-        images = DataTable('!address', '!name', '!path')
-        for image in self.__analyzeImages(imagesOffset, imagesCount):
-            path = image.path
-            bn = basename(path)
-            while True:
-                (stem, ext) = splitext(bn)
-                if not ext:
-                    break
-                bn = stem
-                
-            images.append(image, address=image.address, name=bn, path=path)
+        # Read relativeMethodSelectorBaseAddressOffset of the ObjC
+        # optimization header. It is relative to the base address.
+        self.relativeMethodSelectorBase = None
+        if mappingOffset >= _headerObjCOpts + 16:
+            (objcOptsOffset, objcOptsSize) = peekStruct(f, Struct(endian + '2Q'), position=_headerObjCOpts)
+            (subCache, offset) = self.locate(self._baseAddress + objcOptsOffset)
+            if objcOptsSize >= 56 and subCache is not None:
+                (selectorBaseOffset, ) = peekStruct(subCache.file, Struct(endian + 'Q'), position=offset+48)
+                if selectorBaseOffset:
+                    self.relativeMethodSelectorBase = self._baseAddress + selectorBaseOffset
+        
+        infos = Struct(self.endian + '3Q2L').iter_unpack(self.file[imagesOffset:imagesOffset + 32*imagesCount])
+        self.images = ImageTable(self, list(infos))
+        
+    
+    def extractAll(self, directory, workers=None):
+        '''Extract every image of this cache into *directory* as standalone
+        Mach-O files, keeping their paths (e.g. ``/usr/lib/libz.dylib`` is
+        written to ``<directory>/usr/lib/libz.dylib``). Returns the list of
+        extracted file paths.
+        
+        The images are extracted concurrently with a pool of *workers*
+        threads. See :meth:`Image.extract` for detail.
+        '''
+        
+        def extractOne(image):
+            path = join(directory, image.path.lstrip('/'))
+            os.makedirs(dirname(path), exist_ok=True)
+            image.extract(path)
+            return path
             
-        self.images = images
+        # Images with symbolic links appear more than once in the table.
+        images = dict((image.index, image) for image in self.images).values()
+        with ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(extractOne, images))
+    
+    def locate(self, vmaddr):
+        '''Find the sub-cache containing the VM address *vmaddr*. Returns a
+        (:class:`SubCache`, file offset) tuple, or ``(None, -1)`` if the address
+        is not mapped. The sub-cache is not opened by this method.'''
         
+        i = bisect_right(self._regionStarts, vmaddr) - 1
+        if i >= 0:
+            (address, size, offset, subCache) = self._regions[i]
+            if vmaddr < address + size:
+                return (subCache, vmaddr - address + offset)
+        return (None, -1)
     
-    def __analyzeMappings(self, offset, count):
-        mappings = peekStructs(self.file, Struct(self.endian + '3Q2L'), count, position=offset)
-        return (Mapping(*content) for content in mappings)
+    def __imageRangeIndex(self):
+        # Returns ([start], [(start, end, image index)]) sorted by start.
+        index = self._rangeIndex
+        if index is None:
+            images = self.images
+            endian = self.endian
+            locate = self.locate
+            ranges = []
+            for address, indices in images._addressAliases().items():
+                (subCache, offset) = locate(address)
+                if subCache is None:
+                    continue
+                for (segname, vmaddr, vmsize) in _readSegments(subCache.file, offset, endian):
+                    # __LINKEDIT is shared by all images.
+                    if vmsize and segname != '__LINKEDIT':
+                        ranges.append((vmaddr, vmaddr + vmsize, indices[0]))
+            ranges.sort()
+            index = self._rangeIndex = ([r[0] for r in ranges], ranges)
+        return index
     
+    def imageContaining(self, vmaddr):
+        '''Find the :class:`Image` having a segment (other than
+        ``__LINKEDIT``) which contains the VM address *vmaddr*. Returns
+        ``None`` if there is no such image.
+        
+        On first call, an interval index of all segments is built by reading
+        only the segment load commands of every image, without analyzing them.
+        '''
+        return self.imagesContaining([vmaddr])[0]
     
-    def __analyzeImages(self, offset, count):
-        images = peekStructs(self.file, Struct(self.endian + '3Q2L'), count, position=offset)
-        f = self.file
-        image_for_address = {}
+    def imagesContaining(self, vmaddrs):
+        '''Find the owning :class:`Image` of every VM address in the iterable
+        *vmaddrs*. Returns a list, with ``None`` for addresses not in any
+        image. See :meth:`imageContaining` for detail.'''
         
-        for i, (address, modTime, inode, pathFileOffset, pad) in enumerate(images):
-            path = peekString(f, position=pathFileOffset)
-            if address in image_for_address:
-                image = image_for_address[address]
-                image.symlinks.append(path)
+        (starts, ranges) = self.__imageRangeIndex()
+        images = self.images
+        res = []
+        res_append = res.append
+        for vmaddr in vmaddrs:
+            i = bisect_right(starts, vmaddr) - 1
+            if i >= 0 and vmaddr < ranges[i][1]:
+                res_append(images[ranges[i][2]])
             else:
-                image = Image(address, modTime, inode, path, pad)
-                image.cache = self
-                image.index = i
-                image_for_address[address] = image
-            yield image
+                res_append(None)
+        return res
+    
+    def __classIndex(self):
+        # Returns {class name: (image index, vmaddr)}.
+        index = self._classIndex
+        if index is None:
+            endian = self.endian
+            locate = self.locate
+            is64bit = self.arch.is64bit
+            ptrStruct = Struct(endian + ('Q' if is64bit else 'L'))
+            ptrSize = ptrStruct.size
+            # The low bits of class_t::data are flags. class_ro_t::name is
+            # after 3 uint32_t's, padding and a pointer.
+            dataMask = 0x00007ffffffffff8 if is64bit else 0xfffffffc
+            roNameOffset = 24 if is64bit else 16
+            
+            def deref(vmaddr):
+                (subCache, offset) = locate(vmaddr)
+                if subCache is None:
+                    return 0
+                return ptrStruct.unpack_from(subCache.file, offset)[0]
             
-                        
+            index = {}
+            for address, indices in self.images._addressAliases().items():
+                (subCache, offset) = locate(address)
+                if subCache is None:
+                    continue
+                for (sectaddr, size) in _readSections(subCache.file, offset, endian, '__objc_classlist'):
+                    (listCache, listOffset) = locate(sectaddr)
+                    if listCache is None:
+                        continue
+                    f = listCache.file
+                    for (vmaddr, ) in ptrStruct.iter_unpack(f[listOffset:listOffset + size - size % ptrSize]):
+                        ro = deref(vmaddr + 4 * ptrSize) & dataMask
+                        namePtr = deref(ro + roNameOffset) if ro else 0
+                        (nameCache, nameOffset) = locate(namePtr) if namePtr else (None, -1)
+                        if nameCache is not None:
+                            name = peekString(nameCache.file, position=nameOffset)
+                            index.setdefault(name, (indices[0], vmaddr))
+            self._classIndex = index
+        return index
+    
+    def classLocation(self, name):
+        '''Find the Objective-C class named *name* in this cache. Returns an
+        (:class:`Image`, VM address) tuple, or ``(None, 0)`` if no image
+        defines the class.
+        
+        On first call, an index of all classes is built by reading only the
+        class names from the ``__objc_classlist`` of every image, without
+        analyzing the images.
+        '''
+        if name.startswith('_OBJC_CLASS_$_'):
+            name = name[14:]
+        entry = self.__classIndex().get(name)
+        if entry is None:
+            return (None, 0)
+        return (self.images[entry[0]], entry[1])
+    
+    def classNamed(self, name):
+        '''Return the :class:`~objc.class_.Class` named *name* defined in
+        this cache, or ``None`` if there is no such class. The defining image is
+        analyzed once, with the features enabled, and its class table is
+        reused afterwards. This can be used as the
+        :attr:`~objc.class_.RemoteClass.resolver` of remote classes.'''
+        (image, vmaddr) = self.classLocation(name)
+        if image is None:
+            return None
+        classes = image.machO.anySectionProperty('className', 'ObjCClassListSection', 'classes', default=None)
+        return classes.any('addr', vmaddr) if classes is not None else None
+    
+    def __localSymbolsIndex(self):
+        # Returns (file, nlist position, strings position, strings size,
+        # {dylibOffset: (nlistStartIndex, nlistCount)}).
+        index = self._localSymbolsIndex
+        if index is None:
+            subCache = self._symbolsCache
+            if subCache is not None:
+                subCache.readHeader(self.endian)
+            else:
+                subCache = self.subCaches[0]
+            (infoOffset, infoSize) = subCache.localSymbolsRange
+            if not infoSize:
+                index = (None, 0, 0, 0, {})
+            else:
+                f = subCache.file
+                endian = self.endian
+                (nlistOffset, _, stringsOffset, stringsSize, entriesOffset, entriesCount) = \
+                    peekStruct(f, Struct(endian + '6L'), position=infoOffset)
+                entryStruct = Struct(endian + ('Q2L' if self._localSymbols64 else '3L'))
+                entriesStart = infoOffset + entriesOffset
+                entries = entryStruct.iter_unpack(f[entriesStart:entriesStart + entryStruct.size * entriesCount])
+                index = (f, infoOffset + nlistOffset, infoOffset + stringsOffset, stringsSize,
+                         dict((dylibOffset, (start, count)) for dylibOffset, start, count in entries))
+            self._localSymbolsIndex = index
+        return index
+    
+    def localSymbols(self, image):
+        '''Return a list of the local :class:`~sym.Symbol`\s of the *image*,
+        which are stripped from the images and stored in a separate blob (or
+        the ``.symbols`` file) of the shared cache.
+        
+        The entry table is read once on the first call. The nlist structures
+        of the image are then unpacked in bulk, and each name is sliced
+        directly from the mmap.
+        '''
+        
+        (f, nlistPosition, stringsPosition, stringsSize, entries) = self.__localSymbolsIndex()
+        if self._localSymbols64:
+            dylibOffset = image.address - self._baseAddress
+        else:
+            dylibOffset = self.subCaches[0].mappings.fromVM(image.address)
+        if dylibOffset not in entries:
+            return []
+        (start, count) = entries[dylibOffset]
+        
+        nlistStruct = Struct(self.endian + ('LBBHQ' if self.arch.is64bit else 'LBBHL'))
+        nlistStart = nlistPosition + start * nlistStruct.size
+        stringsEnd = stringsPosition + stringsSize
+        f_find = f.find
+        
+        symbols = []
+        for (idx, typ, sect, desc, value) in nlistStruct.iter_unpack(f[nlistStart:nlistStart + count * nlistStruct.size]):
+            idx += stringsPosition
+            end = f_find(b'\0', idx, stringsEnd)
+            if end < 0:
+                end = stringsEnd
+            symtype = SYMTYPE_GENERIC if (typ & 0xe) else SYMTYPE_UNDEFINED
+            isThumb = bool(desc & 8)
+            if isThumb:
+                value &= ~1
+            symbols.append(Symbol(f[idx:end].decode('utf_8', 'replace'), value, symtype, -1, 0, bool(typ & 1), isThumb))
+        return symbols
+
+
+def _imageName(path):
+    # Equivalent to stripping extensions with splitext() repeatedly, e.g.
+    # '/usr/lib/libz.1.2.3.dylib' -> 'libz'.
+    bn = basename(path)
+    stripped = bn.lstrip('.')
+    i = stripped.find('.')
+    return bn if i < 0 else bn[:len(bn) - len(stripped) + i]
+
+
+class ImageTable(Sequence):
+    '''A read-only table of :class:`Image`\s in a shared cache. It provides
+    the same query methods as a :class:`~data_table.DataTable` with the unique
+    columns ``'address'``, ``'name'`` and ``'path'``.
+    
+    Only the raw ``dyld_cache_image_info`` tuples are read when the cache is
+    opened. An :class:`Image` is created when it is first accessed, and the
+    hash index of a column is built when the column is first queried. Looking
+    up an image by ``'address'`` never decodes any paths.
+    
+    Like the original table, an image having symbolic links appears once per
+    path when iterated.
+    '''
+    
+    def __init__(self, cache, infos):
+        self._cache = cache
+        self._infos = infos
+        self._values = [None] * len(infos)
+        self._paths = [None] * len(infos)
+        self._indices = {}
+        self._aliases = None
+    
+    def _path(self, i):
+        path = self._paths[i]
+        if path is None:
+            path = self._paths[i] = peekString(self._cache.file, position=self._infos[i][3])
+        return path
+    
+    def _addressAliases(self):
+        aliases = self._aliases
+        if aliases is None:
+            aliases = {}
+            for i, info in enumerate(self._infos):
+                address = info[0]
+                if address in aliases:
+                    aliases[address].append(i)
+                else:
+                    aliases[address] = [i]
+            self._aliases = aliases
+        return aliases
+    
+    def _index(self, columnName):
+        index = self._indices.get(columnName)
+        if index is None:
+            if columnName == 'address':
+                index = dict((address, indices[0]) for address, indices in self._addressAliases().items())
+            elif columnName == 'path':
+                index = dict((self._path(i), i) for i in range(len(self._infos)))
+            elif columnName == 'name':
+                index = dict((_imageName(self._path(i)), i) for i in range(len(self._infos)))
+            else:
+                raise KeyError(columnName)
+            self._indices[columnName] = index
+        return index
+    
+    def __getitem__(self, i):
+        "Get the *i*-th image."
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        image = self._values[i]
+        if image is None:
+            (address, modTime, inode, _, pad) = self._infos[i]
+            indices = self._addressAliases()[address]
+            first = indices[0]
+            image = Image(address, modTime, inode, self._path(first), pad)
+            image.symlinks = [self._path(j) for j in indices[1:]]
+            image.cache = self._cache
+            image.index = first
+            for j in indices:
+                self._values[j] = image
+        return image
+    
+    def __iter__(self):
+        "Returns an iterable of the images."
+        return (self[i] for i in range(len(self._infos)))
+    
+    def __len__(self):
+        "Returns the number of entries in this table."
+        return len(self._infos)
+    
+    @property
+    def values(self):
+        '''Return a list of all images.'''
+        return list(self)
+    
+    @property
+    def columnNames(self):
+        '''Return an iterable of valid column names.'''
+        return ('address', 'name', 'path')
+    
+    def isColumnUnique(self, columnName):
+        '''Checks if a column is unique. All columns are unique.'''
+        return True
+    
+    def column(self, columnName):
+        '''Return an iterable of key-image pairs provided by a column.'''
+        return ((key, self[i]) for key, i in self._index(columnName).items())
+    
+    def all(self, columnName, key):
+        '''Return a list of images with the given *key* in the specified
+        column.'''
+        i = self._index(columnName).get(key)
+        return [] if i is None else [self[i]]
+    
+    def any(self, columnName, key, default=None):
+        '''Return the image with the given *key* in the specified column. If no
+        such key exists, a *default* value will be returned.'''
+        i = self._index(columnName).get(key)
+        return default if i is None else self[i]
+    
+    def any1(self, columnName, key):
+        '''Return the image with the given *key* in the specified column. If no
+        such key exists, a :exc:`KeyError` will be raised.'''
+        return self[self._index(columnName)[key]]
+    
+    def contains(self, columnName, key):
+        '''Checks if *key* exists in *columnName*.'''
+        return key in self._index(columnName)
 
 
 class Image(object):
@@ -256,16 +901,136 @@ class Image(object):
         This object's content is weak-referenced from its shared cache file, 
         therefore, you need to ensure that the shared cache file is open as long
         as you need to read from this object.
+        
+        If the cache is split into several files, the object reads from the
+        :class:`SubCache` containing the image's header, and only addresses
+        mapped by that file can be resolved.
         '''
         if self._machO is None:
             cache = self.cache
-            mo = MachO(self.path, cache.arch)
+            (subCache, offset) = cache.locate(self.address)
+            if subCache is None:
+                raise MachOError('Image "{}" is not mapped in the cache.'.format(self.path))
+            mo = MachO(self.path, cache.arch, deferObjC=cache.deferObjC)
             mo.cache = cache
-            mo.mappings = cache.mappings
-            mo.openWith(cache.file, cache.mappings.fromVM(self.address))
+            mo.mappings = subCache.mappings
+            mo.stringMemo = cache.stringMemo
+            mo.openWith(subCache.file, offset)
             self._machO = mo
         return self._machO
 
+    def extract(self, path):
+        '''Write this image as a standalone Mach-O file to *path*.
+        
+        The segments are gathered from the cache's mappings and laid out
+        consecutively on page boundaries, and the file offsets in the load
+        commands are rewritten accordingly. Since the ``__LINKEDIT`` segment
+        is shared by all images in the cache, only the range referenced by this
+        image's load commands is copied. The contents of the segments are not
+        modified, so pointers still refer to the cache's address space.
+        
+        The shared cache file needs to be open. If the cache is split into
+        several files, the segments are gathered from all of them.
+        '''
+        
+        cache = self.cache
+        endian = cache.endian
+        locate = cache.locate
+        
+        (subCache, headerOffset) = locate(self.address)
+        if subCache is None:
+            raise MachOError('Image "{}" is not mapped in the cache.'.format(self.path))
+        f = subCache.file
+        (magic, ) = peekStruct(f, Struct('<L'), position=headerOffset)
+        is64bit = magic in (0xfeedfacf, 0xcffaedfe)
+        ptr = 'Q' if is64bit else 'L'
+        ptrSize = 8 if is64bit else 4
+        headerSize = 32 if is64bit else 28
+        (ncmds, sizeofcmds) = peekStruct(f, Struct(endian + '2L'), position=headerOffset+16)
+        header = bytearray(f[headerOffset:headerOffset+headerSize+sizeofcmds])
+        
+        cmdStruct = Struct(endian + '2L')
+        segStruct = Struct(endian + '16s4' + ptr)
+        u32 = Struct(endian + 'L')
+        pointer = Struct(endian + ptr)
+        sectSize = 68 + 12 * is64bit
+        
+        # Collect the segments and the offset fields into __LINKEDIT.
+        segments = []
+        linkeditFields = []
+        position = headerSize
+        for i in range(ncmds):
+            (cmd, cmdsize) = cmdStruct.unpack_from(header, position)
+            cmd &= ~0x80000000
+            if cmd in (LC_SEGMENT, LC_SEGMENT_64):
+                (segname, vmaddr, vmsize, fileoff, filesize) = segStruct.unpack_from(header, position+8)
+                segments.append((position, segname.rstrip(b'\0'), vmaddr, filesize))
+            elif cmd == LC_SYMTAB:
+                (symoff, nsyms, stroff, strsize) = Struct(endian + '4L').unpack_from(header, position+8)
+                linkeditFields.append((position+8, symoff, nsyms * (8 + 2*ptrSize)))
+                linkeditFields.append((position+16, stroff, strsize))
+            elif cmd == LC_DYSYMTAB:
+                values = Struct(endian + '18L').unpack_from(header, position+8)
+                for offIndex, countIndex, entrySize in _dysymtabTables:
+                    linkeditFields.append((position+8+4*offIndex, values[offIndex], values[countIndex] * (entrySize or 52 + 4*is64bit)))
+            elif cmd == LC_DYLD_INFO:
+                values = Struct(endian + '10L').unpack_from(header, position+8)
+                for j in range(0, 10, 2):
+                    linkeditFields.append((position+8+4*j, values[j], values[j+1]))
+            elif cmd in _linkeditDataCommands:
+                (dataoff, datasize) = Struct(endian + '2L').unpack_from(header, position+8)
+                linkeditFields.append((position+8, dataoff, datasize))
+            position += cmdsize
+        
+        linkeditFields = [field for field in linkeditFields if field[1] and field[2]]
+        
+        flag = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+        dst = os.open(path, flag, 0o644)
+        try:
+            # Copy the segments.
+            cursor = 0
+            for (position, segname, vmaddr, filesize) in segments:
+                if segname == b'__LINKEDIT' and linkeditFields:
+                    # The offsets are relative to the file holding __LINKEDIT.
+                    source = locate(vmaddr)[0]
+                    srcOffset = min(field[1] for field in linkeditFields)
+                    filesize = max(field[1] + field[2] for field in linkeditFields) - srcOffset
+                    for (fieldPosition, offset, _) in linkeditFields:
+                        u32.pack_into(header, fieldPosition, offset - srcOffset + cursor)
+                else:
+                    (source, srcOffset) = locate(vmaddr) if filesize else (None, -1)
+                    if source is None:
+                        filesize = 0
+                
+                fileoff = cursor if filesize else 0
+                pointer.pack_into(header, position+8+16+2*ptrSize, fileoff)
+                pointer.pack_into(header, position+8+16+3*ptrSize, filesize)
+                
+                # Rewrite the file offsets of the sections.
+                (nsects, ) = u32.unpack_from(header, position+8+16+4*ptrSize+8)
+                sectPosition = position + 8 + 16 + 4*ptrSize + 16
+                for j in range(nsects):
+                    (addr, ) = pointer.unpack_from(header, sectPosition+32)
+                    (offset, ) = u32.unpack_from(header, sectPosition+32+2*ptrSize)
+                    (flags, ) = u32.unpack_from(header, sectPosition+32+2*ptrSize+16)
+                    if offset and filesize and (flags & 0xff) not in _zeroFillTypes:
+                        u32.pack_into(header, sectPosition+32+2*ptrSize, addr - vmaddr + fileoff)
+                    sectPosition += sectSize
+                
+                if filesize:
+                    _copyRange(dst, source, srcOffset, fileoff, filesize)
+                    cursor = (fileoff + filesize + 0xfff) & ~0xfff
+            
+            # This image is no longer in a shared cache. Clear MH_DYLIB_IN_CACHE.
+            (flags, ) = u32.unpack_from(header, 24)
+            u32.pack_into(header, 24, flags & ~0x80000000)
+            
+            # Write the rewritten header on top of the __TEXT segment.
+            os.lseek(dst, 0, os.SEEK_SET)
+            os.write(dst, header)
+        finally:
+            os.close(dst)
+    
     def __str__(self):
         return "<Image [{0}] @ 0x{1:x}>".format(self.path, self.address)
 
@@ -59,13 +59,8 @@ class MachO_SymbolPatches(MachO):
             
         '''
         
-        self_symbols = self.symbols
-        self_symbols_any = self_symbols.any
-        self_symbols_associate = self_symbols.associate
-        
-        for i, addr in ordinalsAndAddresses:
-            theSymbol = self_symbols_any(columnName, i)
-            if theSymbol:
-                self_symbols_associate(theSymbol, 'addr', [addr])
+        self_symbols_any = self.symbols.any
+        symbolsAndAddresses = ((self_symbols_any(columnName, i), addr) for i, addr in ordinalsAndAddresses)
+        self.symbols.associateMany('addr', (p for p in symbolsAndAddresses if p[0]))
         
     
@@ -29,9 +29,14 @@ Members
 
 
 from struct import Struct, unpack_from
+from mmap import PAGESIZE
+import mmap
 import os
 import array
 
+
+_adviceFlags = dict((name, getattr(mmap, 'MADV_' + name.upper())) for name in ('normal', 'random', 'sequential', 'willneed', 'dontneed') if hasattr(mmap, 'MADV_' + name.upper()))
+
 def readString(f, encoding='utf_8', returnLength=False):
     """Read a null-terminated string from an :class:`mmap.mmap` object.
     
@@ -75,6 +80,27 @@ def peekString(f, encoding='utf_8', position=-1, returnLength=False):
         return string
 
 
+def peekStrings(f, size, encoding='utf_8', position=-1):
+    """Split *size* bytes of an :class:`mmap.mmap` object into null-terminated
+    strings without moving the cursor.
+
+    Returns an iterable of (relative offset, string) tuples. Empty strings are
+    skipped. The bytes are split in one go, but each string is only decoded
+    when the iterable reaches it.
+
+    """
+
+    if position < 0:
+        position = f.tell()
+
+    offset = 0
+    for piece in f[position:position+size].split(b'\0'):
+        length = len(piece)
+        if length:
+            yield (offset, piece.decode(encoding, 'replace'))
+        offset += length + 1
+
+
 def peekFixedLengthString(f, length, encoding='utf_8', position=-1):
     """Read a fixed length string from an :class:`mmap.mmap` object without
     moving the cursor.
@@ -217,6 +243,35 @@ def readStruct(f, stru, position=-1):
 
 
 
+def advise(f, advice, position=0, length=-1):
+    """Tell the kernel how the *length* bytes at *position* of an
+    :class:`mmap.mmap` object will be accessed. *advice* should be one of
+    ``'normal'``, ``'random'``, ``'sequential'``, ``'willneed'`` and
+    ``'dontneed'`` (see :meth:`mmap.mmap.madvise`). If *length* is negative,
+    the advice applies till the end of *f*.
+    
+    The range is expanded to page boundaries. This function does nothing if
+    the platform does not support the advice.
+    
+    """
+    
+    flag = _adviceFlags.get(advice)
+    madvise = getattr(f, 'madvise', None)
+    if flag is None or madvise is None:
+        return
+    
+    size = len(f)
+    if length < 0:
+        length = size - position
+    start = position - position % PAGESIZE
+    length = min(length + position - start, size - start)
+    if length > 0:
+        try:
+            madvise(flag, start, length)
+        except (OSError, ValueError):
+            pass
+
+
 def fromStringz(s):
     """Strip terminating zeros of a byte string and decode it into a string.
     
@@ -251,6 +306,11 @@ if __name__ == '__main__':
         f.seek(pos)
         assert readSLeb128(f) == -0x1649
         assert readString(f) == 'wtf'
+        assert list(peekStrings(f, 13, position=0)) == [(0, 'helló'), (7, 'world')]
+        assert list(peekStrings(f, 7, position=6)) == [(1, 'world')]
         assert list(peekPrimitives(f, 'B', 3, endian='>', is64bit=False, position=4)) == [0xc3, 0xb3, 0]
         assert list(peekPrimitives(f, 'H', 2, endian='<', is64bit=False, position=4)) == [0xb3c3, 0x7700]
+        advise(f, 'willneed', position=5, length=3)
+        advise(f, 'no-such-advice')
+        advise(f, 'random', position=len(f))
         f.close()
@@ -21,7 +21,9 @@ from .macho import MachO
 from monkey_patching import patch
 
 from operator import attrgetter
-from collections import Hashable, Set
+from collections import Hashable, Set, OrderedDict
+from bisect import bisect_right
+from sys import intern
 
 
 def _fromToVM(mappings, src, func):
@@ -123,6 +125,7 @@ class MappingSet(Set):
         'Make mapping set immutable.'
         if self.mutable:
             self._lst = frozenset(self._lst)
+            self._vmIndex = None
         
 
     def fromVM(self, vmaddr):
@@ -135,6 +138,33 @@ class MappingSet(Set):
         return _fromToVM(self._lst, vmaddr, Mapping.fromVM)
     
     
+    def fromVMs(self, vmaddrs):
+        '''
+        Convert an iterable of VM addresses to a list of corresponding file
+        offsets with this mapping set. Invalid addresses are converted to -1.
+        
+        The mappings are sorted once, so this is much faster than calling
+        :meth:`fromVM` repeatedly when there are many addresses to convert.
+        '''
+        
+        if self._vmIndex is None:
+            mappings = sorted((m for m in self._lst if m.offset >= 0), key=attrgetter('address'))
+            self._vmIndex = ([m.address for m in mappings], mappings)
+        (starts, mappings) = self._vmIndex
+        
+        res = []
+        res_append = res.append
+        for vmaddr in vmaddrs:
+            i = bisect_right(starts, vmaddr) - 1
+            if i >= 0:
+                m = mappings[i]
+                if vmaddr < m.address + m.size:
+                    res_append(vmaddr - m.address + m.offset)
+                    continue
+            res_append(_fromToVM(self._lst, vmaddr, Mapping.fromVM))
+        return res
+    
+    
     def toVM(self, offset):
         '''
         Convert a file offset to the corresponding VM address with this mapping
@@ -166,10 +196,12 @@ class MappingSet(Set):
             yield lastMapping
 
         self._lst = set(_optimized())
+        self._vmIndex = None
         
         
     def __init__(self, lst=None):
         self._lst = set(lst or [])
+        self._vmIndex = None
         
     def __iter__(self):
         'Traverse of the mapping set.'
@@ -190,11 +222,58 @@ class MappingSet(Set):
         Raise an :exc:`AttributeError` if the set is already frozen.
         '''
         self._lst.add(mapping)
+        self._vmIndex = None
         
     def __repr__(self):
         return 'MappingSet({0!r})'.format(self._lst)
 
 
+class StringMemo(object):
+    '''
+    A memo from VM addresses to the strings stored there. The strings are
+    :func:`interned <sys.intern>`, so equal strings found at different
+    addresses (e.g. the same selector in several images) share one object.
+    
+    If *maxsize* is given, at most this number of strings are kept, and the
+    least recently used ones are dropped first.
+    
+    .. attribute:: maxsize
+    
+        The maximum number of strings kept, or ``None`` if unbounded.
+    
+    '''
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._strings = OrderedDict() if maxsize else {}
+    
+    def get(self, vmaddr):
+        '''Return the string memoized at *vmaddr*, or ``None``.'''
+        string = self._strings.get(vmaddr)
+        if string is not None and self.maxsize:
+            self._strings.move_to_end(vmaddr)
+        return string
+    
+    def add(self, vmaddr, string):
+        '''Memoize *string* at *vmaddr*, and return the interned string.'''
+        string = intern(string)
+        strings = self._strings
+        strings[vmaddr] = string
+        if self.maxsize and len(strings) > self.maxsize:
+            strings.popitem(last=False)
+        return string
+    
+    def clear(self):
+        '''Forget all memoized strings.'''
+        self._strings.clear()
+    
+    def __len__(self):
+        return len(self._strings)
+    
+    def __contains__(self, vmaddr):
+        return vmaddr in self._strings
+        
+
 @patch
 class MachO_VMAddr(MachO):
     '''
@@ -205,13 +284,43 @@ class MachO_VMAddr(MachO):
     
         The :class:`MappingSet` for this Mach-O file object.
         
+    .. attribute:: stringMemo
+    
+        The :class:`StringMemo` used by :meth:`derefInternedString`. It is
+        created on first use, with at most :attr:`stringMemoSize` strings.
+        Several Mach-O objects (e.g. images of the same shared cache) may
+        share a memo by assigning to this attribute.
+    
+    .. attribute:: stringMemoSize
+    
+        The size bound of new string memos, ``None`` (the default) if
+        unbounded. Can be set per object or on the class.
+        
     '''
+    
+    stringMemoSize = None
+    
+    @property
+    def stringMemo(self):
+        memo = getattr(self, '_stringMemo', None)
+        if memo is None:
+            memo = self._stringMemo = StringMemo(self.stringMemoSize)
+        return memo
+    
+    @stringMemo.setter
+    def stringMemo(self, memo):
+        self._stringMemo = memo
 
     def fromVM(self, vmaddr):
         """Convert a VM address to file offset. Returns -1 if the address does
         not exist."""
         return self.mappings.fromVM(vmaddr)
     
+    def fromVMs(self, vmaddrs):
+        """Convert an iterable of VM addresses to a list of file offsets. See
+        :meth:`MappingSet.fromVMs` for detail."""
+        return self.mappings.fromVMs(vmaddrs)
+    
     def toVM(self, offset):
         """Convert a file offset to VM address. Returns -1 if the address does
         not exist."""
@@ -235,6 +344,42 @@ class MachO_VMAddr(MachO):
         if offset < 0:
             return None
         return peekString(self.file, encoding=encoding, returnLength=returnLength, position=offset+self.origin)
+    
+    def derefInternedString(self, vmaddr):
+        '''Like :meth:`derefString`, but the decoded string is memoized in
+        :attr:`stringMemo` and interned. This is meant for strings referenced
+        many times, like selectors and type encodings.
+        
+        Unlike :meth:`derefString`, ``None`` is also returned if the string
+        starts in an encrypted region (see
+        :meth:`~macho.loadcommands.encryption_info.MachO_EncryptionPatches.isRangeEncrypted`),
+        as it would only contain ciphertext.'''
+        memo = self.stringMemo
+        string = memo.get(vmaddr)
+        if string is None:
+            offset = self.fromVM(vmaddr)
+            if offset >= 0 and not getattr(self, 'isRangeEncrypted', lambda x, y: False)(offset, 1):
+                string = memo.add(vmaddr, peekString(self.file, position=offset+self.origin))
+        return string
+        
+    def derefInternedStrings(self, vmaddrs):
+        '''Apply :meth:`derefInternedString` to a sequence of VM addresses,
+        and return a list of strings. The addresses not yet memoized are
+        converted together with :meth:`fromVMs`.'''
+        memo = self.stringMemo
+        memo_get = memo.get
+        res = [memo_get(vmaddr) for vmaddr in vmaddrs]
+        missing = list(dict.fromkeys(vmaddr for vmaddr, string in zip(vmaddrs, res) if string is None))
+        if missing:
+            file = self.file
+            origin = self.origin
+            isRangeEncrypted = getattr(self, 'isRangeEncrypted', lambda x, y: False)
+            found = {}
+            for vmaddr, offset in zip(missing, self.fromVMs(missing)):
+                if offset >= 0 and not isRangeEncrypted(offset, 1):
+                    found[vmaddr] = memo.add(vmaddr, peekString(file, position=offset+origin))
+            res = [found.get(vmaddr) if string is None else string for vmaddr, string in zip(vmaddrs, res)]
+        return res
         
     def derefBytes(self, vmaddr, length):
         '''Get bytes with length *length* at the VM address *vmaddr*. Returns
@@ -246,6 +391,17 @@ class MachO_VMAddr(MachO):
 
 
 if __name__ == '__main__':
+    memo = StringMemo(maxsize=2)
+    assert memo.get(10) is None
+    assert memo.add(10, 'init') == 'init'
+    memo.add(20, ''.join(['dea', 'lloc']))
+    assert memo.get(20) == 'dealloc'
+    memo.get(10)
+    memo.add(30, 'hash')
+    assert 10 in memo and 20 not in memo and len(memo) == 2
+    memo.clear()
+    assert len(memo) == 0
+    
     m1 = Mapping(address=1000, size=500, offset=1000, maxprot=7, initprot=7)
     m2 = Mapping(address=1500, size=1500, offset=1500, maxprot=7, initprot=7)    # m1 and m2 should be merged
     m3 = Mapping(address=3000, size=1000, offset=3000, maxprot=5, initprot=5)   # m2 and m3 should not be merged due to difference in protection level
@@ -263,7 +419,11 @@ if __name__ == '__main__':
     assert mappings.mutable
     assert mappings == MappingSet([m1, m2, m3, m4, m5, m6, m7])
 
+    # optimize() is called while segments still add mappings, so it must keep
+    # the set mutable. Only freeze() makes it immutable.
     mappings.optimize()
+    assert mappings.mutable
+    mappings.freeze()
     assert not mappings.mutable
 
     assert mappings == MappingSet([Mapping(address=1000, size=2000, offset=1000, maxprot=7, initprot=7), m3, m4, m5, m6, m7])
@@ -274,6 +434,7 @@ if __name__ == '__main__':
     assert mappings.fromVM(100304) == 5404
     assert mappings.fromVM(100500) == -1
     assert mappings.fromVM(100515) == 14
+    assert mappings.fromVMs([1750, 4009, 7302, 100304, 100500, 100515]) == [1750, 5009, -1, 5404, -1, 14]
     
     assert mappings.toVM(1750) == 1750
     assert mappings.toVM(4009) == -1
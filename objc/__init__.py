@@ -15,4 +15,4 @@
 #	You should have received a copy of the GNU General Public License
 #	along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-__all__ = ['class_', 'method', 'ivar', 'property', 'protocol', 'category', 'classlike']
+__all__ = ['class_', 'method', 'ivar', 'property', 'protocol', 'category', 'classlike', 'index', 'impindex']
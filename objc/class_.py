@@ -79,12 +79,69 @@ class Class(ClassLike):
 		return self.stringify('@interface ', middle, ''.join(suffix))
 		
 
+class LazyClass(Class):
+	"""A :class:`Class` of which only the name is known at first. The other
+	attributes are filled in from the :class:`Class` returned by calling
+	*loader* without arguments, when any of them is first accessed.
+	
+	Attributes assigned before loading are kept.
+	
+	.. attribute:: isLoaded
+	
+		Whether the content of this class has been loaded.
+	
+	"""
+	
+	def __init__(self, name, loader):
+		self.name = name
+		self._loader = loader
+	
+	@property
+	def isLoaded(self):
+		return self.__dict__.get('_loader') is None
+	
+	def load(self):
+		"""Load the content of this class now, if not done yet."""
+		loader = self.__dict__.get('_loader')
+		if loader is not None:
+			cls = loader()
+			selfDict = self.__dict__
+			for key, value in cls.__dict__.items():
+				selfDict.setdefault(key, value)
+			self._loader = None
+	
+	def __getattr__(self, attr):
+		# only called when the attribute is not found normally.
+		if attr[:2] == '__' or self.isLoaded:
+			raise AttributeError(attr)
+		self.load()
+		return getattr(self, attr)
+
+
 class RemoteClass(ClassLike):
-	"""A structure representing an external class."""
-	def __init__(self, symbol):
+	"""A structure representing an external class.
+	
+	.. attribute:: resolver
+	
+		A function which takes the class name and returns the
+		:class:`Class` it refers to, or ``None`` if unknown. It is set by
+		readers which know where to find the external classes, e.g. for
+		images in a :class:`~macho.sharedcache.DyldSharedCache`.
+	
+	"""
+	def __init__(self, symbol, resolver=None):
 		name = symbol.name
 		if symbol.symtype == SYMTYPE_UNDEFINED:
 			name = name[14:]
 		
 		super().__init__(name)
 		self.symbol = symbol
+		self.resolver = resolver
+		self._resolved = None
+	
+	def resolve(self):
+		"""Return the :class:`Class` this external class refers to, or
+		``None`` if it cannot be found. The result is memoized."""
+		if self._resolved is None and self.resolver is not None:
+			self._resolved = self.resolver(self.name)
+		return self._resolved
@@ -0,0 +1,166 @@
+#
+#	impindex.py ... Index of ObjC method implementations by address
+#	Copyright (C) 2010  KennyTM~ <kennytm@gmail.com>
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module builds a sorted index of the implementation addresses (IMPs) of
+Objective-C methods, to name an address from a backtrace or from an emulator's
+:attr:`~cpu.arm.thread.Thread.onBranch` callback as ``-[Class selector]``. The
+regular symbols can be merged into the index, so the functions of a stripped
+binary which are not methods are still named when they have a symbol.
+Example::
+
+	from objc.impindex import ImpIndex
+	import macho.features
+	macho.features.enable('objc')
+
+	with MachO(path) as machO:
+		index = ImpIndex.fromMachO(machO)
+	print(index.describe(0x2f04))	# e.g. '-[UIView layoutSubviews] + 0x4'
+
+"""
+
+from bisect import bisect_right
+from operator import itemgetter
+from sym import SYMTYPE_GENERIC
+
+
+class ImpIndex(object):
+	"""A sorted index from implementation addresses to methods and symbols.
+	Build one with :meth:`fromObjects` or :meth:`fromMachO`.
+	
+	The lowest bit of the addresses, which marks Thumb functions on ARM, is
+	ignored.
+	
+	.. attribute:: addresses
+	
+		The sorted list of addresses.
+	
+	.. attribute:: entries
+	
+		The list of entries at the corresponding :attr:`addresses`. An entry is a
+		``(name, className, method, isClassMethod)`` tuple, where *name* is e.g.
+		``'-[UIView layoutSubviews]'``, and *method* is the
+		:class:`~objc.method.Method`. Methods added by a category have a
+		*className* like ``'UIView(Extras)'``. For a merged symbol, the entry is
+		``(name, None, None, False)``.
+	
+	"""
+	
+	def __init__(self, entries=()):
+		"""Create an index from an iterable of ``(address, entry)`` tuples.
+		Entries at address 0 are skipped."""
+		lst = sorted(((address & ~1, entry) for address, entry in entries if address), key=itemgetter(0))
+		self.addresses = [address for address, _ in lst]
+		self.entries = [entry for _, entry in lst]
+	
+	def __len__(self):
+		return len(self.addresses)
+	
+	@staticmethod
+	def _methodEntries(obj, className):
+		for isClassMethod, methods in ((False, obj.methods), (True, obj.classMethods)):
+			prefix = '+' if isClassMethod else '-'
+			for method in methods.values():
+				name = '{}[{} {}]'.format(prefix, className, method.name)
+				yield (method.imp, (name, className, method, isClassMethod))
+	
+	@classmethod
+	def fromObjects(cls, classes=(), categories=(), symbols=()):
+		"""Build an index from iterables of :class:`~objc.class_.Class`\\es,
+		:class:`~objc.category.Category`\\s and :class:`~sym.Symbol`\\s. Only
+		the defined, generic symbols are added, and where a method is
+		implemented at the same address, the symbol is dropped."""
+		entries = []
+		for c in classes:
+			entries.extend(cls._methodEntries(c, c.name))
+		for cat in categories:
+			entries.extend(cls._methodEntries(cat, '{}({})'.format(cat.class_.name, cat.name)))
+		
+		imps = set(address & ~1 for address, _ in entries)
+		entries.extend((sym.addr, (sym.name, None, None, False)) for sym in symbols
+		               if sym.symtype == SYMTYPE_GENERIC and sym.addr & ~1 not in imps)
+		return cls(entries)
+	
+	@classmethod
+	def fromMachO(cls, machO, includeSymbols=True):
+		"""Build an index from an opened :class:`~macho.macho.MachO` object,
+		which is analyzed with the ``'objc'`` feature. If *includeSymbols* is
+		``True``, its symbols are merged into the index."""
+		sectionProperty = machO.anySectionProperty
+		return cls.fromObjects(sectionProperty('className', 'ObjCClassListSection', 'classes', default=None) or (),
+		                       sectionProperty('className', 'ObjCCategoryListSection', 'categories', default=None) or (),
+		                       getattr(machO, 'symbols', ()) if includeSymbols else ())
+	
+	def at(self, address):
+		"""Return the entry exactly at *address*, or ``None``."""
+		address &= ~1
+		addresses = self.addresses
+		i = bisect_right(addresses, address) - 1
+		if i >= 0 and addresses[i] == address:
+			return self.entries[i]
+		return None
+	
+	def nearest(self, address):
+		"""Return a tuple of the entry at or nearest before *address*, and the
+		offset of *address* from it. Returns ``None`` if *address* is before all
+		entries.
+		
+		Functions have no recorded size, so the entry found for an address
+		outside any function is meaningless."""
+		address &= ~1
+		i = bisect_right(self.addresses, address) - 1
+		if i < 0:
+			return None
+		return (self.entries[i], address - self.addresses[i])
+	
+	def describe(self, address):
+		"""Return a description of *address* like ``'-[UIView layoutSubviews] +
+		0x4'``, or ``None`` if *address* is before all entries."""
+		res = self.nearest(address)
+		if res is None:
+			return None
+		(entry, offset) = res
+		return '{} + 0x{:x}'.format(entry[0], offset) if offset else entry[0]
+
+
+if __name__ == '__main__':
+	from objc.class_ import Class
+	from objc.category import Category
+	from objc.method import Method
+	from sym import Symbol, SYMTYPE_UNDEFINED
+
+	view = Class('UIView')
+	view.addMethods([Method('layoutSubviews', 'v8@0:4', 0x2001, False), Method('init', 'v8@0:4', 0x2100, False)])
+	view.addClassMethods([Method('layerClass', '#8@0:4', 0x2200, False), Method('new', '@8@0:4', 0, False)])
+	cat = Category('Extras', view)
+	cat.addMethods([Method('layoutIfNeeded', 'v8@0:4', 0x2300, False)])
+	symbols = [Symbol('_main', 0x1000, SYMTYPE_GENERIC), Symbol('-[UIView init]', 0x2100, SYMTYPE_GENERIC),
+	           Symbol('_objc_msgSend', 0x3000, SYMTYPE_UNDEFINED)]
+
+	index = ImpIndex.fromObjects([view], [cat], symbols)
+	assert len(index) == 5
+	assert index.addresses == sorted(index.addresses)
+	assert index.at(0x2000)[1:] == ('UIView', view.methods['layoutSubviews'], False)
+	assert index.at(0x2004) is None
+	assert index.describe(0xfff) is None
+	assert index.describe(0x1000) == '_main'
+	assert index.describe(0x2010) == '-[UIView layoutSubviews] + 0x10'
+	assert index.describe(0x2001) == '-[UIView layoutSubviews]'
+	assert index.describe(0x2100) == '-[UIView init]'
+	assert index.at(0x2100)[2] is view.methods['init']
+	assert index.describe(0x2204) == '+[UIView layerClass] + 0x4'
+	assert index.describe(0x5000) == '-[UIView(Extras) layoutIfNeeded] + 0x2d00'
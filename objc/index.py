@@ -0,0 +1,315 @@
+#
+#	index.py ... Cross-reference index of ObjC classes, methods and protocols
+#	Copyright (C) 2010  KennyTM~ <kennytm@gmail.com>
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module builds an index over the classes, categories and protocols read by
+the :mod:`macho.sections.objc` analyzers, to answer queries like "all subclasses
+of ``UIView``" or "which classes implement ``-layoutSubviews``" without scanning
+every class. Example::
+
+	from macho.sharedcache import DyldSharedCache
+	from objc.index import ObjCIndex
+	import macho.features
+	macho.features.enable('objc')
+
+	with DyldSharedCache(path) as sc:
+		index = ObjCIndex.fromSharedCache(sc)
+	index.save('objc-index.json')
+
+	index = ObjCIndex.load('objc-index.json')
+	print(sorted(index.allSubclasses('UIView')))
+	print(index.implementorsOf('layoutSubviews', classMethod=False))
+
+The index only refers to classes, categories and protocols by name, so it can
+be serialized to JSON and does not keep any file open.
+
+"""
+
+from collections import deque
+import json
+
+
+class ObjCIndex(object):
+	"""An index of Objective-C classes, methods and protocols. Build one with
+	:meth:`fromMachO` or :meth:`fromSharedCache`, or fill an empty one with
+	:meth:`add`.
+
+	.. attribute:: superclasses
+
+		A dictionary from class name to the name of its superclass, or ``None``
+		for root classes.
+
+	.. attribute:: subclasses
+
+		A dictionary from class name to the list of names of its direct
+		subclasses.
+
+	.. attribute:: implementors
+
+		A dictionary from selector to a list of ``(className, categoryName,
+		isClassMethod)`` tuples of the classes implementing it. The
+		*categoryName* is ``None`` unless the method is added by a category.
+
+	.. attribute:: conformers
+
+		A dictionary from protocol name to a list of ``(name, kind)`` tuples of
+		the objects adopting it, where *kind* is one of ``'class'``,
+		``'category'`` or ``'protocol'``. Categories are named as
+		``'Class(Category)'``.
+
+	.. attribute:: images
+
+		A dictionary from class name to the path of the image defining it, for
+		the classes added with an *image*.
+
+	"""
+
+	def __init__(self):
+		self.superclasses = {}
+		self.subclasses = {}
+		self.implementors = {}
+		self.conformers = {}
+		self.images = {}
+
+	def __addMethods(self, obj, className, categoryName):
+		implementors = self.implementors
+		for isClassMethod, methods in ((False, obj.methods), (True, obj.classMethods)):
+			entry = (className, categoryName, isClassMethod)
+			for selector in methods:
+				implementors.setdefault(selector, []).append(entry)
+
+	def __addConformer(self, obj, name, kind):
+		conformers = self.conformers
+		for proto in obj.protocols:
+			conformers.setdefault(proto.name, []).append((name, kind))
+
+	def addClass(self, cls, image=None):
+		"""Add a :class:`~objc.class_.Class` to the index. *image* is the path
+		of the image defining it, if known."""
+		name = cls.name
+		superClass = cls.superClass
+		superName = superClass.name if superClass is not None else None
+		self.superclasses[name] = superName
+		self.subclasses.setdefault(name, [])
+		if superName is not None:
+			self.subclasses.setdefault(superName, []).append(name)
+		if image is not None:
+			self.images[name] = image
+		self.__addMethods(cls, name, None)
+		self.__addConformer(cls, name, 'class')
+
+	def addCategory(self, cat):
+		"""Add a :class:`~objc.category.Category` to the index."""
+		className = cat.class_.name
+		self.__addMethods(cat, className, cat.name)
+		self.__addConformer(cat, '{}({})'.format(className, cat.name), 'category')
+
+	def addProtocol(self, proto):
+		"""Add a :class:`~objc.protocol.Protocol` to the index."""
+		self.conformers.setdefault(proto.name, [])
+		self.__addConformer(proto, proto.name, 'protocol')
+
+	def add(self, classes=(), categories=(), protocols=(), image=None):
+		"""Add iterables of *classes*, *categories* and *protocols* to the
+		index."""
+		for proto in protocols:
+			self.addProtocol(proto)
+		for cls in classes:
+			self.addClass(cls, image)
+		for cat in categories:
+			self.addCategory(cat)
+
+	def addMachO(self, machO, image=None):
+		"""Add the Objective-C structures of an opened
+		:class:`~macho.macho.MachO` object, which is analyzed with the ``'objc'``
+		feature. *image* defaults to the file name of *machO*."""
+		sectionProperty = machO.anySectionProperty
+		self.add(sectionProperty('className', 'ObjCClassListSection', 'classes', default=None) or (),
+		         sectionProperty('className', 'ObjCCategoryListSection', 'categories', default=None) or (),
+		         sectionProperty('className', 'ObjCProtoListSection', 'protocols', default=None) or (),
+		         image if image is not None else machO.filename)
+
+	@classmethod
+	def fromMachO(cls, machO):
+		"""Build an index from one opened :class:`~macho.macho.MachO` object."""
+		index = cls()
+		index.addMachO(machO)
+		return index
+
+	@classmethod
+	def fromSharedCache(cls, cache, images=None):
+		"""Build an index from the images of an opened
+		:class:`~macho.sharedcache.DyldSharedCache`. If the iterable *images*
+		is given, only those :class:`~macho.sharedcache.Image`\\s are added.
+		
+		An image with symbolic links is added once, under its primary path."""
+		index = cls()
+		seen = set()
+		for image in (cache.images if images is None else images):
+			# Images with symbolic links appear more than once in the table.
+			if image.index not in seen:
+				seen.add(image.index)
+				index.addMachO(image.machO, image.path)
+		return index
+
+	def allSubclasses(self, className):
+		"""Return an iterable of names of all direct and indirect subclasses of
+		*className*, in breadth-first order."""
+		subclasses = self.subclasses
+		queue = deque(subclasses.get(className, ()))
+		while queue:
+			name = queue.popleft()
+			yield name
+			queue.extend(subclasses.get(name, ()))
+
+	def superclassChain(self, className):
+		"""Return a list of names of the superclasses of *className*, starting
+		from its direct superclass."""
+		res = []
+		superclasses = self.superclasses
+		name = superclasses.get(className)
+		while name is not None and name not in res:
+			res.append(name)
+			name = superclasses.get(name)
+		return res
+
+	def implementorsOf(self, selector, classMethod=None):
+		"""Return the list of ``(className, categoryName, isClassMethod)``
+		tuples implementing *selector*. If *classMethod* is not ``None``, only
+		class methods or instance methods are returned."""
+		entries = self.implementors.get(selector, [])
+		if classMethod is None:
+			return list(entries)
+		return [entry for entry in entries if entry[2] == classMethod]
+
+	def conformersOf(self, protocolName, recursive=False):
+		"""Return the list of ``(name, kind)`` tuples of objects adopting
+		*protocolName*. If *recursive* is ``True``, objects adopting it through
+		other protocols, and subclasses of adopting classes, are included as
+		well."""
+		if not recursive:
+			return list(self.conformers.get(protocolName, []))
+
+		res = []
+		seen = set()
+		queue = deque([protocolName])
+		while queue:
+			for name, kind in self.conformers.get(queue.popleft(), ()):
+				if (name, kind) in seen:
+					continue
+				seen.add((name, kind))
+				res.append((name, kind))
+				if kind == 'protocol':
+					queue.append(name)
+				elif kind == 'class':
+					for subclass in self.allSubclasses(name):
+						if (subclass, 'class') not in seen:
+							seen.add((subclass, 'class'))
+							res.append((subclass, 'class'))
+		return res
+
+	def asDict(self):
+		"""Convert the index into a JSON-serializable dictionary."""
+		return {
+			'superclasses': self.superclasses,
+			'subclasses': self.subclasses,
+			'implementors': self.implementors,
+			'conformers': self.conformers,
+			'images': self.images,
+		}
+
+	@classmethod
+	def fromDict(cls, d):
+		"""Restore an index from the result of :meth:`asDict`."""
+		index = cls()
+		index.superclasses = dict(d['superclasses'])
+		index.subclasses = {k: list(v) for k, v in d['subclasses'].items()}
+		index.implementors = {k: [tuple(e) for e in v] for k, v in d['implementors'].items()}
+		index.conformers = {k: [tuple(e) for e in v] for k, v in d['conformers'].items()}
+		index.images = dict(d['images'])
+		return index
+
+	def save(self, filename):
+		"""Save the index as JSON to *filename*."""
+		with open(filename, 'w') as f:
+			json.dump(self.asDict(), f)
+
+	@classmethod
+	def load(cls, filename):
+		"""Load an index saved by :meth:`save`."""
+		with open(filename) as f:
+			return cls.fromDict(json.load(f))
+
+
+if __name__ == '__main__':
+	from objc.class_ import Class
+	from objc.category import Category
+	from objc.protocol import Protocol
+	from objc.method import Method
+
+	nsobjectProto = Protocol('NSObject')
+	nsobject = Class('NSObject', 2)
+	nsobject.protocols.add(nsobjectProto)
+	nsobject.addMethods([Method('init', 'v8@0:4', 0x1000, False)])
+	responder = Class('UIResponder')
+	responder.superClass = nsobject
+	view = Class('UIView')
+	view.superClass = responder
+	view.addMethods([Method('layoutSubviews', 'v8@0:4', 0x2000, False), Method('init', 'v8@0:4', 0x2010, False)])
+	label = Class('UILabel')
+	label.superClass = view
+	label.addClassMethods([Method('layerClass', '#8@0:4', 0x3000, False)])
+	cat = Category('Extras', view)
+	cat.addMethods([Method('layoutIfNeeded', 'v8@0:4', 0x4000, False)])
+
+	index = ObjCIndex()
+	index.add([nsobject, responder, view, label], [cat], [nsobjectProto], image='/usr/lib/libobjc.dylib')
+
+	assert index.subclasses['UIView'] == ['UILabel']
+	assert list(index.allSubclasses('NSObject')) == ['UIResponder', 'UIView', 'UILabel']
+	assert index.superclassChain('UILabel') == ['UIView', 'UIResponder', 'NSObject']
+	assert index.implementorsOf('init') == [('NSObject', None, False), ('UIView', None, False)]
+	assert index.implementorsOf('layerClass', classMethod=False) == []
+	assert index.implementorsOf('layoutIfNeeded') == [('UIView', 'Extras', False)]
+	assert index.conformersOf('NSObject') == [('NSObject', 'class')]
+	assert len(index.conformersOf('NSObject', recursive=True)) == 4
+
+	restored = ObjCIndex.fromDict(json.loads(json.dumps(index.asDict())))
+	assert restored.asDict() == index.asDict()
+	
+	# An image with a symbolic link is iterated twice by the image table.
+	class FakeMachO(object):
+		def __init__(self, classes):
+			self.classes = classes
+		def anySectionProperty(self, idtype, sectid, prop, default=None):
+			return self.classes if sectid == 'ObjCClassListSection' else default
+	class FakeImage(object):
+		def __init__(self, index, path, classes):
+			(self.index, self.path, self.machO) = (index, path, FakeMachO(classes))
+	class FakeCache(object):
+		pass
+	libobjc = FakeImage(0, '/usr/lib/libobjc.A.dylib', [nsobject])
+	uikit = FakeImage(1, '/System/Library/Frameworks/UIKit.framework/UIKit', [responder, view, label])
+	cache = FakeCache()
+	cache.images = [libobjc, uikit, uikit]
+	
+	index = ObjCIndex.fromSharedCache(cache)
+	assert index.subclasses['NSObject'] == ['UIResponder']
+	assert list(index.allSubclasses('NSObject')) == ['UIResponder', 'UIView', 'UILabel']
+	assert index.implementorsOf('init') == [('NSObject', None, False), ('UIView', None, False)]
+	assert index.conformersOf('NSObject') == [('NSObject', 'class')]
+	assert index.images['UIView'] == uikit.path
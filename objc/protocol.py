@@ -23,4 +23,67 @@ class Protocol(ClassLike):
 	def __str__(self):
 		return self.stringify('@protocol ', '', '')
 
+
+class ProtocolRegistry(object):
+	"""A registry of canonical :class:`Protocol`\\s, so that the same protocol
+	read from several images is represented by one object.
+	
+	A protocol is identified by its name and its *content*, which is any
+	hashable description of everything defining it (e.g. its methods,
+	properties and adopted protocols). Protocols with the same name but
+	different content are kept apart.
+	
+	Computing the content still requires reading the protocol. A reader may
+	also record the *location* it read a protocol from, e.g. the pointers in the
+	protocol structure, so that the same structure is not read again.
+	
+	"""
+	
+	def __init__(self):
+		self._byContent = {}
+		self._byLocation = {}
+	
+	def __len__(self):
+		return len(self._byContent)
 	
+	def __iter__(self):
+		return iter(self._byContent.values())
+	
+	def find(self, name, content):
+		"""Return the canonical protocol with *name* and *content*, or ``None``
+		if there is none."""
+		return self._byContent.get((name, content))
+	
+	def findAt(self, location):
+		"""Return the canonical protocol read from *location*, or ``None`` if
+		there is none."""
+		return self._byLocation.get(location)
+	
+	def register(self, name, content, proto, location=None):
+		"""Make *proto* the canonical protocol with *name* and *content*, unless
+		there is already one, and return the canonical protocol. If *location*
+		is not ``None``, the protocol is also recorded as read from there."""
+		proto = self._byContent.setdefault((name, content), proto)
+		if location is not None:
+			self._byLocation[location] = proto
+		return proto
+	
+	def clear(self):
+		"""Remove all protocols from the registry."""
+		self._byContent.clear()
+		self._byLocation.clear()
+
+
+if __name__ == '__main__':
+	registry = ProtocolRegistry()
+	p1 = Protocol('NSCopying')
+	p2 = Protocol('NSCopying')
+	assert registry.find('NSCopying', ('a',)) is None
+	assert registry.register('NSCopying', ('a',), p1, location=(1, 2)) is p1
+	assert registry.register('NSCopying', ('a',), p2) is p1
+	assert registry.register('NSCopying', ('b',), p2) is p2
+	assert registry.findAt((1, 2)) is p1
+	assert registry.findAt((3, 4)) is None
+	assert len(registry) == 2
+	registry.clear()
+	assert len(registry) == 0